@@ -0,0 +1,183 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                  RENDERIZAÇÃO EM LOTE (SEM INTERFACE)
+# -------------------------------------------------------------------------------------------------------------
+# Gera os gráficos de um diretório inteiro de varreduras sem abrir o Kivy, usando a mesma
+# normalização (pattern.RadiationPattern) e o mesmo estilo (rendering.draw_pattern) do app.
+# Cada varredura é renderizada em um processo separado (um por núcleo, por padrão).
+#
+# Uso:
+#   python batch.py ORIGEM [-o SAIDA] [-f png pdf] [--dpi 300] [-j N] [--interp spline|fft|auto|none]
+#                   [--calibration PERFIL.csv]
+#
+# ORIGEM pode ser o diretório de varreduras salvas pelo app (com sweeps.db) ou um diretório
+# com arquivos .npy (vetor session_store.SWEEP_DTYPE) ou .csv (colunas ângulo,potência).
+# Além dos gráficos, grava SAIDA/metricas.csv com as métricas de cada varredura.
+# Com --calibration (calibration.CalibrationProfile), os gráficos saem em ganho absoluto (dBi): os
+# deslocamentos de todas as varreduras são calculados de uma vez, pela frequência salva de cada uma.
+import argparse
+import csv
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np # type: ignore
+
+from calibration import CalibrationProfile
+from measurements import MeasurementStore
+from metrics import PatternMetrics
+from pattern import RadiationPattern
+from rendering import plot_spec, render_to_files, EXPORT_DPI
+from resampling import METHODS
+from session_store import DB_NAME, SessionStore
+
+DEFAULT_FORMATS = ('png',)
+REPORT_NAME = 'metricas.csv'
+
+# Uma varredura a renderizar: de onde ler (arquivo, ou raiz do SessionStore + id) e como rotular
+BatchJob = namedtuple('BatchJob', ['name', 'path', 'sweep_id', 'title', 'legend', 'frequency_hz'])
+
+
+def _safe_name(text):
+    cleaned = "".join(c if c.isalnum() or c in "-_." else "_" for c in text.strip())
+    return cleaned or "varredura"
+
+
+def find_jobs(source):
+    """Lista as varreduras de 'source' (SessionStore ou diretório de .npy/.csv)."""
+    if os.path.exists(os.path.join(source, DB_NAME)):
+        jobs = []
+        for record in SessionStore(source).list():
+            name = f"{record.id:04d}_{_safe_name(record.title)}"
+            jobs.append(BatchJob(name, source, record.id, record.title, record.frequency or None, record.frequency_hz))
+        return jobs
+
+    jobs = []
+    for filename in sorted(os.listdir(source)):
+        base, ext = os.path.splitext(filename)
+        if ext.lower() in ('.npy', '.csv'):
+            jobs.append(BatchJob(_safe_name(base), os.path.join(source, filename), None, base, None, None))
+    return jobs
+
+
+def load_sweep(job):
+    """Ângulos, potências, nº de amostras e desvios da varredura (None quando o arquivo não os traz)."""
+    if job.sweep_id is not None:
+        data = SessionStore(job.path).load(job.sweep_id)
+    elif job.path.lower().endswith('.npy'):
+        data = np.load(job.path, mmap_mode='r')
+    else:
+        data = np.genfromtxt(job.path, delimiter=',', names=True, dtype=float)
+        names = data.dtype.names
+        counts = data[names[2]] if len(names) > 2 else None
+        stds = data['std'] if 'std' in names else None
+        return data[names[0]], data[names[1]], counts, stds
+    names = data.dtype.names
+    counts = data['count'] if 'count' in names else None
+    stds = data['std'] if 'std' in names else None
+    return data['angle'], data['power'], counts, stds
+
+
+def render_job(job, output_dir, formats, dpi, interpolation='spline', gain_offset=None):
+    """Executado no processo de trabalho: carrega, normaliza e renderiza uma varredura."""
+    angles, powers, counts, stds = load_sweep(job)
+    store = MeasurementStore()
+    store.load_arrays(angles, powers, counts, stds)
+    pattern = RadiationPattern(store)
+    spec = plot_spec(pattern, job.title, legend=job.legend, interpolation=interpolation, gain_offset=gain_offset)
+    outputs = render_to_files(spec, [(os.path.join(output_dir, f"{job.name}.{file_format}"), file_format, dpi)
+                                     for file_format in formats])
+    return outputs, (spec.metrics, spec.peak_gain)
+
+
+def calibration_offsets(jobs, profile):
+    """
+    Deslocamento (dB) de cada varredura no perfil, ou a mensagem de erro (frequência desconhecida ou fora
+    das tabelas). Todas as frequências vão em uma única chamada vetorizada ao perfil.
+    """
+    known = [job for job in jobs if job.frequency_hz is not None]
+    offsets = {job: "frequência não informada" for job in jobs if job.frequency_hz is None}
+    try:
+        offsets.update(zip(known, profile.offsets([job.frequency_hz for job in known]).tolist()))
+    except ValueError: # Alguma fora das tabelas: separa uma a uma (as demais já ficam no cache do perfil)
+        for job in known:
+            try:
+                offsets[job] = profile.offset(job.frequency_hz)
+            except ValueError as e:
+                offsets[job] = str(e)
+    return offsets
+
+
+def write_report(path, results, calibrated=False):
+    """Uma linha de métricas por varredura, na ordem de entrada (com o ganho do pico em dBi, se calibrado)."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('varredura',) + PatternMetrics._fields + (('peak_gain_dbi',) if calibrated else ()))
+        for job, (metrics, peak_gain) in results:
+            values = tuple(metrics) + ((peak_gain,) if calibrated else ())
+            writer.writerow((job.name,) + tuple(f"{value:.3f}" for value in values))
+
+
+def run(source, output_dir, formats=DEFAULT_FORMATS, dpi=EXPORT_DPI, workers=None, interpolation='spline',
+        calibration=None):
+    """
+    Renderiza todas as varreduras em paralelo ('calibration': CalibrationProfile para ganho em dBi).
+    Retorna o número de falhas.
+    """
+    jobs = find_jobs(source)
+    if not jobs:
+        print(f"Nenhuma varredura encontrada em {source}")
+        return 0
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = {}
+    failures = 0
+    offsets = {job: None for job in jobs}
+    if calibration is not None:
+        offsets = calibration_offsets(jobs, calibration)
+        for job in jobs:
+            if isinstance(offsets[job], str):
+                failures += 1
+                print(f"ERRO em {job.name}: sem calibração ({offsets[job]})")
+        jobs = [job for job in jobs if not isinstance(offsets[job], str)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_job, job, output_dir, formats, dpi, interpolation, offsets[job]): job
+                   for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                outputs, metrics = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"ERRO em {job.name}: {e}")
+                continue
+            results[job] = metrics
+            print(f"{job.name}: {', '.join(outputs)}")
+
+    write_report(os.path.join(output_dir, REPORT_NAME), [(job, results[job]) for job in jobs if job in results],
+                 calibrated=calibration is not None)
+    print(f"{len(results)} de {len(results) + failures} varreduras renderizadas em {output_dir}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Renderiza em lote os diagramas de radiação de um diretório de varreduras.")
+    parser.add_argument('source', help="diretório de varreduras (SessionStore, .npy ou .csv)")
+    parser.add_argument('-o', '--output', default='graficos', help="diretório de saída (padrão: graficos)")
+    parser.add_argument('-f', '--format', nargs='+', choices=('png', 'pdf'), default=list(DEFAULT_FORMATS),
+                        help="formatos de saída (padrão: png)")
+    parser.add_argument('--dpi', type=int, default=EXPORT_DPI, help=f"resolução (padrão: {EXPORT_DPI})")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="processos em paralelo (padrão: nº de núcleos)")
+    parser.add_argument('--interp', choices=METHODS + ('none',), default='spline',
+                        help="reamostragem da curva e das métricas (padrão: spline)")
+    parser.add_argument('--calibration', default=None,
+                        help="perfil de calibração (CSV do calibration.py) para gráficos em ganho absoluto (dBi)")
+    args = parser.parse_args(argv)
+    interpolation = None if args.interp == 'none' else args.interp
+    calibration = CalibrationProfile.read_csv(args.calibration) if args.calibration else None
+    failures = run(args.source, args.output, args.format, args.dpi, args.jobs, interpolation, calibration)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
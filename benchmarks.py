@@ -0,0 +1,373 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                       BENCHMARKS (SEM INTERFACE)
+# -------------------------------------------------------------------------------------------------------------
+# Mede onde o tempo é gasto fora do Kivy, com o simulador da ESP32 (transport.SimulatorTransport):
+#   pattern.*   normalização, ordenação, reamostragem e métricas (plot_spec) de 36 a 36.000 pontos,
+#               e calibração em dBi de uma campanha de CALIBRATION_SWEEPS varreduras
+#   render.*    prévia (render_to_rgba) e exportação (render_to_files) em vários dpi, e prévia
+#               repetida com o RenderCache
+#   protocol.*  decodificação das respostas (BluetoothReceiver), envio de comandos (CommandWriter)
+#               e ida e volta comando -> 'OK' + 'P:' pelo simulador
+#   sweep.*     varredura completa (SweepEngine) contra o simulador, sem tempo de motor
+#
+# Uso:
+#   python benchmarks.py [-o resultados.json] [--quick] [--only pattern render ...]
+#   python benchmarks.py -o nova.json --compare base.json [--tolerance 0.25]
+#
+# O JSON guarda a mediana, o mínimo e o máximo de cada caso, além das versões usadas. Com --compare,
+# os casos cuja mediana piorou mais que 'tolerance' (fração) em relação à base são listados e o
+# código de saída é 1.
+import argparse
+import json
+import os
+import platform
+import queue
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np # type: ignore
+
+from bluetooth_io import BluetoothReceiver, CommandWriter
+from calibration import CalibrationProfile
+from measurements import MeasurementStore
+from pattern import RadiationPattern
+from render_cache import RenderCache
+from rendering import plot_spec, render_to_files, render_to_rgba, PREVIEW_DPI, EXPORT_DPI
+from sweep import SweepEngine
+from transport import SimulatorTransport, synthetic_pattern, SIM_PEAK_POWER
+
+PATTERN_SIZES = (36, 360, 3600, 36000)
+CALIBRATION_SWEEPS = 500 # Varreduras de 360 pontos, cada uma em uma frequência, recalibradas de uma vez
+RENDER_POINTS = 360
+RENDER_DPIS = (72, PREVIEW_DPI, EXPORT_DPI)
+REPLY_COUNT = 20000 # Pares 'OK' + 'P:' decodificados no teste de recepção
+COMMAND_COUNT = 5000
+ROUND_TRIPS = 500
+SWEEP_STEP = 1
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+MIN_DELTA_S = 1e-4 # Diferenças menores que isto (ruído de medição em casos de microssegundos) são ignoradas
+SCHEMA_VERSION = 1
+
+
+def measure(function, repeat=DEFAULT_REPEAT, setup=None, warmup=1):
+    """
+    Executa 'function' 'repeat' vezes (após 'setup', fora da medição) e devolve os tempos em segundos.
+    As 'warmup' primeiras execuções (imports tardios, caches do Matplotlib) não são contadas.
+    """
+    times = []
+    for run in range(warmup + repeat):
+        argument = setup() if setup else None
+        started = time.perf_counter()
+        function(argument) if setup else function()
+        if run >= warmup:
+            times.append(time.perf_counter() - started)
+    return times
+
+
+def summarize(times, **extra):
+    """Resumo de um caso: mediana, mínimo e máximo (s), mais campos extras (ex.: vazão)."""
+    result = {
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'max_s': max(times),
+        'runs': len(times),
+    }
+    result.update(extra)
+    return result
+
+
+def synthetic_store(points, seed=0):
+    """
+    MeasurementStore com 'points' ângulos uniformes e o padrão sintético do simulador com ruído.
+    A resolução do store acompanha o passo para que cada ponto ocupe um bin próprio.
+    """
+    step = 360.0 / points
+    angles = np.arange(points) * step
+    rng = np.random.default_rng(seed)
+    powers = SIM_PEAK_POWER + np.array([synthetic_pattern(angle, 0.0) for angle in angles]) \
+        + rng.normal(0.0, 0.3, points)
+    store = MeasurementStore(resolution=min(1.0, step))
+    store.load_arrays(angles, powers)
+    return store
+
+
+# ------------------------------------------- Cálculo do diagrama ---------------------------------------------
+def bench_pattern(repeat, sizes=PATTERN_SIZES):
+    results = {}
+    for points in sizes:
+        store = synthetic_store(points)
+        # Cada repetição usa um RadiationPattern novo: nada vem dos caches de versão
+        times = measure(lambda pattern: plot_spec(pattern, "benchmark"), repeat,
+                        setup=lambda: RadiationPattern(store))
+        results[f'pattern.plot_spec.{points}'] = summarize(times, points=points)
+
+        times = measure(lambda pattern: pattern.gains(), repeat, setup=lambda: RadiationPattern(store))
+        results[f'pattern.gains.{points}'] = summarize(times, points=points)
+
+        pattern = RadiationPattern(store)
+        step = 360.0 / points
+        # Uma medida nova em ângulo existente + recálculo dos ganhos (o que a tela faz a cada 'Registrar')
+        times = measure(lambda: (pattern.record(step * (points // 2), SIM_PEAK_POWER, False), pattern.gains()), repeat)
+        results[f'pattern.record_update.{points}'] = summarize(times, points=points)
+
+    rng = np.random.default_rng(0)
+    powers = rng.normal(SIM_PEAK_POWER, 3.0, (CALIBRATION_SWEEPS, 360))
+    frequencies = rng.uniform(2.0e9, 3.0e9, CALIBRATION_SWEEPS)
+    table = np.linspace(1.0e9, 4.0e9, 31)
+    # Perfil novo a cada repetição: mede a interpolação das tabelas, não só o cache por frequência
+    times = measure(lambda profile: profile.apply(powers, frequencies), repeat,
+                    setup=lambda: CalibrationProfile("benchmark", (table, np.linspace(10.0, 16.0, 31)),
+                                                     (table, np.linspace(-30.0, -38.0, 31)),
+                                                     (table, np.linspace(1.0, 4.0, 31))))
+    results['pattern.calibration.batch'] = summarize(times, sweeps=CALIBRATION_SWEEPS)
+    return results
+
+
+# ------------------------------------------------ Renderização -----------------------------------------------
+def bench_render(repeat, dpis=RENDER_DPIS):
+    spec = plot_spec(RadiationPattern(synthetic_store(RENDER_POINTS)), "benchmark", legend="2.4 GHz")
+    render_to_rgba(spec) # Aquece o Matplotlib (import e fontes) fora da medição
+    results = {}
+    for dpi in dpis:
+        results[f'render.preview.{dpi}dpi'] = summarize(measure(lambda: render_to_rgba(spec, dpi), repeat), dpi=dpi)
+    cache = RenderCache() # A primeira chamada (aquecimento do measure) preenche o cache
+    results['render.preview.cached'] = summarize(measure(lambda: render_to_rgba(spec, PREVIEW_DPI, cache), repeat),
+                                                 dpi=PREVIEW_DPI)
+    with tempfile.TemporaryDirectory() as directory:
+        for dpi in dpis:
+            for file_format in ('png', 'pdf'):
+                path = os.path.join(directory, f"bench.{file_format}")
+                times = measure(lambda: render_to_files(spec, [(path, file_format, dpi)]), repeat)
+                results[f'render.export.{file_format}.{dpi}dpi'] = summarize(times, dpi=dpi,
+                                                                            bytes=os.path.getsize(path))
+    return results
+
+
+# ------------------------------------------------- Protocolo -------------------------------------------------
+class _BytesInput:
+    """Stream de entrada pré-carregado (interface Java: read(buf, off, len), -1 no fim)."""
+
+    def __init__(self, data, chunk):
+        self._data = memoryview(data)
+        self._chunk = chunk
+        self._offset = 0
+
+    def available(self):
+        return len(self._data) - self._offset
+
+    def read(self, buf, offset, size):
+        if self._offset >= len(self._data):
+            return -1
+        count = min(size, self._chunk, len(self._data) - self._offset)
+        buf[offset:offset + count] = self._data[self._offset:self._offset + count]
+        self._offset += count
+        return count
+
+
+class _CountingOutput:
+    def __init__(self):
+        self.writes = 0
+        self.flushes = 0
+        self.bytes = 0
+
+    def write(self, data):
+        self.writes += 1
+        self.bytes += len(data)
+
+    def flush(self):
+        self.flushes += 1
+
+
+def _decode_all(data, chunk):
+    replies = queue.Queue()
+    try:
+        BluetoothReceiver(_BytesInput(data, chunk), replies).run()
+    except EOFError:
+        pass
+    return replies.qsize()
+
+
+def _connect_simulator(step_time=0.0):
+    """Simulador conectado com as threads de escrita e leitura do app; devolve (transporte, writer, respostas)."""
+    transport = SimulatorTransport(step_time=step_time, seed=0)
+    transport.connect()
+    replies = queue.Queue()
+    writer = CommandWriter(transport.output_stream())
+    writer.start()
+    receiver = BluetoothReceiver(transport.input_stream(), replies)
+
+    def read():
+        try:
+            receiver.run()
+        except EOFError:
+            pass
+
+    threading.Thread(target=read, daemon=True).start()
+    return transport, writer, replies
+
+
+def bench_protocol(repeat, reply_count=REPLY_COUNT, command_count=COMMAND_COUNT, round_trips=ROUND_TRIPS):
+    results = {}
+    data = "".join(f"OK\nP:{SIM_PEAK_POWER - i % 40:.2f}\n" for i in range(reply_count)).encode('ascii')
+    # Blocos de 1 byte (pior caso do stream) e de 1024 bytes (buffer do BluetoothReceiver)
+    for chunk in (1, 1024):
+        times = measure(lambda: _decode_all(data, chunk), repeat)
+        results[f'protocol.receive.chunk{chunk}'] = summarize(
+            times, replies=2 * reply_count, replies_per_s=2 * reply_count / statistics.median(times))
+
+    def send_all(output):
+        writer = CommandWriter(output, max_pending=command_count)
+        writer.start()
+        for i in range(command_count):
+            writer.submit_move('R' if i % 2 else 'L', 1, coalesce=False, block=True)
+        while writer.depth:
+            time.sleep(0.0005)
+        writer.stop()
+
+    outputs = []
+    times = measure(send_all, repeat, setup=lambda: outputs.append(_CountingOutput()) or outputs[-1])
+    results['protocol.send'] = summarize(times, commands=command_count,
+                                         commands_per_s=command_count / statistics.median(times),
+                                         flushes=outputs[-1].flushes)
+
+    transport, writer, replies = _connect_simulator()
+    try:
+        latencies = []
+        for i in range(round_trips):
+            started = time.perf_counter()
+            writer.submit_move('R' if i % 2 else 'L', 1, coalesce=False, block=True)
+            replies.get(timeout=5) # OK
+            replies.get(timeout=5) # P:
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.stop()
+        transport.close()
+        transport.simulator.close() # O transporte só derruba o enlace; encerra também a thread do simulador
+    latencies.sort()
+    results['protocol.round_trip'] = summarize(latencies, p95_s=latencies[int(0.95 * (len(latencies) - 1))])
+    return results
+
+
+# ------------------------------------------------- Varredura -------------------------------------------------
+def bench_sweep(repeat, step=SWEEP_STEP):
+    def run_sweep():
+        transport, writer, replies = _connect_simulator()
+        finished = threading.Event()
+        outcome = {}
+
+        def on_finish(position, error):
+            outcome['error'] = error
+            finished.set()
+
+        engine = SweepEngine(
+            send_command=lambda direction, steps: writer.submit_move(direction, steps, coalesce=False, block=True),
+            replies=replies, start=0, stop=360 - step, step=step, on_finish=on_finish)
+        engine.start()
+        finished.wait()
+        writer.stop()
+        transport.close()
+        transport.simulator.close()
+        if outcome['error']:
+            raise outcome['error']
+        return len(engine.points)
+
+    times = measure(run_sweep, repeat)
+    points = len(range(0, 360, step))
+    return {'sweep.simulator': summarize(times, points=points, points_per_s=points / statistics.median(times))}
+
+
+SUITES = {
+    'pattern': bench_pattern,
+    'render': bench_render,
+    'protocol': bench_protocol,
+    'sweep': bench_sweep,
+}
+
+
+def environment():
+    import matplotlib # type: ignore
+    return {
+        'schema': SCHEMA_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run(suites=tuple(SUITES), repeat=DEFAULT_REPEAT, quick=False):
+    """Executa as suítes pedidas e devolve o dicionário gravado no JSON."""
+    results = {}
+    for name in suites:
+        started = time.perf_counter()
+        if quick and name == 'pattern':
+            results.update(SUITES[name](repeat, sizes=PATTERN_SIZES[:3]))
+        elif quick and name == 'render':
+            results.update(SUITES[name](repeat, dpis=RENDER_DPIS[:2]))
+        else:
+            results.update(SUITES[name](repeat))
+        print(f"{name}: {time.perf_counter() - started:.1f} s")
+    return {'environment': environment(), 'results': results}
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Casos presentes nos dois resultados cuja mediana piorou mais que 'tolerance' (e mais que MIN_DELTA_S
+    em valor absoluto): [(caso, base, atual, razão)].
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base or base['median_s'] <= 0:
+            continue
+        ratio = result['median_s'] / base['median_s']
+        if ratio > 1.0 + tolerance and result['median_s'] - base['median_s'] > MIN_DELTA_S:
+            regressions.append((name, base['median_s'], result['median_s'], ratio))
+    return regressions
+
+
+def format_results(data):
+    lines = []
+    for name, result in data['results'].items():
+        lines.append(f"  {name:<34} {result['median_s'] * 1000:10.3f} ms  (mín {result['min_s'] * 1000:.3f} ms)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do cálculo do diagrama, da renderização e do protocolo.")
+    parser.add_argument('-o', '--output', default='benchmarks.json', help="arquivo JSON de saída (padrão: benchmarks.json)")
+    parser.add_argument('--only', nargs='+', choices=tuple(SUITES), default=list(SUITES), help="suítes a executar")
+    parser.add_argument('-r', '--repeat', type=int, default=DEFAULT_REPEAT, help=f"repetições por caso (padrão: {DEFAULT_REPEAT})")
+    parser.add_argument('--quick', action='store_true', help="sem os casos mais lentos (36.000 pontos, exportação em 300 dpi)")
+    parser.add_argument('--compare', metavar='BASE.json', help="compara com um resultado anterior")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"piora relativa aceita na comparação (padrão: {DEFAULT_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    data = run(args.only, args.repeat, args.quick)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    print(format_results(data))
+    print(f"Resultados gravados em {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(data, baseline, args.tolerance)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSÃO {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"Nenhuma regressão acima de {args.tolerance:.0%} em relação a {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                        ENTRADA/SAÍDA BLUETOOTH (RFCOMM)
+# -------------------------------------------------------------------------------------------------------------
+import threading
+import time
+from collections import deque
+
+from protocol import FrameParser, MAX_STEP, REPLY_ACK, REPLY_ERROR, format_command
+from tracing import tracer
+
+READ_BUFFER_SIZE = 1024 # Tamanho do buffer reutilizado em cada read(byte[], off, len)
+POLL_INTERVAL = 0.02 # Espera (s) entre consultas a available() no modo sem bloqueio
+MAX_PENDING_COMMANDS = 32 # Limite da fila de comandos ainda não enviados
+RTT_SPAN = 'bt.ida_e_volta' # Intervalo do tracer entre a escrita de um comando e o 'OK'/'ERR' dele
+
+
+class BluetoothReceiver:
+    """
+    Lê o InputStream do socket em blocos para um buffer reutilizável, decodifica os quadros
+    com o FrameParser e coloca cada protocol.Reply na fila 'replies' (queue.Queue).
+
+    No modo bloqueante (padrão) a thread fica parada dentro de read() até chegar algum byte,
+    sem consultar available() em laço. O modo sem bloqueio consulta available() com uma pausa
+    entre as consultas, para streams cujo read() não pode ser interrompido.
+    """
+
+    def __init__(self, input_stream, replies, buffer_size=READ_BUFFER_SIZE, blocking=True):
+        self.input_stream = input_stream
+        self.replies = replies
+        self.blocking = blocking
+        self.parser = FrameParser()
+        # O pyjnius copia de volta para o bytearray o conteúdo do byte[] preenchido pelo Java
+        self._buffer = bytearray(buffer_size)
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Pede o fim da leitura. No modo bloqueante, fechar o socket desbloqueia o read()."""
+        self._stop_event.set()
+
+    def run(self):
+        """Laço de leitura; bloqueia até stop() ou até o stream falhar (a exceção é propagada)."""
+        buf = self._buffer
+        view = memoryview(buf)
+        while not self._stop_event.is_set():
+            size = len(buf)
+            if not self.blocking:
+                available = self.input_stream.available()
+                if available <= 0:
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                size = min(available, size)
+
+            count = self.input_stream.read(buf, 0, size)
+            if count < 0: # -1 indica fim do stream
+                raise EOFError("Fim do stream Bluetooth.")
+            for reply in self.parser.feed(view[:count]):
+                if reply.kind == REPLY_ACK or reply.kind == REPLY_ERROR:
+                    tracer.end(RTT_SPAN)
+                self.replies.put(reply)
+
+
+def split_steps(steps, max_step=MAX_STEP):
+    """Divide um movimento em pedaços de no máximo max_step graus (0 gera um único comando 000)."""
+    steps = max(0, int(steps))
+    chunks = [max_step] * (steps // max_step)
+    if steps % max_step or not chunks:
+        chunks.append(steps % max_step)
+    return chunks
+
+
+def _format_item(item):
+    return item if isinstance(item, str) else format_command(*item)
+
+
+class CommandWriter:
+    """
+    Thread dedicada de escrita no OutputStream, para que write()/flush() nunca rodem na
+    thread da interface. Os comandos esperam em uma fila limitada (max_pending):
+      - movimentos seguidos no mesmo sentido ainda não enviados são somados em um só
+        comando (respeitando o limite de 999 do protocolo);
+      - tudo o que estiver na fila sai em um único write() seguido de um único flush().
+    Se a fila estiver cheia, submit()/submit_move() devolvem False (ou esperam, com block=True).
+    on_depth(depth) e on_error(exception) são chamados fora da thread da interface
+    (on_depth com a fila travada, portanto deve apenas agendar a atualização).
+    'formatter(item)' converte cada item da fila no texto enviado (o ConnectionManager o usa para
+    numerar os comandos); pause() segura a fila sem descartá-la enquanto a conexão é refeita.
+    """
+
+    def __init__(self, output_stream, max_pending=MAX_PENDING_COMMANDS, on_error=None, on_depth=None,
+                 formatter=None):
+        self.output_stream = output_stream
+        self.max_pending = max_pending
+        self.on_error = on_error
+        self.on_depth = on_depth
+        self.formatter = formatter or _format_item
+        self._pending = deque() # Movimentos como [direção, passos]; dados brutos como str
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._paused = False
+        self._thread = None
+
+    @property
+    def depth(self):
+        """Quantidade de comandos esperando para serem enviados."""
+        with self._cond:
+            return len(self._pending)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Encerra a thread de escrita; comandos ainda na fila são descartados."""
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def pause(self):
+        """Para de enviar (a fila continua aceitando comandos). Um lote já em escrita não é interrompido."""
+        with self._cond:
+            self._paused = True
+
+    def resume(self, output_stream=None):
+        """Volta a enviar, opcionalmente por um novo stream (conexão refeita)."""
+        with self._cond:
+            if output_stream is not None:
+                self.output_stream = output_stream
+            self._paused = False
+            self._cond.notify_all()
+
+    def pending_moves(self):
+        """Cópia dos movimentos (direção, passos) ainda não enviados, na ordem da fila."""
+        with self._cond:
+            return [tuple(item) for item in self._pending if isinstance(item, list)]
+
+    def submit(self, data, block=False, timeout=None):
+        """Enfileira dados brutos (str) sem agrupamento."""
+        return self._enqueue(lambda: (None, [data]), block, timeout)
+
+    def submit_move(self, direction, steps, coalesce=True, block=False, timeout=None):
+        """Enfileira um movimento '&R'/'&L', somando-o ao último movimento pendente se possível."""
+        steps = max(0, int(steps))
+
+        def plan():
+            last = self._pending[-1] if self._pending else None
+            if (coalesce and steps > 0 and isinstance(last, list)
+                    and last[0] == direction and 0 < last[1] < MAX_STEP):
+                merged = min(steps, MAX_STEP - last[1])
+                rest = steps - merged
+                return (last, merged), ([[direction, s] for s in split_steps(rest)] if rest else [])
+            return None, [[direction, s] for s in split_steps(steps)]
+
+        return self._enqueue(plan, block, timeout)
+
+    def _enqueue(self, plan, block, timeout):
+        """Aplica o plano (item a complementar, novos itens) quando houver espaço na fila."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return False
+                merge, items = plan() # Refeito a cada tentativa: a fila pode ter sido enviada
+                if len(self._pending) + len(items) <= self.max_pending:
+                    break
+                if not block:
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+
+            if merge is not None:
+                item, extra = merge
+                item[1] += extra
+            self._pending.extend(items)
+            self._report_depth(len(self._pending))
+            self._cond.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while (not self._pending or self._paused) and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                batch = list(self._pending)
+                self._pending.clear()
+                self._report_depth(0)
+                self._cond.notify_all() # Libera quem espera espaço na fila
+                output_stream = self.output_stream
+
+            data = ''.join(self.formatter(item) for item in batch)
+            for _ in batch: # Cada comando do lote recebe seu próprio 'OK'
+                tracer.begin(RTT_SPAN)
+            try:
+                with tracer.span('bt.escrita', commands=len(batch)):
+                    output_stream.write(data.encode('utf-8'))
+                    output_stream.flush()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+
+    def _report_depth(self, depth):
+        if self.on_depth:
+            self.on_depth(depth)
@@ -6,6 +6,7 @@ package.domain = org.test
 source.dir = .
 
 source.include_exts = py,png,jpg,kv,atlas
+source.exclude_patterns = batch.py,benchmarks.py
 version = 0.1
 
 requirements = python3,kivy,pyjnius,numpy,matplotlib,pillow
@@ -0,0 +1,194 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                   CALIBRAÇÃO: GANHO ABSOLUTO (dBi)
+# -------------------------------------------------------------------------------------------------------------
+# Método de substituição com uma antena de referência de ganho conhecido:
+#   G(θ) = P(θ) + L_cabo(f) - P_ref(f) + G_ref(f)                                                  [dBi]
+#   P(θ)      potência medida com a antena sob teste (dBm);
+#   L_cabo    perdas de cabos, atenuadores e junta rotativa entre a antena sob teste e o receptor que
+#             não estavam no caminho da medida de referência (dB, positivo; tabela opcional);
+#   P_ref     potência recebida com a antena de referência no lugar da antena sob teste (dBm);
+#   G_ref     ganho da antena de referência (dBi, tabela do fabricante).
+# Cada tabela é (frequência em Hz, valor) e é interpolada linearmente na frequência da varredura; fora
+# da faixa de uma tabela é erro (não há extrapolação).
+#
+# Nenhum termo depende do ângulo: um perfil se reduz a um deslocamento (dB) por frequência, somado ao
+# vetor inteiro de potências. Os deslocamentos ficam em cache por frequência, e offsets() calcula os de
+# muitas frequências em uma só chamada (recalibrar centenas de varreduras salvas é uma operação vetorial).
+#
+# Os perfis são CSVs em um diretório (CalibrationStore), editáveis em planilhas:
+#   frequency_hz,cable_loss_db,reference_gain_dbi,reference_power_dbm
+# Uma célula vazia indica que aquela tabela não tem ponto naquela frequência.
+# No aparelho, o diretório do CalibrationStore é privado do app: os perfis entram pelo botão "Importar" do
+# popup de detalhes do gráfico, que escolhe o CSV no armazenamento compartilhado (ex.: a pasta Download,
+# para onde ele foi copiado por USB ou baixado), valida as tabelas e grava uma cópia (import_csv).
+import csv
+import os
+import threading
+
+import numpy as np # type: ignore
+
+PROFILE_EXT = '.csv'
+PROFILE_COLUMNS = ('frequency_hz', 'cable_loss_db', 'reference_gain_dbi', 'reference_power_dbm')
+GAIN_UNIT = 'dBi'
+
+
+def _table(frequencies, values, name):
+    """Tabela (frequências crescentes, valores) validada para np.interp."""
+    frequencies = np.asarray(frequencies, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if frequencies.shape != values.shape or frequencies.ndim != 1:
+        raise ValueError(f"Tabela '{name}' com colunas de tamanhos diferentes.")
+    order = np.argsort(frequencies, kind='stable')
+    frequencies, values = frequencies[order], values[order]
+    if len(frequencies) > 1 and np.any(np.diff(frequencies) == 0):
+        raise ValueError(f"Tabela '{name}' com frequência repetida.")
+    if not np.all(np.isfinite(frequencies)) or not np.all(np.isfinite(values)):
+        raise ValueError(f"Tabela '{name}' com valor inválido.")
+    return frequencies, values
+
+
+def _interpolate(table, frequencies, name):
+    table_frequencies, values = table
+    if not len(table_frequencies):
+        raise ValueError(f"Tabela '{name}' vazia.")
+    outside = (frequencies < table_frequencies[0]) | (frequencies > table_frequencies[-1]) | np.isnan(frequencies)
+    if np.any(outside):
+        frequency = frequencies[np.argmax(outside)]
+        raise ValueError(f"Frequência {frequency / 1e6:.3f} MHz fora da tabela '{name}' "
+                         f"({table_frequencies[0] / 1e6:.3f} a {table_frequencies[-1] / 1e6:.3f} MHz).")
+    return np.interp(frequencies, table_frequencies, values)
+
+
+class CalibrationProfile:
+    """
+    Perfil de calibração: tabelas de perda do cabo (opcional), ganho e potência recebida da antena de
+    referência. offset(f) é o valor (dB) que, somado às potências em dBm, dá o ganho em dBi.
+    """
+
+    def __init__(self, name, reference_gain, reference_power, cable_loss=None):
+        self.name = name
+        self.reference_gain = _table(*reference_gain, 'reference_gain_dbi')
+        self.reference_power = _table(*reference_power, 'reference_power_dbm')
+        self.cable_loss = None if cable_loss is None else _table(*cable_loss, 'cable_loss_db')
+        self._offsets = {} # frequência (Hz) -> deslocamento (dB)
+        self._lock = threading.Lock()
+
+    def offsets(self, frequencies):
+        """Deslocamentos (dB) de um vetor de frequências (Hz), calculando de uma vez só os que faltam no cache."""
+        frequencies = np.asarray(frequencies, dtype=float)
+        with self._lock:
+            unique = np.unique(frequencies)
+            missing = np.array([f for f in unique.tolist() if f not in self._offsets])
+            if len(missing):
+                computed = (_interpolate(self.reference_gain, missing, 'reference_gain_dbi')
+                            - _interpolate(self.reference_power, missing, 'reference_power_dbm'))
+                if self.cable_loss is not None:
+                    computed += _interpolate(self.cable_loss, missing, 'cable_loss_db')
+                self._offsets.update(zip(missing.tolist(), computed.tolist()))
+            table = np.array([self._offsets[f] for f in unique.tolist()])
+        return table[np.searchsorted(unique, frequencies)]
+
+    def offset(self, frequency):
+        """Deslocamento (dB) na frequência (Hz); ValueError se ela estiver fora de alguma tabela."""
+        cached = self._offsets.get(float(frequency))
+        if cached is not None:
+            return cached
+        return float(self.offsets([frequency])[0])
+
+    def apply(self, powers, frequencies):
+        """
+        Ganhos em dBi das potências (dBm). 'powers' pode ser um vetor (uma varredura, 'frequencies' escalar)
+        ou uma matriz varreduras x ângulos com uma frequência por linha.
+        """
+        powers = np.asarray(powers, dtype=float)
+        if np.ndim(frequencies) == 0:
+            return powers + self.offset(frequencies)
+        return powers + self.offsets(frequencies)[:, None]
+
+    # ----------------------------------------------- CSV -----------------------------------------------------
+    @classmethod
+    def read_csv(cls, path, name=None):
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        columns = {column: ([], []) for column in PROFILE_COLUMNS[1:]}
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            if not reader.fieldnames or PROFILE_COLUMNS[0] not in reader.fieldnames:
+                raise ValueError(f"Perfil '{name}' sem a coluna {PROFILE_COLUMNS[0]}.")
+            for row in reader:
+                frequency = float(row[PROFILE_COLUMNS[0]])
+                for column, (frequencies, values) in columns.items():
+                    cell = (row.get(column) or '').strip()
+                    if cell:
+                        frequencies.append(frequency)
+                        values.append(float(cell))
+        cable_loss = columns['cable_loss_db'] if columns['cable_loss_db'][0] else None
+        return cls(name, columns['reference_gain_dbi'], columns['reference_power_dbm'], cable_loss)
+
+    def write_csv(self, path):
+        tables = [self.cable_loss, self.reference_gain, self.reference_power]
+        rows = {}
+        for column, table in enumerate(tables):
+            if table is None:
+                continue
+            for frequency, value in zip(*(array.tolist() for array in table)):
+                rows.setdefault(frequency, [''] * len(tables))[column] = value
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(PROFILE_COLUMNS)
+            for frequency in sorted(rows):
+                writer.writerow([frequency] + rows[frequency])
+        return path
+
+
+class CalibrationStore:
+    """Perfis de calibração salvos como CSV em 'root'; cada perfil lido fica em cache até o arquivo mudar."""
+
+    def __init__(self, root):
+        self.root = root
+        self._profiles = {} # nome -> (mtime do arquivo, CalibrationProfile)
+
+    def _path(self, name):
+        return os.path.join(self.root, name + PROFILE_EXT)
+
+    def list(self):
+        """Nomes dos perfis disponíveis, em ordem alfabética."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(os.path.splitext(entry)[0] for entry in os.listdir(self.root) if entry.endswith(PROFILE_EXT))
+
+    def get(self, name):
+        path = self._path(name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            raise KeyError(f"Perfil de calibração '{name}' não encontrado.")
+        cached = self._profiles.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        profile = CalibrationProfile.read_csv(path, name)
+        self._profiles[name] = (mtime, profile)
+        return profile
+
+    def save(self, profile):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(profile.name)
+        partial = path + '.tmp'
+        profile.write_csv(partial)
+        os.replace(partial, path)
+        self._profiles.pop(profile.name, None)
+        return path
+
+    def import_csv(self, path, name=None):
+        """
+        Lê e valida o CSV em 'path' (fora do diretório do store) e o grava como perfil 'name' (padrão: o
+        nome do arquivo), substituindo um perfil de mesmo nome. ValueError se o arquivo for inválido.
+        """
+        profile = CalibrationProfile.read_csv(path, name)
+        self.save(profile)
+        return profile
+
+    def delete(self, name):
+        self._profiles.pop(name, None)
+        path = self._path(name)
+        if os.path.exists(path):
+            os.remove(path)
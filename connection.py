@@ -0,0 +1,421 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                   GERENCIADOR DA CONEXÃO COM A ESP32
+# -------------------------------------------------------------------------------------------------------------
+# Mantém a conexão (qualquer transport.Transport) viva durante a sessão:
+#   - keepalive: sem tráfego por KEEPALIVE_INTERVAL, envia uma consulta (&Q000) ou &R000;
+#   - queda detectada pelo fim/erro do stream ou por comando sem 'OK' dentro do prazo
+#     (LINK_TIMEOUT mais o tempo estimado do motor);
+#   - reconexão com espera exponencial (BACKOFF_INITIAL, dobrando até BACKOFF_MAX);
+#   - comandos numerados (protocol.py): após reconectar, a consulta informa o último número executado
+#     e a posição real; os comandos que ficaram sem confirmação são retransmitidos com o mesmo número
+#     (a ESP32 não repete o que já executou), então nada se perde nem é duplicado; se algum foi
+#     executado mas a confirmação se perdeu, epoch é incrementado para quem esperava por ela;
+#   - com firmware sem números de sequência, os comandos sem confirmação são descartados (epoch é
+#     incrementado para quem espera por eles) e a posição volta à última confirmada.
+#
+# As respostas que interessam ao app (OK e P: dos comandos dele, ERR:) seguem para a fila 'replies',
+# como antes; as do keepalive e da consulta ficam aqui.
+import threading
+import time
+from collections import deque
+
+from bluetooth_io import BluetoothReceiver, CommandWriter, RTT_SPAN
+from motion import MOTOR_TIME_PER_DEGREE # Usado no prazo dos movimentos longos
+from protocol import (REPLY_ACK, REPLY_ERROR, REPLY_POWER, REPLY_POSITION, REPLY_ELEVATION, REPLY_SEQUENCE,
+                      QUERY_COMMAND, format_command, move_delta)
+from tracing import tracer
+
+STATE_DISCONNECTED = "desconectado"
+STATE_CONNECTING = "conectando"
+STATE_CONNECTED = "conectado"
+STATE_RECONNECTING = "reconectando"
+
+KEEPALIVE_INTERVAL = 2.0 # Sem tráfego por este tempo (s), envia um keepalive
+LINK_TIMEOUT = 3.0 # Prazo (s) para o 'OK' de um comando, além do tempo estimado do motor
+HANDSHAKE_TIMEOUT = 1.5 # Espera (s) pela resposta da consulta logo após conectar
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 10.0
+MAX_RECONNECT_ATTEMPTS = 30 # Tentativas seguidas antes de desistir (None = para sempre)
+SUPERVISE_INTERVAL = 0.2
+
+
+class LinkLost(Exception):
+    """O enlace com a ESP32 caiu (fim do stream, erro de escrita ou comando sem resposta)."""
+
+
+class _KeepAlive:
+    """Item da fila do CommandWriter que vira o comando de keepalive."""
+
+
+_KEEPALIVE = _KeepAlive()
+
+
+class _InFlight:
+    __slots__ = ('seq', 'direction', 'steps', 'keepalive')
+
+    def __init__(self, seq, direction, steps, keepalive=False):
+        self.seq = seq
+        self.direction = direction
+        self.steps = steps
+        self.keepalive = keepalive
+
+
+class _ReplyTap:
+    """Fila de destino do BluetoothReceiver: entrega cada resposta ao gerenciador."""
+
+    def __init__(self, manager, link_id):
+        self._manager = manager
+        self._link_id = link_id
+
+    def put(self, reply):
+        self._manager._on_reply(reply, self._link_id)
+
+
+class _LinkOutput:
+    """Stream de saída de um enlace: uma falha de escrita derruba aquele enlace (e não um mais novo)."""
+
+    def __init__(self, manager, output_stream, link_id):
+        self._manager = manager
+        self._output_stream = output_stream
+        self._link_id = link_id
+
+    def write(self, data):
+        try:
+            self._output_stream.write(data)
+        except Exception as e:
+            self._manager._lose_link(self._link_id, e)
+            raise
+
+    def flush(self):
+        try:
+            self._output_stream.flush()
+        except Exception as e:
+            self._manager._lose_link(self._link_id, e)
+            raise
+
+
+class ConnectionManager:
+    """
+    Conecta, supervisiona e reconecta um transporte, mantendo um único CommandWriter durante toda a
+    sessão (a fila é pausada enquanto não há conexão, e nada do que foi enfileirado se perde).
+
+    Callbacks (chamados fora da thread da interface):
+      on_state(estado)            mudança de estado (STATE_*)
+      on_error(exceção)           falha na primeira conexão ou desistência após MAX_RECONNECT_ATTEMPTS
+      on_position(az, el)         posição ressincronizada após reconexão ou divergência no keepalive,
+                                  já contando os comandos que ainda serão executados
+      on_depth(profundidade)      repassado ao CommandWriter
+    """
+
+    def __init__(self, transport, replies, position=(0, 0), on_state=None, on_error=None, on_position=None,
+                 on_depth=None, keepalive_interval=KEEPALIVE_INTERVAL, link_timeout=LINK_TIMEOUT,
+                 backoff_initial=BACKOFF_INITIAL, backoff_max=BACKOFF_MAX, max_attempts=MAX_RECONNECT_ATTEMPTS):
+        self.transport = transport
+        self.replies = replies
+        self.position = (int(position[0]), int(position[1])) # Última posição confirmada pela ESP32
+        self.on_state = on_state
+        self.on_error = on_error
+        self.on_position = on_position
+        self.keepalive_interval = keepalive_interval
+        self.link_timeout = link_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.max_attempts = max_attempts
+
+        self.state = STATE_DISCONNECTED
+        self.sequenced = False # A ESP32 respondeu SEQ: na consulta (suporta números de sequência)
+        self.connected = threading.Event()
+        self.closed = threading.Event() # Sessão encerrada (close() ou desistência): não haverá reconexão
+        self.epoch = 0 # Incrementado quando comandos sem confirmação são descartados
+        self.reconnections = 0
+        self.established = False # A primeira conexão já foi feita (falhas seguintes são quedas do enlace)
+
+        self._lock = threading.RLock()
+        self._inflight = deque()
+        self._next_seq = 1
+        self._swallow_power = 0 # Leituras 'P:' que respondem a keepalives
+        self._query = None # Respostas da consulta em andamento: {'az', 'el', 'seq'}
+        self._query_done = threading.Event()
+        self._link_id = 0
+        self._last_activity = time.monotonic()
+        self._last_ack = time.monotonic()
+        self._link_lost = threading.Event()
+        self._lost_reason = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Falhas de escrita são tratadas em _LinkOutput; o lote perdido continua em _inflight
+        self.writer = CommandWriter(None, on_depth=on_depth, formatter=self._format_item)
+        self.writer.pause()
+
+    @property
+    def name(self):
+        return self.transport.name
+
+    # ------------------------------------------------- API ---------------------------------------------------
+    def start(self):
+        self.writer.start()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Encerra a sessão: para a supervisão, o envio e fecha o transporte."""
+        self._stop_event.set()
+        self._link_lost.set()
+        self.writer.stop()
+        self.connected.clear()
+        self.closed.set()
+        try:
+            self.transport.close()
+        except Exception:
+            pass
+
+    def submit(self, data, block=False, timeout=None):
+        return self.writer.submit(data, block, timeout)
+
+    def submit_move(self, direction, steps, coalesce=True, block=False, timeout=None):
+        return self.writer.submit_move(direction, steps, coalesce, block, timeout)
+
+    def wait_connected(self, timeout=None):
+        return self.connected.wait(timeout)
+
+    # ------------------------------------------- Conexão e reconexão -----------------------------------------
+    def _set_state(self, state):
+        self.state = state
+        if self.on_state:
+            self.on_state(state)
+
+    def _run(self):
+        try:
+            self._connect_loop()
+        finally:
+            self.closed.set()
+
+    def _connect_loop(self):
+        first = True
+        attempt = 0
+        while not self._stop_event.is_set():
+            self._set_state(STATE_CONNECTING if first else STATE_RECONNECTING)
+            try:
+                self._open_link(first)
+            except Exception as e:
+                self._close_transport()
+                if first or (self.max_attempts is not None and attempt + 1 >= self.max_attempts):
+                    self._set_state(STATE_DISCONNECTED)
+                    if self.on_error and not self._stop_event.is_set():
+                        self.on_error(e)
+                    self.writer.stop()
+                    return
+                delay = min(self.backoff_max, self.backoff_initial * 2 ** attempt)
+                attempt += 1
+                self._stop_event.wait(delay)
+                continue
+
+            if not first:
+                self.reconnections += 1
+            first = False
+            self.established = True
+            attempt = 0
+            self._set_state(STATE_CONNECTED)
+            self._supervise()
+            self.connected.clear()
+            self.writer.pause()
+            self._close_transport()
+        self._set_state(STATE_DISCONNECTED)
+
+    def _open_link(self, first):
+        self.transport.connect()
+        with self._lock:
+            self._link_id += 1
+            link_id = self._link_id
+            self._link_lost.clear()
+            self._lost_reason = None
+            self._swallow_power = 0
+        receiver = BluetoothReceiver(self.transport.input_stream(), _ReplyTap(self, link_id))
+        threading.Thread(target=self._read, args=(receiver, link_id), daemon=True).start()
+        output_stream = _LinkOutput(self, self.transport.output_stream(), link_id)
+
+        status = self._handshake(output_stream)
+        resend, target = self._resync(status, first)
+        if resend: # Retransmitidos antes de liberar a fila, na ordem original e com os mesmos números
+            for _ in resend:
+                tracer.begin(RTT_SPAN)
+            output_stream.write(''.join(format_command(c.direction, c.steps, c.seq) for c in resend).encode('utf-8'))
+            output_stream.flush()
+        self._last_activity = self._last_ack = time.monotonic()
+        self.connected.set()
+        self.writer.resume(output_stream)
+        if target is not None and self.on_position:
+            self.on_position(*target)
+
+    def _read(self, receiver, link_id):
+        try:
+            receiver.run()
+        except Exception as e:
+            self._lose_link(link_id, e)
+
+    def _handshake(self, output_stream):
+        """Consulta posição e último número executado. Devolve o dicionário da resposta (vazio se não houver)."""
+        with self._lock:
+            self._query = {}
+            self._query_done.clear()
+        # Os 'OK' dos comandos enviados no enlace anterior não chegam mais: cada intervalo aberto de ida e
+        # volta tem que corresponder a um comando escrito neste enlace, começando pela consulta
+        tracer.discard(RTT_SPAN)
+        tracer.begin(RTT_SPAN)
+        output_stream.write(format_command(QUERY_COMMAND, 0).encode('utf-8'))
+        output_stream.flush()
+        self._query_done.wait(HANDSHAKE_TIMEOUT)
+        if self._link_lost.is_set():
+            raise LinkLost(self._lost_reason or "Conexão perdida durante a consulta.")
+        with self._lock:
+            status, self._query = self._query, None
+        return status
+
+    def _resync(self, status, first):
+        """
+        Ajusta a fila de comandos sem confirmação e a posição após (re)conectar.
+        Devolve (comandos a retransmitir, posição esperada para a interface ou None).
+        """
+        with self._lock:
+            inflight = [c for c in self._inflight if not c.keepalive]
+            self._inflight.clear()
+            self.sequenced = 'seq' in status
+            if self.sequenced:
+                last = status['seq']
+                if first:
+                    self._next_seq = max(self._next_seq, last + 1)
+                resend = [c for c in inflight if c.seq is not None and c.seq > last]
+                self._inflight.extend(resend)
+                if len(resend) < len(inflight):
+                    self.epoch += 1 # Executados durante a queda: a confirmação deles não vai chegar
+                self.position = (status.get('az', self.position[0]), status.get('el', self.position[1]))
+            else:
+                resend = []
+                if inflight:
+                    self.epoch += 1 # Quem esperava por esses comandos deve reenviá-los
+            if not self.sequenced and not inflight and first:
+                return resend, None # Sem informação nova sobre a posição
+            az, el = self.position
+            for direction, steps in [(c.direction, c.steps) for c in resend] + self.writer.pending_moves():
+                d_az, d_el = move_delta(direction, steps)
+                az += d_az
+                el += d_el
+            return resend, (az, el)
+
+    def _close_transport(self):
+        try:
+            self.transport.close()
+        except Exception:
+            pass
+
+    def _lose_link(self, link_id, reason):
+        with self._lock:
+            if link_id != self._link_id or self._link_lost.is_set():
+                return
+            self._lost_reason = reason
+            self._link_lost.set()
+        self._query_done.set()
+
+    # ---------------------------------------------- Supervisão -----------------------------------------------
+    def _supervise(self):
+        """Keepalive e prazo das confirmações até o enlace cair ou a sessão ser encerrada."""
+        link_id = self._link_id
+        while not self._stop_event.is_set() and not self._link_lost.wait(SUPERVISE_INTERVAL):
+            now = time.monotonic()
+            with self._lock:
+                head = self._inflight[0] if self._inflight else None
+                idle = head is None and self.writer.depth == 0
+            if head is not None:
+                deadline = self.link_timeout + head.steps * MOTOR_TIME_PER_DEGREE
+                if now - self._last_ack > deadline:
+                    self._lose_link(link_id, LinkLost("Sem resposta da ESP32."))
+            elif idle and now - self._last_activity > self.keepalive_interval:
+                self._last_ack = now # O prazo do keepalive conta a partir do envio
+                self.writer.submit(_KEEPALIVE)
+
+    def _format_item(self, item):
+        """Formatter do CommandWriter: numera e registra cada comando enviado."""
+        if isinstance(item, str):
+            return item
+        with self._lock:
+            seq = self._next_seq if self.sequenced else None
+            if seq is not None:
+                self._next_seq += 1
+            if item is _KEEPALIVE:
+                direction = QUERY_COMMAND if self.sequenced else 'R'
+                command = _InFlight(seq, direction, 0, keepalive=True)
+            else:
+                command = _InFlight(seq, item[0], item[1])
+            if not self._inflight:
+                self._last_ack = time.monotonic() # O prazo do primeiro comando começa no envio
+            self._inflight.append(command)
+            self._last_activity = time.monotonic()
+        return format_command(command.direction, command.steps, seq)
+
+    # ----------------------------------------------- Respostas -----------------------------------------------
+    def _retire(self, seq):
+        """Retira da fila o comando confirmado (pelo número ou, sem número, o mais antigo)."""
+        if seq is None:
+            return self._inflight.popleft() if self._inflight else None
+        if not any(c.seq == seq for c in self._inflight):
+            return None # Confirmação repetida de um comando já retirado
+        while True: # A ESP32 executa em ordem: os anteriores também foram executados
+            command = self._inflight.popleft()
+            if command.seq == seq:
+                return command
+            self._apply(command)
+
+    def _apply(self, command):
+        d_az, d_el = move_delta(command.direction, command.steps)
+        self.position = (self.position[0] + d_az, self.position[1] + d_el)
+
+    def _on_reply(self, reply, link_id):
+        forward = True
+        resync = None
+        with self._lock:
+            if link_id != self._link_id:
+                return
+            self._last_activity = time.monotonic()
+            if self._query is not None: # Consulta do handshake
+                if reply.kind == REPLY_POSITION:
+                    self._query['az'] = reply.value
+                elif reply.kind == REPLY_ELEVATION:
+                    self._query['el'] = reply.value
+                elif reply.kind == REPLY_SEQUENCE:
+                    self._query['seq'] = reply.value
+                elif reply.kind in (REPLY_ACK, REPLY_ERROR):
+                    self._query_done.set()
+                return
+
+            if reply.kind in (REPLY_ACK, REPLY_ERROR):
+                command = self._retire(reply.seq)
+                self._last_ack = time.monotonic()
+                if command is None:
+                    forward = reply.seq is None # Confirmação duplicada: não chega ao app
+                elif command.keepalive:
+                    forward = False
+                    if reply.kind == REPLY_ACK and command.direction != QUERY_COMMAND:
+                        self._swallow_power += 1 # &R000 também devolve uma leitura
+                elif reply.kind == REPLY_ACK:
+                    self._apply(command)
+            elif reply.kind == REPLY_POWER and self._swallow_power:
+                self._swallow_power -= 1
+                forward = False
+            elif reply.kind in (REPLY_POSITION, REPLY_ELEVATION, REPLY_SEQUENCE):
+                forward = False # Respostas do keepalive (&Q000): confere a posição
+                if reply.kind != REPLY_SEQUENCE and not any(not c.keepalive for c in self._inflight):
+                    az, el = self.position
+                    actual = (reply.value, el) if reply.kind == REPLY_POSITION else (az, reply.value)
+                    if actual != self.position:
+                        self.position = actual
+                        resync = actual
+        if forward:
+            self.replies.put(reply)
+        if resync is not None and self.on_position:
+            pending = self.writer.pending_moves()
+            az, el = resync
+            for direction, steps in pending:
+                d_az, d_el = move_delta(direction, steps)
+                az += d_az
+                el += d_el
+            self.on_position(az, el)
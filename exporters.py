@@ -0,0 +1,149 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                  EXPORTAÇÃO DOS DADOS BRUTOS E DAS FIGURAS
+# -------------------------------------------------------------------------------------------------------------
+# Os dados são gravados linha a linha direto no arquivo (sem montar o conteúdo inteiro em uma
+# string). Uma exportação pode gerar vários formatos de uma vez; as figuras (png/pdf) saem de uma
+# única renderização (rendering.render_to_files).
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+
+import numpy as np # type: ignore
+
+from rendering import render_to_files, EXPORT_DPI
+
+IMAGE_FORMATS = ('png', 'pdf')
+DATA_FORMATS = ('csv', 'npz', 'jsonl')
+EXPORT_FORMATS = IMAGE_FORMATS + DATA_FORMATS
+
+# Cópia dos dados medidos feita na thread da interface (ganhos normalizados em dB, potências em dBm).
+# Com calibração, 'gains_dbi' traz o ganho absoluto e 'calibration' o nome do perfil (senão ambos None)
+ExportData = namedtuple('ExportData', ['title', 'frequency', 'angles', 'powers', 'counts', 'stds', 'gains', 'metrics', 'created_at',
+                                       'gains_dbi', 'calibration'], defaults=(None, None))
+# Células medidas de uma varredura 2D (potências em dBm, ganhos normalizados pela célula de maior potência)
+GridExportData = namedtuple('GridExportData', ['title', 'frequency', 'azimuths', 'elevations', 'powers', 'counts',
+                                               'stds', 'gains', 'created_at', 'az_step', 'el_step'])
+
+
+def export_data(pattern, title, frequency, metrics=None, gain_offset=None, calibration=None):
+    """
+    Copia do pattern.RadiationPattern tudo o que as exportações de dados precisam. 'gain_offset' (dB)
+    é o deslocamento do perfil de calibração 'calibration' na frequência da varredura.
+    """
+    store = pattern.store
+    angles, gains = pattern.gains()
+    powers = np.array(store.powers())
+    gains_dbi = None if gain_offset is None else powers + gain_offset
+    return ExportData(title, frequency, np.array(angles), powers, np.array(store.counts()),
+                      np.array(store.stds()), np.array(gains), metrics, time.time(), gains_dbi, calibration)
+
+
+def grid_export_data(grid, title, frequency):
+    """Copia as células medidas de um grid_store.GridStore para as exportações de dados."""
+    azimuths, elevations, powers, counts, stds = grid.cells()
+    gains = powers - powers.max() if len(powers) else powers
+    return GridExportData(title, frequency, azimuths, elevations, powers, counts, stds, gains, time.time(),
+                          grid.az_step, grid.el_step)
+
+
+def _metadata(data):
+    metadata = {
+        'title': data.title,
+        'frequency': data.frequency,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(data.created_at)),
+        'n_points': len(data.powers),
+    }
+    if isinstance(data, GridExportData):
+        metadata['az_step'] = data.az_step
+        metadata['el_step'] = data.el_step
+        return metadata
+    if data.calibration is not None:
+        metadata['calibration'] = data.calibration
+    if data.metrics is not None:
+        metadata['metrics'] = {name: (None if np.isnan(value) else round(float(value), 4))
+                               for name, value in data.metrics._asdict().items()}
+    return metadata
+
+
+def _vectors(data):
+    """
+    Colunas e vetores na ordem do arquivo: angle, power, count, std, gain e, com calibração, gain_dbi;
+    na grade 2D, azimuth e elevation no lugar de angle.
+    """
+    if isinstance(data, GridExportData):
+        vectors = dict(azimuth=data.azimuths, elevation=data.elevations)
+    else:
+        vectors = dict(angle=data.angles)
+    vectors.update(power=data.powers, count=data.counts, std=data.stds, gain=data.gains)
+    if getattr(data, 'gains_dbi', None) is not None:
+        vectors['gain_dbi'] = data.gains_dbi
+    return vectors
+
+
+def _rows(vectors):
+    """Uma tupla por ponto, com None no desvio onde há uma só leitura."""
+    std_column = list(vectors).index('std')
+    for row in zip(*(vector.tolist() for vector in vectors.values())):
+        std = row[std_column]
+        yield row[:std_column] + ((None if std != std else std),) + row[std_column + 1:]
+
+
+def write_csv(path, data):
+    """
+    CSV simples (cabeçalho angle,power,count,std,gain[,gain_dbi], ou azimuth,elevation,... na grade 2D),
+    legível por planilhas e pelo batch.py.
+    """
+    vectors = _vectors(data)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(vectors)
+        for row in _rows(vectors):
+            writer.writerow(row) # std vazio onde há uma só leitura
+    return path
+
+
+def write_jsonl(path, data):
+    """JSON Lines: a primeira linha traz os metadados (e as métricas); depois, um objeto por ângulo ou célula."""
+    vectors = _vectors(data)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(_metadata(data), ensure_ascii=False) + "\n")
+        for row in _rows(vectors):
+            f.write(json.dumps(dict(zip(vectors, row))) + "\n")
+    return path
+
+
+def write_npz(path, data):
+    """NPZ compactado; cada vetor é comprimido direto para o arquivo zip, e os metadados vão em 'metadata' (JSON)."""
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, metadata=np.array(json.dumps(_metadata(data), ensure_ascii=False)), **_vectors(data))
+    return path
+
+
+_DATA_WRITERS = {'csv': write_csv, 'npz': write_npz, 'jsonl': write_jsonl}
+
+
+def split_format(filename):
+    """Separa 'nome.ext' em ('nome', 'ext') se a extensão for um formato de exportação."""
+    base, ext = os.path.splitext(filename)
+    ext = ext[1:].lower()
+    if ext in EXPORT_FORMATS:
+        return base, ext
+    return filename, None
+
+
+def export_all(base_path, formats, spec=None, data=None, cache=None):
+    """
+    Grava base_path.<formato> para cada formato pedido e devolve a lista de arquivos gerados
+    ('cache': render_cache.RenderCache para as figuras).
+    """
+    images = [(f"{base_path}.{fmt}", fmt, EXPORT_DPI if fmt == 'png' else None)
+              for fmt in formats if fmt in IMAGE_FORMATS]
+    outputs = []
+    if images:
+        outputs.extend(render_to_files(spec, images, cache))
+    for fmt in formats:
+        if fmt in _DATA_WRITERS:
+            outputs.append(_DATA_WRITERS[fmt](f"{base_path}.{fmt}", data))
+    return outputs
@@ -0,0 +1,144 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                 MEDIDAS EM GRADE (AZIMUTE x ELEVAÇÃO)
+# -------------------------------------------------------------------------------------------------------------
+import numpy as np # type: ignore
+
+from protocol import ELEVATION_LIMITS
+from sample_stats import mean_std
+
+DEFAULT_AZ_STEP = 5.0
+DEFAULT_EL_STEP = 5.0
+EL_MIN, EL_MAX = (float(limit) for limit in ELEVATION_LIMITS)
+
+
+class GridStore:
+    """
+    Potências medidas em uma grade regular (elevação x azimute), guardadas em matrizes NumPy
+    pré-alocadas. A grade é esparsa: só as células medidas são válidas, e as demais aparecem
+    como NaN em means(). Cada célula acumula amostras com média e variância por Welford,
+    como o MeasurementStore faz por ângulo.
+    """
+
+    def __init__(self, az_step=DEFAULT_AZ_STEP, el_step=DEFAULT_EL_STEP, el_min=EL_MIN, el_max=EL_MAX):
+        if az_step <= 0 or el_step <= 0:
+            raise ValueError("Os passos da grade devem ser maiores que zero.")
+        self.az_step = float(az_step)
+        self.el_step = float(el_step)
+        self.el_min = float(el_min)
+        self.azimuths = np.arange(int(round(360.0 / self.az_step))) * self.az_step # 0° a 360° - passo (360° = 0°)
+        self.elevations = self.el_min + np.arange(int(round((el_max - el_min) / self.el_step)) + 1) * self.el_step
+        shape = (len(self.elevations), len(self.azimuths))
+        self._mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+        self._count = np.zeros(shape, dtype=np.int32)
+        self._valid = np.zeros(shape, dtype=bool)
+        self._size = 0
+        self.version = 0
+
+    def __len__(self):
+        return self._size
+
+    def index(self, azimuth, elevation):
+        """(linha, coluna) da célula que contém o ponto."""
+        column = int(round(float(azimuth) % 360.0 / self.az_step)) % len(self.azimuths)
+        row = int(round((float(elevation) - self.el_min) / self.el_step))
+        if not 0 <= row < len(self.elevations):
+            raise ValueError(f"Elevação fora da faixa: {elevation}°")
+        return row, column
+
+    def _mark_valid(self, cell, existed):
+        if not existed:
+            self._valid[cell] = True
+            self._size += 1
+        self.version += 1
+
+    def add_sample(self, azimuth, elevation, power):
+        """Acumula mais uma amostra na célula. Retorna True se ela já tinha amostras."""
+        cell = self.index(azimuth, elevation)
+        existed = bool(self._valid[cell])
+        count = self._count[cell] + 1
+        delta = power - self._mean[cell]
+        self._mean[cell] += delta / count
+        self._m2[cell] += delta * (power - self._mean[cell])
+        self._count[cell] = count
+        self._mark_valid(cell, existed)
+        return existed
+
+    def set_samples(self, azimuth, elevation, samples):
+        """Substitui a célula pelas amostras dadas. Retorna True se ela já tinha amostras."""
+        cell = self.index(azimuth, elevation)
+        existed = bool(self._valid[cell])
+        mean, std = mean_std(samples)
+        self._mean[cell] = mean
+        self._m2[cell] = std * std * (len(samples) - 1)
+        self._count[cell] = len(samples)
+        self._mark_valid(cell, existed)
+        return existed
+
+    def clear(self):
+        self._mean[:] = 0.0
+        self._m2[:] = 0.0
+        self._count[:] = 0
+        self._valid[:] = False
+        self._size = 0
+        self.version += 1
+
+    def means(self):
+        """Matriz (elevação x azimute) das potências médias, com NaN nas células não medidas."""
+        return np.where(self._valid, self._mean, np.nan)
+
+    def counts(self):
+        return self._count.copy()
+
+    def stds(self):
+        """Matriz dos desvios-padrão amostrais, com NaN onde há menos de duas amostras."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self._count > 1, np.sqrt(self._m2 / (self._count - 1)), np.nan)
+
+    def cells(self):
+        """Células medidas, em ordem (elevação, azimute): (azimutes, elevações, médias, contagens, desvios)."""
+        rows, columns = np.nonzero(self._valid)
+        return (self.azimuths[columns], self.elevations[rows], self._mean[rows, columns],
+                self._count[rows, columns], self.stds()[rows, columns])
+
+    def load_cells(self, azimuths, elevations, means, counts, stds=None):
+        """Substitui a grade pelas células dadas (o inverso de cells(); desvio NaN = uma só amostra)."""
+        self.clear()
+        counts = np.asarray(counts, dtype=np.int32)
+        stds = np.full(len(counts), np.nan) if stds is None else np.asarray(stds, dtype=float)
+        for azimuth, elevation, mean, count, std in zip(np.asarray(azimuths).tolist(), np.asarray(elevations).tolist(),
+                                                        np.asarray(means).tolist(), counts.tolist(), stds.tolist()):
+            cell = self.index(azimuth, elevation)
+            self._mean[cell] = mean
+            self._m2[cell] = 0.0 if count < 2 or std != std else std * std * (count - 1)
+            self._count[cell] = count
+            if not self._valid[cell]:
+                self._valid[cell] = True
+                self._size += 1
+        self.version += 1
+
+    def peak(self):
+        """(azimute, elevação, potência) da célula de maior potência, ou None se a grade estiver vazia."""
+        if not self._size:
+            return None
+        row, column = np.unravel_index(np.nanargmax(self.means()), self._valid.shape)
+        return float(self.azimuths[column]), float(self.elevations[row]), float(self._mean[row, column])
+
+    def gains(self):
+        """Matriz de ganhos normalizados (dB) em relação à célula de maior potência."""
+        means = self.means()
+        if not self._size:
+            return means
+        return means - np.nanmax(means)
+
+    def azimuth_cut(self, elevation):
+        """Corte no plano de azimute: (azimutes, ganhos normalizados) medidos na elevação dada."""
+        row, _ = self.index(0.0, elevation)
+        valid = self._valid[row]
+        return self.azimuths[valid], self.gains()[row, valid]
+
+    def elevation_cut(self, azimuth):
+        """Corte no plano de elevação: (elevações, ganhos normalizados) medidos no azimute dado."""
+        _, column = self.index(azimuth, self.el_min)
+        valid = self._valid[:, column]
+        return self.elevations[valid], self.gains()[valid, column]
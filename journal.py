@@ -0,0 +1,383 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                DIÁRIO DAS MEDIDAS (RECUPERAÇÃO APÓS FALHAS)
+# -------------------------------------------------------------------------------------------------------------
+# Cada medida e cada comando do motor vira um registro binário acrescentado ao fim de um arquivo em
+# user_data_dir. Se o app for encerrado pelo Android (falta de memória) ou travar no meio de uma
+# campanha, a próxima abertura reaplica o diário e recupera as medidas (inclusive as células da varredura
+# 2D) e a posição do motor.
+#
+# Formato: MAGIC e, em seguida, registros [tipo u8][tamanho u32][conteúdo][crc32 u32] (little-endian).
+# Um registro incompleto ou com CRC inválido no fim do arquivo (escrita interrompida) encerra a leitura
+# e é descartado.
+#
+# Quem registra (thread da interface ou da varredura) só acrescenta bytes a um buffer; uma thread de
+# escrita grava o buffer e faz fsync no máximo a cada FLUSH_INTERVAL. A cada COMPACT_RECORDS registros
+# o diário é reescrito como um único retrato do store e da grade (arquivo novo + os.replace), então a leitura na
+# abertura é sempre curta, qualquer que seja o tamanho da sessão.
+#
+# NumPy só é importado para montar ou ler o retrato.
+import os
+import struct
+import threading
+import time
+import zlib
+
+from protocol import move_delta
+
+MAGIC = b'ANTJ\x01'
+FLUSH_INTERVAL = 0.5 # Intervalo máximo (s) entre a medida e o fsync
+COMPACT_RECORDS = 4096 # Registros acumulados antes de reescrever o diário como retrato
+
+REC_MEASURE = 1  # ângulo f8, potência f8, acumular u8
+REC_SAMPLES = 2  # ângulo f8, amostras f8[]
+REC_MOVE = 3     # direção (1 byte), passos u32
+REC_POSITION = 4 # azimute i32, elevação i32 (posição confirmada pela ESP32 ou pela varredura)
+REC_SNAPSHOT = 5 # azimute i32, elevação i32, n u32, ângulos f8[n], potências f8[n], contagens i32[n], desvios f8[n]
+REC_GRID = 6     # passo az f8, passo el f8, azimute f8, elevação f8, amostras f8[]
+REC_GRID_SNAPSHOT = 7 # passo az f8, passo el f8, n u32, azimutes f8[n], elevações f8[n], médias f8[n], contagens i32[n], desvios f8[n]
+
+_HEADER = struct.Struct('<BI')
+_CRC = struct.Struct('<I')
+_MEASURE = struct.Struct('<ddB')
+_ANGLE = struct.Struct('<d')
+_MOVE = struct.Struct('<cI')
+_POSITION = struct.Struct('<ii')
+_SNAPSHOT = struct.Struct('<iiI')
+_GRID = struct.Struct('<dddd')
+_GRID_SNAPSHOT = struct.Struct('<ddI')
+
+
+def _frame(kind, payload):
+    return _HEADER.pack(kind, len(payload)) + payload + _CRC.pack(zlib.crc32(payload))
+
+
+def _snapshot_payload(store, position):
+    import numpy as np # type: ignore
+    angles = store.angles()
+    return b''.join((_SNAPSHOT.pack(position[0], position[1], len(angles)),
+                     np.ascontiguousarray(angles, dtype='<f8').tobytes(),
+                     np.ascontiguousarray(store.powers(), dtype='<f8').tobytes(),
+                     np.ascontiguousarray(store.counts(), dtype='<i4').tobytes(),
+                     np.ascontiguousarray(store.stds(), dtype='<f8').tobytes()))
+
+
+def _load_snapshot(store, payload):
+    import numpy as np # type: ignore
+    az, el, count = _SNAPSHOT.unpack_from(payload)
+    offset = _SNAPSHOT.size
+    arrays = []
+    for dtype in ('<f8', '<f8', '<i4', '<f8'):
+        array = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        offset += array.nbytes
+        arrays.append(array)
+    store.load_arrays(*arrays)
+    return az, el
+
+
+def _grid_snapshot_payload(grid):
+    import numpy as np # type: ignore
+    azimuths, elevations, means, counts, stds = grid.cells()
+    return b''.join((_GRID_SNAPSHOT.pack(grid.az_step, grid.el_step, len(azimuths)),
+                     np.ascontiguousarray(azimuths, dtype='<f8').tobytes(),
+                     np.ascontiguousarray(elevations, dtype='<f8').tobytes(),
+                     np.ascontiguousarray(means, dtype='<f8').tobytes(),
+                     np.ascontiguousarray(counts, dtype='<i4').tobytes(),
+                     np.ascontiguousarray(stds, dtype='<f8').tobytes()))
+
+
+def _load_grid_snapshot(grid, payload):
+    import numpy as np # type: ignore
+    count = _GRID_SNAPSHOT.unpack_from(payload)[2]
+    offset = _GRID_SNAPSHOT.size
+    arrays = []
+    for dtype in ('<f8', '<f8', '<f8', '<i4', '<f8'):
+        array = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        offset += array.nbytes
+        arrays.append(array)
+    grid.load_cells(*arrays)
+
+
+class Journal:
+    """
+    Diário de medidas e movimentos em 'path'. Uso: replay(store) na abertura (aplica o que houver e
+    descarta um fim corrompido), start() e depois os record_*(); close() grava o que falta.
+    'position' acompanha a posição (azimute, elevação) resultante dos comandos registrados, e 'grid'
+    é a grade 2D (grid_store.GridStore) reconstruída pelo replay, ou None se não havia células.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, compact_records=COMPACT_RECORDS, on_error=None):
+        self.path = path
+        self.on_error = on_error # on_error(exceção) na primeira falha de gravação (thread de escrita)
+        self.flush_interval = flush_interval
+        self.compact_records = compact_records
+        self.position = (0, 0)
+        self.grid = None
+        self.records = 0 # Registros desde o último retrato
+        self._valid_length = None # Bytes válidos encontrados pelo replay (o resto é descartado)
+        self._ops = [] # bytes a acrescentar ou ('rewrite', conteúdo) na ordem em que foram pedidos
+        self._cond = threading.Condition()
+        self._generation = 0 # Registros pedidos / já gravados com fsync, para flush() esperar
+        self._written = 0
+        self._urgent = False # flush() pediu gravação imediata
+        self._stopped = False
+        self._thread = None
+        self._file = None # Aberto pela thread de escrita
+        self._failing = False # A última gravação falhou (a falha é informada uma vez, não a cada tentativa)
+
+    # ----------------------------------------------- Leitura -------------------------------------------------
+    @property
+    def empty(self):
+        """True se não há registros a reaplicar (permite pular o replay e o import do NumPy na abertura)."""
+        try:
+            return os.path.getsize(self.path) <= len(MAGIC)
+        except OSError:
+            return True
+
+    def replay(self, store):
+        """
+        Reaplica o diário no store (MeasurementStore) e em self.position. Devolve a quantidade de
+        registros aplicados (0 se não houver diário).
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._valid_length = 0
+            return 0
+        if not data.startswith(MAGIC):
+            self._valid_length = 0
+            return 0
+        view = memoryview(data)
+        offset = len(MAGIC)
+        applied = 0
+        while offset + _HEADER.size <= len(data):
+            kind, length = _HEADER.unpack_from(data, offset)
+            start = offset + _HEADER.size
+            end = start + length + _CRC.size
+            if end > len(data):
+                break # Registro incompleto: a escrita foi interrompida
+            payload = view[start:start + length]
+            if _CRC.unpack_from(data, start + length)[0] != zlib.crc32(payload):
+                break
+            try:
+                self._apply(store, kind, payload)
+            except ValueError:
+                break
+            applied += 1
+            offset = end
+        self._valid_length = offset
+        self.records = applied
+        return applied
+
+    def _apply(self, store, kind, payload):
+        if kind == REC_MEASURE:
+            angle, power, accumulate = _MEASURE.unpack(payload)
+            if accumulate:
+                store.add_sample(angle, power)
+            else:
+                store.set(angle, power)
+        elif kind == REC_SAMPLES:
+            angle = _ANGLE.unpack_from(payload)[0]
+            samples = struct.unpack_from(f'<{(len(payload) - _ANGLE.size) // 8}d', payload, _ANGLE.size)
+            store.set_samples(angle, list(samples))
+        elif kind == REC_MOVE:
+            direction, steps = _MOVE.unpack(payload)
+            d_az, d_el = move_delta(direction.decode('ascii'), steps)
+            self.position = (self.position[0] + d_az, self.position[1] + d_el)
+        elif kind == REC_POSITION:
+            self.position = _POSITION.unpack(payload)
+        elif kind == REC_SNAPSHOT:
+            self.position = _load_snapshot(store, payload)
+        elif kind == REC_GRID:
+            az_step, el_step, azimuth, elevation = _GRID.unpack_from(payload)
+            samples = struct.unpack_from(f'<{(len(payload) - _GRID.size) // 8}d', payload, _GRID.size)
+            self._grid_for(az_step, el_step).set_samples(azimuth, elevation, list(samples))
+        elif kind == REC_GRID_SNAPSHOT:
+            az_step, el_step, _ = _GRID_SNAPSHOT.unpack_from(payload)
+            _load_grid_snapshot(self._grid_for(az_step, el_step), payload)
+        else:
+            raise ValueError(f"Registro desconhecido no diário: {kind}")
+
+    def _grid_for(self, az_step, el_step):
+        """Grade com os passos dados; passos diferentes começam uma grade nova, como em start_raster_sweep."""
+        if self.grid is None or (self.grid.az_step, self.grid.el_step) != (az_step, el_step):
+            from grid_store import GridStore
+            self.grid = GridStore(az_step, el_step)
+        return self.grid
+
+    # ----------------------------------------------- Escrita -------------------------------------------------
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def record_measure(self, angle, power, accumulate=False):
+        self._append(REC_MEASURE, _MEASURE.pack(angle, power, accumulate))
+
+    def record_samples(self, angle, samples):
+        self._append(REC_SAMPLES, _ANGLE.pack(angle) + struct.pack(f'<{len(samples)}d', *samples))
+
+    def record_grid_samples(self, grid, azimuth, elevation, samples):
+        """Leituras de uma célula da grade (com os passos dela, para o replay recriar a grade)."""
+        self._append(REC_GRID, _GRID.pack(grid.az_step, grid.el_step, azimuth, elevation)
+                     + struct.pack(f'<{len(samples)}d', *samples))
+
+    def record_move(self, direction, steps):
+        with self._cond:
+            d_az, d_el = move_delta(direction, steps)
+            self.position = (self.position[0] + d_az, self.position[1] + d_el)
+            self._append(REC_MOVE, _MOVE.pack(direction.encode('ascii'), int(steps)))
+
+    def record_position(self, azimuth, elevation):
+        with self._cond:
+            self.position = (int(azimuth), int(elevation))
+            self._append(REC_POSITION, _POSITION.pack(*self.position))
+
+    @property
+    def needs_compaction(self):
+        return self.records >= self.compact_records
+
+    def snapshot(self, store, grid=None):
+        """Reescreve o diário como um retrato do store, da grade 2D e da posição atual (thread da interface)."""
+        with self._cond:
+            content = MAGIC + _frame(REC_SNAPSHOT, _snapshot_payload(store, self.position))
+            if grid is not None and len(grid):
+                content += _frame(REC_GRID_SNAPSHOT, _grid_snapshot_payload(grid))
+            self._ops.append(('rewrite', content))
+            self.records = 0
+            self._generation += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Espera até tudo o que foi registrado estar no disco (fsync). Devolve False se o prazo acabar ou
+        se a thread de escrita já terminou com registros não gravados.
+        """
+        with self._cond:
+            target = self._generation
+            self._urgent = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._written >= target or self._thread is None, timeout)
+            return self._written >= target
+
+    def close(self):
+        """Grava o que falta e encerra a thread de escrita. Devolve False se algum registro ficou sem gravar."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        with self._cond:
+            return self._written >= self._generation
+
+    def _append(self, kind, payload):
+        with self._cond:
+            self._ops.append(_frame(kind, payload))
+            self.records += 1
+            self._generation += 1
+            self._cond.notify_all()
+
+    def _open(self):
+        """Abre o arquivo para acréscimo, descartando o fim inválido encontrado pelo replay."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        f = open(self.path, 'ab')
+        valid = self._valid_length
+        if valid is None: # Sem replay: aproveita o arquivo só se o cabeçalho for válido
+            with open(self.path, 'rb') as existing:
+                valid = os.path.getsize(self.path) if existing.read(len(MAGIC)) == MAGIC else 0
+        if os.path.getsize(self.path) != valid:
+            f.truncate(valid)
+        if os.path.getsize(self.path) == 0:
+            f.write(MAGIC)
+        self._valid_length = None
+        return f
+
+    def _replace(self, content):
+        """Troca o diário pelo retrato; o antigo só some quando o retrato já está no disco."""
+        partial = self.path + '.tmp'
+        with open(partial, 'wb') as out:
+            out.write(content)
+            out.flush()
+            os.fsync(out.fileno())
+        self._file.close()
+        self._file = None
+        os.replace(partial, self.path)
+
+    def _discard_file(self, checkpoint):
+        """Fecha o arquivo após uma falha; a próxima abertura corta o que passou do último ponto seguro."""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        self._valid_length = checkpoint
+
+    def _write(self, ops):
+        """
+        Grava o lote e faz fsync. Devolve quantas operações do início do lote estão no disco; após uma
+        falha (disco cheio, permissão) o arquivo volta ao último ponto seguro e o resto é gravado de novo.
+        """
+        done = 0
+        checkpoint = self._valid_length
+        try:
+            if self._file is None:
+                self._file = self._open()
+            checkpoint = self._file.seek(0, os.SEEK_END)
+            for index, op in enumerate(ops):
+                if isinstance(op, tuple):
+                    self._replace(op[1]) # O retrato inclui tudo o que veio antes dele no lote
+                    done, checkpoint = index + 1, len(op[1])
+                    self._file = self._open()
+                else:
+                    self._file.write(op)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception as e: # A thread de escrita não pode morrer: o lote fica para a próxima tentativa
+            self._discard_file(checkpoint)
+            if not self._failing:
+                self._failing = True
+                self._report(e)
+            return done
+        if self._failing:
+            self._failing = False
+            print("Diário gravado novamente após a falha.")
+        return len(ops)
+
+    def _report(self, error):
+        if self.on_error is None:
+            print(f"ERRO ao Gravar o Diário: {error}")
+            return
+        try:
+            self.on_error(error)
+        except Exception as e:
+            print(f"ERRO ao Informar a Falha do Diário: {e}")
+
+    def _run(self):
+        self._file = None
+        while True:
+            with self._cond:
+                while not self._ops and not self._stopped:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.flush_interval # Junta o que chegar até lá em um fsync
+                while not self._stopped and not self._urgent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._urgent = False
+                ops, self._ops = self._ops, []
+                generation = self._generation
+                stopped = self._stopped
+            done = self._write(ops)
+            with self._cond:
+                self._written = generation - len(ops) + done # Só o que chegou ao disco conta para flush()
+                if done < len(ops):
+                    self._ops[:0] = ops[done:]
+                if stopped:
+                    self._thread = None
+                self._cond.notify_all()
+            if stopped:
+                self._discard_file(None)
+                if done < len(ops):
+                    print(f"ERRO: {len(ops) - done} registro(s) do diário não foram gravados ao encerrar.")
+                return
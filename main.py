@@ -1,7 +1,8 @@
+from startup import startup_timer # Primeiro import: marca o início da abertura do app
+
 import os
-import threading
-import numpy as np # type: ignore
-import matplotlib.pyplot as plt # type: ignore
+import queue
+import time
 
 from kivy.app import App
 from kivy.uix.image import Image
@@ -9,14 +10,35 @@ from kivy.uix.popup import Popup
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.scrollview import ScrollView
 from kivy.uix.textinput import TextInput
+from kivy.uix.spinner import Spinner
+from kivy.uix.filechooser import FileChooserListView
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.metrics import dp
 from kivy.clock import Clock
 from kivy.lang import Builder
 from kivy.utils import platform
 from kivy.core.window import Window 
-from kivy.properties import NumericProperty, StringProperty, ObjectProperty
+from kivy.animation import Animation
+from kivy.graphics.texture import Texture
+from kivy.uix.widget import Widget
+from kivy.properties import NumericProperty, StringProperty, ObjectProperty, BooleanProperty, ListProperty
+
+from protocol import format_command, ELEVATION_LIMITS
+from sweep import SweepEngine, AdaptiveSweepEngine, RasterSweepEngine, REPLY_TIMEOUT
+from motion import AxisPlanner
+from transport import RfcommTransport, transport_from_spec
+from connection import ConnectionManager, STATE_CONNECTING, STATE_CONNECTED, STATE_RECONNECTING
+from polar_widget import PolarPatternWidget # Registra o widget usado no main.kv
+from rendering import RenderService, plot_spec, grid_spec, render_to_rgba, PREVIEW_DPI
+from render_cache import RenderCache
+from journal import Journal
+from tracing import tracer, TRACE_SUFFIX
+# NumPy e Matplotlib não são importados aqui: measurements/pattern são carregados no primeiro uso
+# (MotorControlScreen.pattern) e o Matplotlib na primeira renderização. Ver startup.py.
+startup_timer.mark("imports")
 
 # -------------------------------------------------------------------------------------------------------------
 #                                                     VARIÁVEIS
@@ -25,16 +47,23 @@ BluetoothAdapter = None
 BluetoothDevice = None
 BluetoothSocket = None
 UUID = None
-angles_deg = []
-powers = []
-reference_power = None
 BLUETOOTH_STATUS = StringProperty("Status: Desconectado.")
 BLUETOOTH_DEVICE_NAME = "ESP32MotorControl" 
 BLUETOOTH_UUID = "00001101-0000-1000-8000-00805F9B34FB" # UUID padrão SPP (Serial Port Profile)
-bluetooth_socket = None 
+NO_CALIBRATION = "Sem calibração (relativo)" # Opção do popup do gráfico que mantém o ganho normalizado
+TRANSPORT_ENV = "ANTENA_TRANSPORT" # Transporte no desktop: sim (padrão), serial:PORTA[:BAUD] ou tcp:HOST:PORTA
+# Sessão com a ESP32 (connection.ConnectionManager) sobre RFCOMM, serial, TCP ou simulador: mantém a
+# thread de escrita e reconecta sozinha se o enlace cair
+connection = None
+bluetooth_replies = queue.Queue() # Respostas da ESP32 (protocol.Reply) lidas pela thread de leitura
+# Renderiza os gráficos fora da thread da interface e devolve o resultado pelo Clock
+render_service = RenderService(dispatch=lambda callback: Clock.schedule_once(lambda dt: callback(), 0))
+render_cache = RenderCache() # Prévias e figuras já renderizadas (a camada em disco é ligada no on_start)
+journal = None # Diário das medidas e movimentos (journal.Journal), aberto no on_start para recuperar a sessão
 
 # Carregamento do KV 
 if os.path.exists('main.kv'):Builder.load_file('main.kv')
+startup_timer.mark("main.kv")
 
 # -------------------------------------------------------------------------------------------------------------
 #                                                   CLASSES DE TELA
@@ -43,12 +72,22 @@ class BluetoothScreen(Screen):
     bluetooth_status = StringProperty("Status: Desconectado.") 
     
     def connect_bluetooth(self):
-        """Busca o dispositivo pareado e tenta conectar."""
+        """Busca o dispositivo pareado (Android) ou cria o transporte do desktop e tenta conectar."""
         global BluetoothAdapter
-        
-        # 1. Checa a plataforma e se as classes foram carregadas
-        if platform != 'android' or BluetoothAdapter is None:
-            message = "Bluetooth só funciona no Android ou classes JNI não carregadas. Verifique o buildozer.spec."
+
+        # No desktop não há RFCOMM: usa o transporte de ANTENA_TRANSPORT (simulador, serial ou TCP)
+        if platform != 'android':
+            try:
+                transport = transport_from_spec(os.environ.get(TRANSPORT_ENV, 'sim'))
+            except ValueError as e:
+                self.show_popup_message(str(e))
+                return
+            self._start_connection(transport)
+            return
+
+        # 1. Checa se as classes foram carregadas
+        if BluetoothAdapter is None:
+            message = "Classes JNI do Bluetooth não carregadas. Verifique o buildozer.spec."
             self.show_popup_message(message)
             return
             
@@ -81,73 +120,66 @@ class BluetoothScreen(Screen):
             self.bluetooth_status = "Status: Dispositivo Não Encontrado."
             self.show_popup_message(message)
             return
-        
-        self.bluetooth_status = f"Status: Conectando a {BLUETOOTH_DEVICE_NAME}..."
-
-        # Tenta conectar em uma nova thread
-        connect_thread = threading.Thread(target=self._attempt_connection, args=(target_device,), daemon=True)
-        connect_thread.start()
-
 
-    def _attempt_connection(self, target_device):
-        """Função que executa a tentativa de conexão (em uma thread separada)."""
-        global bluetooth_socket
-        global UUID
-        
         if UUID is None: # Checa se a classe UUID foi carregada
-            Clock.schedule_once(lambda dt: self.show_popup_message("ERRO: Classes Bluetooth não inicializadas."), 0)
-            Clock.schedule_once(lambda dt: setattr(self, 'bluetooth_status', "Status: Falha de Inicialização."), 0)
-            return
-            
-        uuid_obj = UUID.fromString(BLUETOOTH_UUID) # Cria o UUID
-        
-        # Tenta criar o socket RFCOMM (Bluetooth Clássico)
-        try:
-            bluetooth_socket = target_device.createRfcommSocketToServiceRecord(uuid_obj)
-        except Exception as e:
-            message = f"ERRO ao criar socket: {e}"
-            Clock.schedule_once(lambda dt: self.show_popup_message(message), 0)
-            Clock.schedule_once(lambda dt: setattr(self, 'bluetooth_status', "Status: Erro de Socket."), 0)
+            self.show_popup_message("ERRO: Classes Bluetooth não inicializadas.")
+            self.bluetooth_status = "Status: Falha de Inicialização."
             return
 
-        # Tenta conectar o socket
-        try:
-            message = "Iniciando Conexão..."
-            Clock.schedule_once(lambda dt: self.show_popup_message(message), 0)
-            bluetooth_socket.connect() # ESTE É O BLOQUEANTE
-            
-            # Conexão bem-sucedida
-            Clock.schedule_once(lambda dt: setattr(self, 'bluetooth_status', "Status: CONECTADO!"), 0)
-            Clock.schedule_once(lambda dt: self.show_popup_message("Conexão Bluetooth Estabelecida com Sucesso!"), 0)
-            
-            # Ativa o botão de avançar (deve ser agendado para rodar na thread principal)
-            Clock.schedule_once(lambda dt: setattr(self.manager.get_screen('motor_control').ids.control_button, 'disabled', False), 0)
+        self._start_connection(RfcommTransport(target_device, UUID, BLUETOOTH_UUID))
 
-            # INICIA A THREAD DE LEITURA (NOVA THREAD PARA RECEBIMENTO DE DADOS)
-            # read_thread = threading.Thread(target=self.read_bluetooth_data, daemon=True)
-            # read_thread.start()
-            # NOTE: Você não incluiu a função read_bluetooth_data. Se for usá-la, descomente acima e a implemente.
-            # Por enquanto, vou comentar para não causar NameError.
+    def _start_connection(self, transport):
+        """Cria a sessão (ConnectionManager), que conecta e reconecta o transporte em segundo plano."""
+        global connection
 
-        except Exception as e:
-            # Erro de conexão (dispositivo não está pronto, fora do alcance, etc.)
-            message = f"ERRO de Conexão. Tente Novamente ou Pareie o Dispositivo: {e}"
-            Clock.schedule_once(lambda dt: self.show_popup_message(message), 0)
-            Clock.schedule_once(lambda dt: setattr(self, 'bluetooth_status', "Status: Falha na Conexão."), 0)
-            try:
-                if bluetooth_socket:
-                    bluetooth_socket.close()
-            except:
-                pass
-            bluetooth_socket = None
+        if connection is not None: # Nova busca: encerra a sessão anterior
+            connection.close()
+        motor_screen = self.manager.get_screen('motor_control')
+        self.show_popup_message("Iniciando Conexão...")
+        connection = ConnectionManager(
+            transport,
+            bluetooth_replies,
+            position=(int(motor_screen.posicao), int(motor_screen.elevacao)),
+            on_state=lambda state: Clock.schedule_once(lambda dt: self._on_connection_state(transport, state), 0),
+            on_error=lambda e: Clock.schedule_once(lambda dt: self._on_connection_error(transport, e), 0),
+            on_position=lambda az, el: Clock.schedule_once(lambda dt: motor_screen.sincronizar_posicao(az, el), 0),
+            on_depth=lambda depth: Clock.schedule_once(lambda dt: setattr(motor_screen, 'command_queue_depth', depth), 0),
+        )
+        connection.start()
 
-        except Exception as e:
-            # Captura a exceção de dentro do bloco try/except aninhado
-            Clock.schedule_once(lambda dt: setattr(self, 'bluetooth_status', "Status: Conexão Perdida."), 0)
-            if bluetooth_socket:
-                try: bluetooth_socket.close()
-                except: pass
-            bluetooth_socket = None
+    def _on_connection_state(self, transport, state):
+        """Atualiza o status nas duas telas a cada mudança de estado da sessão."""
+        if connection is None or connection.transport is not transport: # Sessão já substituída
+            return
+        motor_screen = self.manager.get_screen('motor_control')
+        motor_screen.link_status = "Reconectando..." if state == STATE_RECONNECTING else ""
+        if state == STATE_CONNECTING:
+            self.bluetooth_status = f"Status: Conectando a {transport.name}..."
+        elif state == STATE_CONNECTED:
+            self.bluetooth_status = f"Status: CONECTADO! ({transport.name})"
+            if connection.reconnections == 0:
+                self.show_popup_message("Conexão Estabelecida com Sucesso!")
+        elif state == STATE_RECONNECTING:
+            self.bluetooth_status = f"Status: Reconectando a {transport.name}..."
+        else:
+            self.bluetooth_status = "Status: Desconectado."
+
+    def _on_connection_error(self, transport, e):
+        """Falha na primeira conexão ou desistência depois de várias tentativas de reconexão."""
+        global connection
+
+        if connection is None or connection.transport is not transport:
+            return
+        if not connection.established:
+            # Erro de conexão (dispositivo não está pronto, fora do alcance, porta ocupada, etc.)
+            message = f"ERRO de Conexão. Tente Novamente ou Pareie o Dispositivo: {e}"
+            self.bluetooth_status = "Status: Falha na Conexão."
+        else:
+            message = f"Conexão Perdida: {e}"
+            self.bluetooth_status = "Status: Desconectado."
+        connection.close()
+        connection = None
+        self.show_popup_message(message)
 
 
     # MÉTODOS DE MUDANÇA DE TELA 
@@ -155,47 +187,11 @@ class BluetoothScreen(Screen):
         """Muda para a tela de controle do motor."""
         # Permite avançar mesmo se não estiver conectado, apenas em ambientes desktop
         # Se for Android, exige conexão
-        if platform == 'android' and bluetooth_socket is None:
+        if platform == 'android' and connection is None:
             self.show_popup_message("Conecte-se ao Bluetooth Antes de Avançar")
         else:
             self.manager.current = 'motor_control'
             
-    def read_bluetooth_data(self):
-        """
-        Função para ler dados do Bluetooth em uma thread separada.
-        Implementação básica para evitar que a thread de conexão falhe.
-        """
-        global bluetooth_socket
-        
-        if bluetooth_socket is None:
-            print("Socket Bluetooth não está ativo para leitura.")
-            return
-
-        try:
-            input_stream = bluetooth_socket.getInputStream()
-            while bluetooth_socket is not None:
-                # Checa se há bytes disponíveis para leitura
-                if input_stream.available() > 0:
-                    read_byte = input_stream.read()
-                    if read_byte != -1: # -1 indica fim do stream
-                        # Este é apenas um exemplo. Você deve implementar aqui 
-                        # o parser para o protocolo de comunicação (e.g., ler até um '\n')
-                        # Exemplo: Lendo um byte e imprimindo.
-                        char_read = chr(read_byte)
-                        print(f"Dado recebido: {char_read}") 
-                        # Se você precisar de lógica Kivy (popups/UI), use Clock.schedule_once
-
-        except Exception as e:
-            print(f"ERRO DE LEITURA BT: {e}")
-            Clock.schedule_once(lambda dt: self.manager.get_screen('bluetooth_connection').show_popup_message(f"Conexão Bluetooth Perdida: {e}"), 0)
-            # Tenta fechar o socket e resetar o status se a leitura falhar
-            if bluetooth_socket:
-                try: bluetooth_socket.close()
-                except: pass
-            bluetooth_socket = None
-            Clock.schedule_once(lambda dt: setattr(self, 'bluetooth_status', "Status: Desconectado."), 0)
-
-
     def show_popup_message(self, message):
         """Exibe o popup de confirmação."""
         popup = ConfirmationPopup(message=message)
@@ -206,39 +202,185 @@ class MotorControlScreen(Screen):
     passo = NumericProperty(1) 
     pos_text = StringProperty("0°")
     last_slider_value = NumericProperty(0) # Último valor enviado pelo slider (para cálculo de diferença)
+    sweep_running = BooleanProperty(False)
+    sweep_progress = NumericProperty(0) # Progresso da varredura automática (0 a 100)
+    sweep_status = StringProperty("")
+    sweep_resumable = BooleanProperty(False) # Varredura interrompida que pode continuar de onde parou
+    link_status = StringProperty("") # "Reconectando..." enquanto a conexão é refeita
+    command_queue_depth = NumericProperty(0) # Comandos aguardando a thread de escrita
+    rendering = BooleanProperty(False) # Há gráfico sendo gerado em segundo plano
+    acumular_amostras = BooleanProperty(False) # Registrar soma leituras ao ângulo atual em vez de avançar
+    elevacao = NumericProperty(0) # Posição do eixo de elevação (graus)
+    perf_overlay = BooleanProperty(False) # Sobreposição com p50/p95 de cada etapa (liga a medição de tempos)
+    perf_text = StringProperty("")
 
     def __init__(self, **kwargs):  # Inicializa o last_slider_value com a posição inicial
         super().__init__(**kwargs)
+        self.sweep_engine = None
+        self.planner = AxisPlanner() # Comandos de azimute respeitando os limites do cabo (motion.py)
+        self._sweep_resume = None # (método de início, argumentos) da última varredura, para resume_sweep
+        self._pattern = None # Criado no primeiro uso (ver a propriedade pattern)
+        self._sessions = None # Banco de varreduras salvas (ver a propriedade sessions)
+        self._calibrations = None # Perfis de calibração (ver a propriedade calibrations)
+        self._grid = None # Medidas da varredura 2D (ver a propriedade grid)
+        self._saved_version = None # Versão do store já gravada no banco de varreduras
+        self._saved_grid = None # (grade, versão) já gravada no banco de varreduras
+        self.pending_plot = None # PlotSpec preparado por plot_and_navigate para o salvamento
+        self._perf_event = None # Atualização periódica da sobreposição de desempenho
+        self.pending_data = None # exporters.ExportData com os dados brutos do mesmo salvamento
+        self._active_renders = set()
+        self._export_count = 0 # Cada salvamento tem a própria chave no RenderService (nenhum substitui outro)
         self.last_slider_value = int(self.posicao) 
         self.atualizar_label()
 
+    @property
+    def pattern(self):
+        """Ganhos normalizados compartilhados pelos gráficos; criado no primeiro uso para adiar o import do NumPy."""
+        if self._pattern is None:
+            from measurements import MeasurementStore
+            from pattern import RadiationPattern
+            self._pattern = RadiationPattern(MeasurementStore())
+            self.ids.polar_view.pattern = self._pattern
+        return self._pattern
+
+    @property
+    def store(self):
+        """Medidas de potência por ângulo (MeasurementStore)."""
+        return self.pattern.store
+
+    @property
+    def grid(self):
+        """Medidas azimute x elevação (grid_store.GridStore), criadas na primeira varredura 2D."""
+        if self._grid is None:
+            from grid_store import GridStore
+            self._grid = GridStore()
+        return self._grid
+
+    @property
+    def sessions(self):
+        """Banco de varreduras salvas em user_data_dir (session_store.SessionStore)."""
+        if self._sessions is None:
+            from session_store import SessionStore
+            self._sessions = SessionStore(os.path.join(App.get_running_app().user_data_dir, 'sessions'))
+        return self._sessions
+
+    @property
+    def calibrations(self):
+        """Perfis de calibração (CSV) em user_data_dir/calibration (calibration.CalibrationStore)."""
+        if self._calibrations is None:
+            from calibration import CalibrationStore
+            self._calibrations = CalibrationStore(os.path.join(App.get_running_app().user_data_dir, 'calibration'))
+        return self._calibrations
+
+    def on_pre_enter(self, *args):
+        self.pattern # Garante o diagrama ao vivo ligado às medidas ao abrir a tela
+
     def atualizar_label(self, *args):
         self.pos_text = f"{int(self.posicao)}°"
+
+    def go_to_angle(self, angle, current=None, home=False):
+        """
+        Enfileira os comandos planejados (motion.AxisPlanner) para levar o azimute de 'current'
+        (padrão: posição atual) até o ângulo, ou ao zero com home=True. Devolve o Plan ou None se falhar.
+        """
+        current = int(self.posicao) if current is None else current
+        try:
+            plan = self.planner.home(current) if home else self.planner.move_to(current, angle)
+        except ValueError as e:
+            popup = ConfirmationPopup(message=f"{e}")
+            popup.open()
+            return None
+        for direction, steps in plan.moves:
+            if not self.send_move(direction, steps):
+                return None
+        return plan
+
+    def sincronizar_posicao(self, azimuth, elevation):
+        """Posição informada pela conexão após reconectar (ou quando o keepalive encontra divergência)."""
+        self.posicao = azimuth
+        self.elevacao = elevation
+        self.last_slider_value = int(azimuth)
+        self.atualizar_label()
+        if journal is not None:
+            journal.record_position(azimuth, elevation)
+
+    def restaurar_diario(self, diario):
+        """Reaplica o diário da sessão anterior (medidas e posição do motor). Retorna o nº de registros."""
+        if diario.empty:
+            return 0
+        applied = diario.replay(self.store)
+        self.ids.polar_view.refresh()
+        if diario.grid is not None: # Células da varredura 2D
+            self._grid = diario.grid
+        azimuth, elevation = diario.position
+        self.posicao = azimuth
+        self.elevacao = elevation
+        self.last_slider_value = int(azimuth)
+        self.atualizar_label()
+        return applied
+
+    def _compactar_diario(self):
+        """Reescreve o diário como retrato quando ele acumulou registros demais (thread da interface)."""
+        if journal is not None and journal.needs_compaction:
+            journal.snapshot(self.store, self._grid)
         
     # Método para troca de Strings com Bluetooth
 
     def _format_command(self, direction, step_value):
         """Formata o comando conforme padrão programado na ESP"""
         # Garante que o passo seja um inteiro e formata com zeros à esquerda (03d)
-        step_value = max(0, min(999, int(step_value))) # Limita o passo entre 0 e 999
-        formatted_step = f"{step_value:03d}"
-        command = f"&{direction}{formatted_step}"
-        return command
+        return format_command(direction, step_value)
 
     def send_bluetooth_data(self, data):
-        """Envia dados via Bluetooth se o socket estiver ativo, ou simula no console."""
-        global bluetooth_socket
-        if bluetooth_socket is not None:
-            try: # Envia os dados como bytes
-                output_stream = bluetooth_socket.getOutputStream()
-                output_stream.write(data.encode('utf-8'))
-                output_stream.flush()
-            except Exception as e:
-                self.manager.get_screen('bluetooth_connection').show_popup_message(f"ERRO DE ENVIO BT: {e}")
-            except AttributeError:
-                pass
-        else:
+        """Enfileira dados para a thread de escrita se houver conexão, ou simula no console."""
+        if connection is None:
             print(f"Comando simulado: {data}")
+            return True
+        with tracer.span('bt.enviar'):
+            accepted = connection.submit(data)
+        if not accepted:
+            self._show_queue_full()
+            return False
+        return True
+
+    def send_move(self, direction, steps):
+        """Enfileira um movimento; movimentos no mesmo sentido ainda não enviados são agrupados."""
+        if connection is None:
+            print(f"Comando simulado: {self._format_command(direction, steps)}")
+            if journal is not None:
+                journal.record_move(direction, steps)
+            return True
+        with tracer.span('bt.enviar'):
+            accepted = connection.submit_move(direction, steps)
+        if not accepted:
+            self._show_queue_full()
+            return False
+        if journal is not None:
+            journal.record_move(direction, steps)
+            self._compactar_diario()
+        return True
+
+    def _send_sweep_move(self, direction, steps):
+        """Usado pela thread da varredura: espera espaço na fila e não agrupa comandos."""
+        if connection is None:
+            print(f"Comando simulado: {self._format_command(direction, steps)}")
+        elif not connection.submit_move(direction, steps, coalesce=False, block=True, timeout=REPLY_TIMEOUT):
+            raise IOError("Fila de comandos Bluetooth cheia.")
+        if journal is not None:
+            journal.record_move(direction, steps)
+
+    def _varredura_em_andamento(self):
+        """True (com aviso) se uma varredura está em andamento e a ação tem que esperar o fim dela."""
+        if not self.sweep_running:
+            return False
+        popup = ConfirmationPopup(message="Varredura em Andamento.\nPare ou Aguarde o Fim da Varredura.")
+        popup.open()
+        return True
+
+    def _show_queue_full(self):
+        message = "Fila de Comandos Cheia.\nAguarde o Envio e Tente Novamente."
+        popup = ConfirmationPopup(message=message)
+        popup.open()
 
     def send_step_command(self, direction):
         """ Envia o passo definido na direção especificada, respeitando os limites de 0° e 360°. """
@@ -254,8 +396,8 @@ class MotorControlScreen(Screen):
         if actual_step == 0: 
             return 
 
-        command = self._format_command(direction, actual_step) 
-        self.send_bluetooth_data(command)
+        if not self.send_move(direction, actual_step):
+            return
         
         # Atualiza a posição
         self.posicao = new_pos
@@ -272,6 +414,10 @@ class MotorControlScreen(Screen):
         except ValueError:
             valor_valido = False
         
+        if valor_valido and self.acumular_amostras:
+            self.acumular_medida(potencia_input_ref, float(potencia_inserida_str))
+            return
+
         if valor_valido:
             current_pos = self.posicao 
             step = self.passo          
@@ -285,8 +431,8 @@ class MotorControlScreen(Screen):
                 popup.open()
                 return
             
-            command = self._format_command('R', actual_step)
-            self.send_bluetooth_data(command)
+            if not self.send_move('R', actual_step):
+                return
             
             self.adicionar_medida_do_app(potencia_input_ref, self.posicao, potencia_inserida_str)
             
@@ -307,19 +453,14 @@ class MotorControlScreen(Screen):
         """Calcula a diferença de posição do slider e envia o comando '&R/L<diff>'. """
         
         new_value = int(self.posicao) 
-        diff = abs(new_value - self.last_slider_value) # Calcula a diferença absoluta (o passo a ser enviado)
-        
-        if diff == 0:
+        if new_value == self.last_slider_value:
             return
 
-        if new_value > self.last_slider_value: 
-            direction = 'R'
-        else:
-            direction = 'L'
-        # Formata, envia o comando e atualiza
-        command = self._format_command(direction, diff)
-        self.send_bluetooth_data(command)
-        self.last_slider_value = new_value
+        # Enfileira os comandos do trajeto mais curto permitido pelo cabo e atualiza
+        plan = self.go_to_angle(new_value, self.last_slider_value)
+        if plan is None:
+            return
+        self.last_slider_value = plan.position
         
     # -------------------- Funções de Movimento -------------------------------
     def aumentar(self):
@@ -330,6 +471,20 @@ class MotorControlScreen(Screen):
         self.posicao = max(0, self.posicao - self.passo)
         self.atualizar_label()
 
+    def send_elevation_command(self, direction):
+        """Move o eixo de elevação um passo para cima ('U') ou para baixo ('D'), dentro dos limites."""
+        el_min, el_max = ELEVATION_LIMITS
+        if direction == 'U':
+            new_el = min(el_max, self.elevacao + self.passo)
+        else:
+            new_el = max(el_min, self.elevacao - self.passo)
+        actual_step = abs(int(new_el) - int(self.elevacao))
+        if actual_step == 0:
+            return
+        if not self.send_move(direction, actual_step):
+            return
+        self.elevacao = new_el
+
     def slider_moved(self, widget):
         self.posicao = int(widget.value)
         self.atualizar_label()
@@ -337,35 +492,233 @@ class MotorControlScreen(Screen):
     def definir_passo(self, valor):
         new_passo = int(valor)
         self.passo = new_passo
-            
-    # ---------------- Funções de Plotagem do Gráfico ---------------------------------
-    def adicionar_medida_do_app(self, potencia_input_ref, posicao_em_graus, potencia_inserida_str):
+
+    # -------------------- Varredura Automática -------------------------------
+    def toggle_sweep(self):
+        """Abre o popup de configuração da varredura ou interrompe a varredura em andamento."""
+        if self.sweep_running:
+            self.sweep_engine.stop()
+            self.sweep_status = "Interrompendo..."
+            return
+        popup = SweepInputPopup(sweep_action=self.start_sweep, passo_padrao=int(self.passo))
+        popup.open()
+
+    def start_sweep(self, start, stop, step, max_samples=1, ci_threshold=None, min_step=None, **resume):
+        """
+        Cria a engine de varredura e a executa em segundo plano. Com min_step menor que o passo, a
+        varredura é adaptativa: refina só onde o diagrama varia (AdaptiveSweepEngine) até min_step.
+        'resume' são as opções de continuação (SweepEngine.resume_options).
+        """
+        adaptive = min_step is not None and 0 < min_step < step
+        options = dict(resume, min_step=min_step) if adaptive else resume
         try:
-            potencia = float(potencia_inserida_str) #Tenta converter a string para float
-        except ValueError:
-            Clock.schedule_once(lambda dt: potencia_input_ref.focus == True, 0.05)
+            engine = (AdaptiveSweepEngine if adaptive else SweepEngine)(
+                send_command=self._send_sweep_move,
+                replies=bluetooth_replies,
+                start=start,
+                stop=stop,
+                step=step,
+                position=int(self.posicao),
+                max_samples=max_samples,
+                ci_threshold=ci_threshold,
+                link=connection,
+                planner=self.planner,
+                **options,
+                on_point=lambda angle, samples: Clock.schedule_once(lambda dt: self._on_sweep_point(angle, samples), 0),
+                on_progress=lambda done, total: Clock.schedule_once(lambda dt: self._on_sweep_progress(done, total), 0),
+                on_finish=lambda position, error: Clock.schedule_once(lambda dt: self._on_sweep_finish(position, error), 0),
+            )
+        except ValueError as e:
+            popup = ConfirmationPopup(message=f"{e}")
+            popup.open()
             return
 
-        angulo = int(posicao_em_graus)
-        
-        # Adiciona ou Atualiza a medida
-        if angulo not in angles_deg:
-            angles_deg.append(angulo)
-            powers.append(potencia)
-        else:
-            index = angles_deg.index(angulo)
-            powers[index] = potencia
-            message = f" Medida atualizada:\nÂngulo {angulo}°\nPotência {potencia} dBm"
-            popup = ConfirmationPopup(message=message)
+        self._sweep_resume = (self.start_sweep, (start, stop, step, max_samples, ci_threshold, min_step))
+        self._run_sweep(engine, "Varredura adaptativa" if adaptive else "Varredura")
+
+    def _on_sweep_point(self, angle, samples):
+        """Registra as leituras do ponto medido pela varredura e atualiza a posição exibida."""
+        self.registrar_amostras(angle, samples)
+        self.posicao = angle
+        self.last_slider_value = int(angle)
+        self.atualizar_label()
+
+    def _on_sweep_progress(self, done, total):
+        self.sweep_progress = 100.0 * done / total
+        self.sweep_status = f"Varredura: {done}/{total}"
+
+    def toggle_raster_sweep(self):
+        """Abre o popup da varredura 2D (azimute x elevação) ou interrompe a varredura em andamento."""
+        if self.sweep_running:
+            self.toggle_sweep()
+            return
+        popup = RasterInputPopup(sweep_action=self.start_raster_sweep, passo_padrao=max(5, int(self.passo)))
+        popup.open()
+
+    def start_raster_sweep(self, az_range, el_range, max_samples=1, ci_threshold=None, **resume):
+        """
+        Varre a grade em zigue-zague; os pontos vão para o GridStore (leituras por ponto como na varredura 1D).
+        Com passos diferentes dos da grade atual, uma grade nova é criada: se a atual tiver medidas, pede
+        confirmação e a grava no banco de varreduras antes de substituí-la.
+        """
+        grid = self._grid
+        if grid is not None and len(grid) and (grid.az_step, grid.el_step) != (float(az_range[2]), float(el_range[2])):
+            message = (f"A Grade 2D Atual ({len(grid)} células) Usa Outro Passo.\n"
+                       f"Salvá-la em Sessões e Começar uma Nova?")
+            popup = ConfirmationDeletePopup(
+                message=message,
+                confirm_action=lambda: self._iniciar_varredura_2d(az_range, el_range, max_samples, ci_threshold, **resume))
             popup.open()
-        
-        # Adiciona Passo
-        self.posicao = min(360, self.posicao + self.passo)
+            return
+        self._iniciar_varredura_2d(az_range, el_range, max_samples, ci_threshold, **resume)
+
+    def _iniciar_varredura_2d(self, az_range, el_range, max_samples, ci_threshold, **resume):
+        """Cria o RasterSweepEngine e a grade (nova se os passos mudaram) e inicia a varredura 2D."""
+        try:
+            engine = RasterSweepEngine(
+                send_command=self._send_sweep_move,
+                replies=bluetooth_replies,
+                az_range=az_range,
+                el_range=el_range,
+                position=(int(self.posicao), int(self.elevacao)),
+                max_samples=max_samples,
+                ci_threshold=ci_threshold,
+                link=connection,
+                planner=self.planner,
+                **resume,
+                on_point=lambda point, samples: Clock.schedule_once(lambda dt: self._on_raster_point(point, samples), 0),
+                on_progress=lambda done, total: Clock.schedule_once(lambda dt: self._on_sweep_progress(done, total), 0),
+                on_finish=lambda position, error: Clock.schedule_once(lambda dt: self._on_sweep_finish(position, error), 0),
+            )
+            grid = self.grid
+            if (grid.az_step, grid.el_step) != (float(az_range[2]), float(el_range[2])):
+                from grid_store import GridStore
+                grid = GridStore(az_range[2], el_range[2]) # Passos diferentes: começa uma grade nova
+            grid.index(0, el_range[0]) # Valida a faixa de elevação
+            grid.index(0, el_range[1])
+        except ValueError as e:
+            popup = ConfirmationPopup(message=f"{e}")
+            popup.open()
+            return
+
+        if grid is not self._grid:
+            self._salvar_grade_pendente() # A grade substituída não se perde
+        self._grid = grid
+        self._sweep_resume = (self.start_raster_sweep, (az_range, el_range, max_samples, ci_threshold))
+        self._run_sweep(engine, "Varredura 2D")
+
+    def _run_sweep(self, engine, label):
+        total = len(engine.points)
+        self.sweep_engine = engine
+        self.sweep_running = True
+        self.sweep_resumable = False
+        self.sweep_progress = 100.0 * engine.completed / total if total else 0
+        self.sweep_status = f"{label}: {engine.completed}/{total} (movimento ~{engine.travel_time:.0f} s)"
+        engine.start()
+
+    def resume_sweep(self):
+        """Continua a última varredura interrompida (erro, queda da conexão ou parada) do primeiro ponto não medido."""
+        if self.sweep_running or not self.sweep_resumable or self._sweep_resume is None:
+            return
+        start_method, args = self._sweep_resume
+        start_method(*args, **self.sweep_engine.resume_options())
+
+    def _on_raster_point(self, point, samples):
+        """Registra as leituras de uma célula da grade e atualiza as posições exibidas."""
+        azimuth, elevation = point
+        self.grid.set_samples(azimuth, elevation, samples)
+        if journal is not None:
+            journal.record_grid_samples(self.grid, azimuth, elevation, samples)
+            self._compactar_diario()
+        self.posicao = azimuth
+        self.elevacao = elevation
+        self.last_slider_value = int(azimuth)
+        self.atualizar_label()
+
+    def _on_sweep_finish(self, position, error):
+        """Sincroniza a posição com a última confirmada pela ESP32 e informa o resultado."""
+        self.sweep_running = False
+        if isinstance(position, tuple): # Varredura 2D: (azimute, elevação)
+            position, self.elevacao = position
+        self.posicao = position
+        self.last_slider_value = int(position)
         self.atualizar_label()
-        self.last_slider_value = int(self.posicao)
+        if journal is not None:
+            journal.record_position(position, self.elevacao)
+        engine = self.sweep_engine
+        self.sweep_resumable = engine.completed < len(engine.points)
+        if error is not None:
+            self.sweep_status = "Varredura com erro."
+            message = f"ERRO na Varredura Automática:\n{error}"
+        elif not self.sweep_resumable:
+            self.sweep_status = "Varredura concluída."
+            message = "Varredura Automática Concluída."
+        else:
+            self.sweep_status = "Varredura interrompida."
+            message = "Varredura Automática Interrompida."
+        if self.sweep_resumable:
+            message += f"\nUse 'Retomar' para continuar do ponto {engine.completed + 1}."
+        popup = ConfirmationPopup(message=message)
+        popup.open()
+
+    # ---------------- Funções de Plotagem do Gráfico ---------------------------------
+    def adicionar_medida_do_app(self, potencia_input_ref, posicao_em_graus, potencia_inserida_str):
+        with tracer.span('medida.adicionar'):
+            try:
+                potencia = float(potencia_inserida_str) #Tenta converter a string para float
+            except ValueError:
+                Clock.schedule_once(lambda dt: potencia_input_ref.focus == True, 0.05)
+                return
+
+            angulo = int(posicao_em_graus)
+        
+            # Adiciona ou Atualiza a medida
+            if self.registrar_medida(angulo, potencia):
+                message = f" Medida atualizada:\nÂngulo {angulo}°\nPotência {potencia} dBm"
+                popup = ConfirmationPopup(message=message)
+                popup.open()
+        
+            # Adiciona Passo
+            self.posicao = min(360, self.posicao + self.passo)
+            self.atualizar_label()
+            self.last_slider_value = int(self.posicao)
+            potencia_input_ref.text = '' # Limpa o campo
+            Clock.schedule_once(lambda dt: self.set_focus_on_input(potencia_input_ref), 0.05) # Mantém o foco
+
+    def acumular_medida(self, potencia_input_ref, potencia):
+        """Soma mais uma leitura ao ângulo atual (média e desvio por Welford), sem mover o motor."""
+        angulo = int(self.posicao)
+        self.registrar_medida(angulo, potencia, acumular=True)
+        index = self.store.bin_index(angulo)
+        count = self.store.bin_count(index)
+        media = self.store.bin_mean(index)
+        message = f"Ângulo {angulo}°: {count} leitura(s)\nMédia {media:.2f} dBm"
+        if count > 1:
+            from sample_stats import confidence_halfwidth
+            message += f" ± {confidence_halfwidth(self.store.bin_std(index), count):.2f} dB (IC 95%)"
+        popup = ConfirmationPopup(message=message)
+        popup.open()
         potencia_input_ref.text = '' # Limpa o campo
         Clock.schedule_once(lambda dt: self.set_focus_on_input(potencia_input_ref), 0.05) # Mantém o foco
-    
+
+    def registrar_medida(self, angulo, potencia, acumular=False):
+        """Adiciona a medida ou atualiza a existente no mesmo ângulo. Retorna True se foi atualização."""
+        updated = self.pattern.record(angulo, potencia, accumulate=acumular)
+        self.ids.polar_view.add_point(angulo)
+        if journal is not None:
+            journal.record_measure(angulo, potencia, acumular)
+            self._compactar_diario()
+        return updated
+
+    def registrar_amostras(self, angulo, amostras):
+        """Substitui o ângulo pelas leituras da varredura (média e desvio das amostras aceitas)."""
+        updated = self.pattern.record_samples(angulo, amostras)
+        self.ids.polar_view.add_point(angulo)
+        if journal is not None:
+            journal.record_samples(angulo, amostras)
+            self._compactar_diario()
+        return updated
+
     # Função auxiliar para redefinir o foco
     def set_focus_on_input(self, input_widget):
         """Função auxiliar para redefinir o foco de forma robusta."""
@@ -375,94 +728,109 @@ class MotorControlScreen(Screen):
     def go_to_save_screen(self):
         """Abre o popup para coletar título e frequência antes de plotar."""
 
-        if len(powers) < 1:
+        if len(self.store) < 1:
             message = f"Adicione ao Menos uma Medida\nde Potência para Salvar."
             popup = ConfirmationPopup(message=message)
             popup.open()
             return
         
         # Abre o novo popup, passando a função que deve ser chamada após a confirmação
-        popup = PlotInputPopup(plot_action=self.plot_and_navigate)
+        popup = PlotInputPopup(plot_action=self.plot_and_navigate, profiles=self.calibrations.list(),
+                               import_action=self.abrir_importacao_calibracao)
         popup.open()
 
-    def plot_and_navigate(self, graph_title, freq_text):
-        """Prepara o plot com o título e a legenda fornecidos e navega para a tela de salvamento."""
-
-        global reference_power 
-        reference_power = np.max(powers) # Cálculo da Potência de Referência (Potência Máxima)
-        angles_np = np.array(angles_deg) 
-        powers_np = np.array(powers)
-        angles_rad = np.deg2rad(angles_np)
-        
-        # Cálculo do Ganho Normalizado (em relação à Potência Máxima)
-        gains_dB = powers_np - reference_power
-        sorted_indices = np.argsort(angles_rad)
-        angles_rad = angles_rad[sorted_indices]
-        gains_dB = gains_dB[sorted_indices]
-
-        # Fecha o loop no gráfico polar
-        angles_rad = np.append(angles_rad, angles_rad[0])
-        gains_dB = np.append(gains_dB, gains_dB[0])
-
-        # Configuração dos Limites Radiais
-        min_gain = int(np.floor(np.min(gains_dB) / 5) * 5)
-        max_gain = 0 
-
-        # Cria o Gráfico
-        plt.figure(figsize=(8, 8))
-        ax = plt.subplot(111, polar=True)
-        
-        ax.plot(
-            angles_rad, 
-            gains_dB, 
-            marker='o', 
-            linestyle='-',
-            color='#087e9e',
-            label=f"{freq_text}" 
-        )
-        
-        ax.fill(angles_rad, gains_dB, alpha=0.2, color='#087e9e')
-        
-        # Uso do Título Fornecido pelo Usuário
-        full_title = f"{graph_title}"
-        ax.set_title(full_title, va='bottom', fontsize=16, y=1.08) 
-        
-        # Adiciona a Legenda (para o label definido no ax.plot)
-        ax.legend(loc='lower left', bbox_to_anchor=(0.95, 0.95), fontsize=14,borderaxespad=0.) 
-        
-        ax.set_theta_zero_location('S')
-        ax.set_theta_direction(-1)
-        ax.set_rlabel_position(135)
-        ax.set_rlim(min_gain, max_gain)
-        ax.set_rticks(np.arange(min_gain, max_gain + 1, 5))
-        ax.grid(True)
+    def plot_and_navigate(self, graph_title, freq_text, profile_name=None):
+        """
+        Prepara o plot com o título e a legenda fornecidos e navega para a tela de salvamento. Com um
+        perfil de calibração, o gráfico e as exportações saem em ganho absoluto (dBi) na frequência informada.
+        """
+        gain_offset = None
+        if profile_name:
+            from session_store import parse_frequency
+            frequency = parse_frequency(freq_text)
+            try:
+                if frequency is None:
+                    raise ValueError("Informe a frequência (ex: 2.45 GHz) para aplicar a calibração.")
+                gain_offset = self.calibrations.get(profile_name).offset(frequency)
+            except (KeyError, ValueError, OSError) as e:
+                popup = ConfirmationPopup(message=f"ERRO na Calibração:\n{e}")
+                popup.open()
+                return
+
+        # Copia os dados do gráfico agora; a figura só é renderizada ao salvar, fora da thread da interface
+        from exporters import export_data
+        self.pending_plot = plot_spec(self.pattern, f"{graph_title}", legend=f"{freq_text}", gain_offset=gain_offset)
+        self.pending_data = export_data(self.pattern, graph_title, freq_text, self.pending_plot.metrics,
+                                        gain_offset=gain_offset, calibration=profile_name or None)
+        self.salvar_sessao(graph_title, freq_text) # Guarda os dados brutos junto com título e frequência
         
         # Navega para a tela de salvamento
         self.manager.current = 'save_file_screen'
 
-    def _perform_save(self, path, filename):
-        """Salva a figura no caminho e nome de arquivo especificados."""
-        try:
-            fig = plt.gcf()
-            if not filename.lower().endswith(('.png', '.pdf')):
-                filename = f"{filename}.png" #salva como png por padrão
-                
-            filepath = os.path.join(path, filename)
-            file_format = filepath.split('.')[-1]
-            folder_name = os.path.basename(path)
-            
-            fig.savefig(filepath, format=file_format, dpi=300 if file_format == 'png' else None) # Salva o arquivo
-            message = f"Arquivo Salvo com sucesso em:\n[Pasta] {folder_name}\n[Nome] {filename}"
+    def go_to_save_grid(self):
+        """Abre o popup de título e frequência para exportar o mapa e as células da varredura 2D."""
+        if self._grid is None or len(self._grid) < 1:
+            message = "Faça uma Varredura 2D para Salvar o Mapa."
             popup = ConfirmationPopup(message=message)
             popup.open()
-            plt.close(fig) # A figura deve ser fechada para funcionar bem no Android
-            
-        except Exception as e:
+            return
+        popup = PlotInputPopup(plot_action=self.grid_and_navigate) # Sem perfis: o mapa é sempre em ganho relativo
+        popup.open()
+
+    def grid_and_navigate(self, graph_title, freq_text, profile_name=None):
+        """Prepara o mapa 2D e as células para o salvamento e navega para a tela de salvamento."""
+        from exporters import grid_export_data
+        self.pending_plot = grid_spec(self.grid, graph_title)
+        self.pending_data = grid_export_data(self.grid, graph_title, freq_text)
+        self.salvar_grade(graph_title, freq_text)
+        self.manager.current = 'save_file_screen'
+
+    def _perform_save(self, path, filename, formats=('png',)):
+        """Agenda o salvamento da figura e/ou dos dados brutos (um arquivo por formato) com o nome dado, sem extensão."""
+        if self._varredura_em_andamento():
+            return
+        from exporters import export_all
+
+        base_path = os.path.join(path, filename)
+        folder_name = os.path.basename(path)
+        spec = self.pending_plot
+        data = self.pending_data
+        formats = tuple(formats)
+
+        def on_done(outputs):
+            names = ", ".join(os.path.basename(output) for output in outputs)
+            message = f"Arquivo Salvo com sucesso em:\n[Pasta] {folder_name}\n[Nome] {names}"
+            popup = ConfirmationPopup(message=message)
+            popup.open()
+
+        def on_error(e):
             message = f"ERRO ao Salvar o Arquivo.\n Tente novamente ou Verifique as Permissões: {e}"
             popup = ConfirmationPopup(message=message)
             popup.open()
-            
-        self.manager.current = 'motor_control' # Volta a tela
+
+        def job():
+            outputs = export_all(base_path, formats, spec, data, cache=render_cache)
+            if len(tracer): # Tempos medidos nesta sessão, para abrir no chrome://tracing
+                outputs.append(tracer.export_chrome(base_path + TRACE_SUFFIX))
+            return outputs
+
+        self._export_count += 1
+        self._submit_render(f'export:{self._export_count}', job, on_done, on_error)
+        self.manager.current = 'motor_control' # Volta a tela enquanto o arquivo é gerado
+
+    def _submit_render(self, key, job, on_done, on_error):
+        """Envia o job para o serviço de renderização e mantém o indicador de progresso ativo até o fim."""
+        self._active_renders.add(key)
+        self.rendering = True
+
+        def finish(callback):
+            def wrapper(value):
+                self._active_renders.discard(key)
+                self.rendering = bool(self._active_renders)
+                callback(value)
+            return wrapper
+
+        render_service.submit(key, job, finish(on_done), finish(on_error))
 
     #---------------- Limpar Dados e Iniciar Novo Gráfico ------------------ 
     def limpa_dados(self):
@@ -471,88 +839,231 @@ class MotorControlScreen(Screen):
         popup.open()
         
     def limpa_dados_confirmado(self):
-        """Executa a limpeza de todos os dados globais, reseta a posição e envia o comando para retornar o motor a 0°"""
-        global angles_deg, powers, reference_power
-        
-        steps_to_zero = int(self.posicao) # Obtém a posição atual
+        """Executa a limpeza de todos os dados, reseta a posição e envia o comando para retornar o motor a 0°"""
+        if self._varredura_em_andamento(): # A thread da varredura ainda move o motor e grava no store
+            return
         
-        # Limpa os dados globais
-        angles_deg = []
-        powers = []
-        reference_power = None 
-        self.posicao = 0
-        self.last_slider_value = 0
-        self.atualizar_label()
+        self._salvar_sessao_pendente() # Os dados brutos não se perdem ao limpar
         
-        if steps_to_zero > 0:
-            command = self._format_command('L', steps_to_zero)
-            self.send_bluetooth_data(command)
-        else:
-            pass
+        # Limpa as medidas
+        self.store.clear()
+        self.ids.polar_view.refresh()
+        self.sweep_resumable = False # As medidas da varredura interrompida foram descartadas
+        plan = self.go_to_angle(0, home=True)
+        if plan is not None:
+            self.posicao = plan.position
+            self.last_slider_value = plan.position
+            self.atualizar_label()
+        if journal is not None:
+            journal.snapshot(self.store, self._grid) # O diário passa a conter só o store vazio, a grade e a posição
         
         message = "Dados de Potência e Ângulo Excluídos."
         popup_success = ConfirmationPopup(message=message) 
         popup_success.open()
         
+    #---------------- Perfis de Calibração ------------------
+    def _pasta_de_importacao(self):
+        """Pasta inicial do seletor de arquivos: Download do armazenamento compartilhado no Android."""
+        if platform == 'android':
+            try:
+                from android.storage import primary_external_storage_path # type: ignore
+                folder = os.path.join(primary_external_storage_path(), 'Download')
+                if os.path.isdir(folder):
+                    return folder
+            except ImportError:
+                pass
+        return os.path.expanduser('~')
+
+    def abrir_importacao_calibracao(self, on_imported=None):
+        """Abre o seletor de CSV; o perfil importado é passado pelo nome para 'on_imported'."""
+        popup = CalibrationImportPopup(path=self._pasta_de_importacao(),
+                                       import_action=lambda path: self.importar_calibracao(path, on_imported))
+        popup.open()
+
+    def importar_calibracao(self, path, on_imported=None):
+        """Valida o CSV e o copia para os perfis do app (calibration.CalibrationStore). Retorna o nome ou None."""
+        try:
+            profile = self.calibrations.import_csv(path)
+        except Exception as e:
+            popup = ConfirmationPopup(message=f"ERRO ao Importar a Calibração:\n{e}")
+            popup.open()
+            return None
+        if on_imported:
+            on_imported(profile.name)
+        popup = ConfirmationPopup(message=f"Perfil de Calibração Importado:\n{profile.name}")
+        popup.open()
+        return profile.name
+
+    #---------------- Varreduras Salvas ------------------
+    def salvar_sessao(self, title, frequency):
+        """Grava as medidas atuais no banco de varreduras, se ainda não foram gravadas."""
+        if len(self.store) < 1 or self._saved_version == self.store.version:
+            return None
+        try:
+            sweep_id = self.sessions.save(title, frequency, self.store.angles(), self.store.powers(),
+                                          self.store.counts(), stds=self.store.stds())
+        except Exception as e:
+            message = f"ERRO ao Gravar a Varredura: {e}"
+            popup = ConfirmationPopup(message=message)
+            popup.open()
+            return None
+        self._saved_version = self.store.version
+        return sweep_id
+
+    def _salvar_sessao_pendente(self):
+        """Grava com um título automático as medidas que ainda não foram salvas."""
+        self.salvar_sessao(time.strftime("Sessão %d/%m/%Y %H:%M"), "")
+
+    def salvar_grade(self, title, frequency):
+        """Grava as células da varredura 2D no banco de varreduras, se ainda não foram gravadas."""
+        grid = self._grid
+        if grid is None or len(grid) < 1 or self._saved_grid == (grid, grid.version):
+            return None
+        try:
+            grid_id = self.sessions.save_grid(title, frequency, grid.az_step, grid.el_step, *grid.cells())
+        except Exception as e:
+            message = f"ERRO ao Gravar a Varredura 2D: {e}"
+            popup = ConfirmationPopup(message=message)
+            popup.open()
+            return None
+        self._saved_grid = (grid, grid.version)
+        return grid_id
+
+    def _salvar_grade_pendente(self):
+        """Grava com um título automático as células 2D que ainda não foram salvas."""
+        self.salvar_grade(time.strftime("Mapa 2D %d/%m/%Y %H:%M"), "")
+
+    def abrir_sessoes(self):
+        """Abre a lista de varreduras salvas (1D e 2D, da mais recente para a mais antiga)."""
+        try:
+            records = self.sessions.list() + self.sessions.list_grids()
+            records.sort(key=lambda record: record.created_at, reverse=True)
+        except Exception as e:
+            popup = ConfirmationPopup(message=f"ERRO ao Ler as Varreduras Salvas: {e}")
+            popup.open()
+            return
+        if not records:
+            popup = ConfirmationPopup(message="Nenhuma Varredura Salva.")
+            popup.open()
+            return
+        popup = SessionListPopup(records=records, open_action=self._abrir_registro)
+        popup.open()
+
+    def _abrir_registro(self, record):
+        if hasattr(record, 'az_step'): # session_store.GridRecord
+            self.abrir_grade(record.id)
+        else:
+            self.abrir_sessao(record.id)
+
+    def abrir_sessao(self, sweep_id):
+        """Substitui as medidas atuais pelas de uma varredura salva."""
+        if self._varredura_em_andamento():
+            return
+        self._salvar_sessao_pendente()
+        try:
+            record = self.sessions.get(sweep_id)
+            data = self.sessions.load(sweep_id)
+            stds = data['std'] if 'std' in data.dtype.names else None # Varreduras antigas não têm o desvio
+            self.store.load_arrays(data['angle'], data['power'], data['count'], stds)
+        except Exception as e:
+            popup = ConfirmationPopup(message=f"ERRO ao Abrir a Varredura: {e}")
+            popup.open()
+            return
+        self._saved_version = self.store.version
+        self.ids.polar_view.refresh()
+        if journal is not None:
+            journal.snapshot(self.store, self._grid)
+        message = f"Varredura Aberta:\n{record.title}\n{record.n_points} pontos"
+        popup = ConfirmationPopup(message=message)
+        popup.open()
+
+    def abrir_grade(self, grid_id):
+        """Substitui a grade 2D atual pela de uma varredura 2D salva."""
+        if self._varredura_em_andamento():
+            return
+        self._salvar_grade_pendente()
+        try:
+            from grid_store import GridStore
+            record = self.sessions.get_grid(grid_id)
+            data = self.sessions.load_grid(grid_id)
+            grid = GridStore(record.az_step, record.el_step)
+            grid.load_cells(data['azimuth'], data['elevation'], data['power'], data['count'], data['std'])
+        except Exception as e:
+            popup = ConfirmationPopup(message=f"ERRO ao Abrir a Varredura 2D: {e}")
+            popup.open()
+            return
+        self._grid = grid
+        self._saved_grid = (grid, grid.version)
+        if self._sweep_resume is not None and self._sweep_resume[0] == self.start_raster_sweep:
+            self.sweep_resumable = False # A grade da varredura interrompida foi substituída
+        if journal is not None:
+            journal.snapshot(self.store, self._grid)
+        message = f"Varredura 2D Aberta:\n{record.title}\n{record.n_points} células"
+        popup = ConfirmationPopup(message=message)
+        popup.open()
+
     def preview_graph(self):
-        """Salva o gráfico em um arquivo temporário e o exibe em um popup Kivy."""
-        global powers
-        global reference_power
-        
-        if len(powers) < 1:
+        """Renderiza o gráfico em memória, em segundo plano, e o exibe em um popup Kivy."""
+        if len(self.store) < 1:
             message = "Adicione ao Menos uma Medida de Potência para Pré-Visualizar."
             self.manager.get_screen('bluetooth_connection').show_popup_message(message)
             return
         
-        reference_power = np.max(powers) 
-        angles_np = np.array(angles_deg) 
-        powers_np = np.array(powers)
-        angles_rad = np.deg2rad(angles_np)
-        gains_dB = powers_np - reference_power
-        sorted_indices = np.argsort(angles_rad)
-        angles_rad = angles_rad[sorted_indices]
-        gains_dB = gains_dB[sorted_indices]
-        angles_rad = np.append(angles_rad, angles_rad[0])
-        gains_dB = np.append(gains_dB, gains_dB[0])
-
-        min_gain = int(np.floor(np.min(gains_dB) / 5) * 5)
-        max_gain = 0 
-        
-        
-        fig = plt.figure(figsize=(8, 8))
-        ax = fig.add_subplot(111, polar=True) 
-        ax.plot( angles_rad,gains_dB,marker='o', linestyle='-', color='#087e9e')
-        ax.fill(angles_rad, gains_dB, alpha=0.2, color='#087e9e')
-        full_title = f"Diagrama de Radiação"
-        ax.set_title(full_title, va='bottom', fontsize=16, y=1.08) 
-        
-        ax.set_theta_zero_location('S')
-        ax.set_theta_direction(-1)
-        ax.set_rlabel_position(135)
-        ax.set_rlim(min_gain, max_gain)
-        ax.set_rticks(np.arange(min_gain, max_gain + 1, 5))
-        ax.grid(True)
-        temp_path = os.path.join(App.get_running_app().user_data_dir, "temp_graph.png")
-        
-        try:
-            fig.savefig(temp_path, format='png', dpi=150)
-            plt.close(fig)
-            popup = GraphViewerPopup(image_path=temp_path)
+        spec = plot_spec(self.pattern, "Diagrama de Radiação")
+
+        def on_done(image):
+            popup = GraphViewerPopup(image=image)
             popup.open()
-            
-        except Exception as e:
+
+        def on_error(e):
             self.manager.get_screen('bluetooth_connection').show_popup_message(f"ERRO ao Gerar Preview: {e}")
+
+        # Um novo pedido de preview descarta o anterior, se ele ainda não tiver terminado
+        self._submit_render('preview', lambda: render_to_rgba(spec, dpi=PREVIEW_DPI, cache=render_cache), on_done, on_error)
             
+    def preview_grid(self):
+        """Mostra o mapa azimute x elevação e os cortes nos planos principais da varredura 2D."""
+        if self._grid is None or len(self._grid) < 1:
+            message = "Faça uma Varredura 2D para Ver o Mapa."
+            popup = ConfirmationPopup(message=message)
+            popup.open()
+            return
+
+        spec = grid_spec(self.grid, "Mapa Azimute x Elevação")
+
+        def on_done(image):
+            popup = GraphViewerPopup(image=image)
+            popup.open()
+
+        def on_error(e):
+            popup = ConfirmationPopup(message=f"ERRO ao Gerar o Mapa: {e}")
+            popup.open()
+
+        self._submit_render('preview', lambda: render_to_rgba(spec, dpi=PREVIEW_DPI, cache=render_cache), on_done, on_error)
+
+    #---------------- Desempenho ------------------
+    def toggle_perf_overlay(self, visible):
+        """Mostra/esconde a tabela de tempos por etapa; a medição fica ligada enquanto ela estiver visível."""
+        self.perf_overlay = visible
+        tracer.enable(visible)
+        if self._perf_event is not None:
+            self._perf_event.cancel()
+            self._perf_event = None
+        if visible:
+            self._update_perf_overlay()
+            self._perf_event = Clock.schedule_interval(self._update_perf_overlay, 1.0)
+
+    def _update_perf_overlay(self, *args):
+        self.perf_text = tracer.format_stats()
+
     # Adicionando um método de reset para o estado do motor
     def reset_motor_position(self):
         """Retorna a posição da antena para 0°."""
-        steps_to_zero = int(self.posicao)
-        if steps_to_zero > 0:
-            command = self._format_command('L', steps_to_zero)
-            self.send_bluetooth_data(command)
-        self.posicao = 0
-        self.last_slider_value = 0
-        self.atualizar_label()
+        plan = self.go_to_angle(0, home=True)
+        if plan is not None:
+            self.posicao = plan.position
+            self.last_slider_value = plan.position
+            self.atualizar_label()
 
 
 # -----------------------------------------------------------------------------------------------------------------------------------
@@ -562,18 +1073,34 @@ class SaveScreen(Screen):
     """Tela para selecionar o local e nome do arquivo de salvamento."""
     
     path = StringProperty(os.getcwd()) # Propriedades para controle do FileChooser e nome
-    filename_text = StringProperty("Diagrama_Radiacao.png")
+    filename_text = StringProperty("Diagrama_Radiacao")
+    formats = ListProperty(['png']) # Formatos marcados (figura: png/pdf; dados: csv/npz/jsonl)
+
+    def toggle_format(self, file_format, selected):
+        """Marca ou desmarca um formato de exportação."""
+        formats = [f for f in self.formats if f != file_format]
+        if selected:
+            formats.append(file_format)
+        self.formats = formats
     
     def save_file(self, path, filename):
         """Chama a função real de salvamento na tela MotorControlScreen."""
+        from exporters import split_format, EXPORT_FORMATS
+
+        base, extension = split_format(filename.strip())
+        formats = [f for f in EXPORT_FORMATS if f in self.formats or f == extension] # Uma extensão digitada também conta
         
-        if not filename:
+        if not base:
             message = f"Nome do Arquivo Não Pode Ser Vazio. \n Insira um Nome Válido"
             popup = ConfirmationPopup(message=message)
             popup.open()
             return
+        if not formats:
+            popup = ConfirmationPopup(message="Selecione ao Menos um Formato.")
+            popup.open()
+            return
             
-        self.manager.get_screen('motor_control')._perform_save(path, filename)
+        self.manager.get_screen('motor_control')._perform_save(path, base, formats)
 
 # -----------------------------------------------------------------------------------------------------------------------------------
 #                                                     CLASSES AUXILIARES
@@ -593,15 +1120,14 @@ class ConfirmationDeletePopup(Popup):
     
     confirm_action = ObjectProperty(None) 
     
-    def __init__(self, **kwargs):
+    def __init__(self, message="Deseja Excluir Todos os Dados\ne Retornar a Antena para 0° ?", **kwargs):
         super().__init__(**kwargs)
         self.title = 'ATENÇÃO'
         self.size_hint = (0.7, 0.25)
         self.auto_dismiss = False # Não fecha ao clicar fora para garantir a escolha
         
         content_layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
-        content_layout.add_widget(Label(text="Deseja Excluir Todos os Dados\ne Retornar a Antena para 0° ?",
-                                         halign='center', markup=True))
+        content_layout.add_widget(Label(text=message, halign='center', markup=True))
         
         button_layout = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(40))
         
@@ -625,11 +1151,12 @@ class PlotInputPopup(Popup):
     """Popup para capturar o título do gráfico e a frequência."""
  
     plot_action = ObjectProperty(None) 
+    import_action = ObjectProperty(None) # Abre a importação de um perfil; recebe add_profile como retorno
     
-    def __init__(self, **kwargs):
+    def __init__(self, profiles=(), **kwargs):
         super().__init__(**kwargs)
         self.title = 'DETALHES DO GRÁFICO'
-        self.size_hint = (0.7, 0.5)
+        self.size_hint = (0.7, 0.65)
         self.auto_dismiss = False
         
         # Cria os TextInputs para que o método on_confirm possa acessá-los
@@ -645,6 +1172,13 @@ class PlotInputPopup(Popup):
             size_hint_y=None, 
             height=dp(40)
         )
+        # Perfis de calibração (calibration.py) disponíveis; sem perfil, o ganho é relativo ao pico
+        self.profile_spinner = Spinner(
+            text=NO_CALIBRATION,
+            values=(NO_CALIBRATION,) + tuple(profiles),
+            size_hint_y=None,
+            height=dp(40)
+        )
         
         content_layout = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(10))
         
@@ -653,6 +1187,16 @@ class PlotInputPopup(Popup):
         content_layout.add_widget(self.title_input)
         content_layout.add_widget(Label(text="Frequência para Legenda:"))
         content_layout.add_widget(self.freq_input)
+        content_layout.add_widget(Label(text="Calibração (Ganho em dBi):"))
+        if self.import_action:
+            profile_layout = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(40))
+            profile_layout.add_widget(self.profile_spinner)
+            btn_import = Button(text='Importar', size_hint_x=None, width=dp(100),
+                                on_release=lambda instance: self.import_action(self.add_profile))
+            profile_layout.add_widget(btn_import)
+            content_layout.add_widget(profile_layout)
+        else:
+            content_layout.add_widget(self.profile_spinner)
         
         # Botões
         button_layout = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(40))
@@ -668,36 +1212,246 @@ class PlotInputPopup(Popup):
         """Passa os dados inseridos para a função de plotagem e fecha o popup."""
         graph_title = self.title_input.text if self.title_input.text else "Diagrama de Radiação"
         freq_text = self.freq_input.text if self.freq_input.text else " "
+        profile_name = None if self.profile_spinner.text == NO_CALIBRATION else self.profile_spinner.text
         
         if self.plot_action:
-            self.plot_action(graph_title, freq_text) 
+            self.plot_action(graph_title, freq_text, profile_name) 
         self.dismiss()
-    
 
-# Sua classe GraphViewerPopup atual:
+    def add_profile(self, name):
+        """Inclui um perfil recém-importado na lista e o seleciona."""
+        if name not in self.profile_spinner.values:
+            self.profile_spinner.values = (NO_CALIBRATION,) + tuple(sorted(list(self.profile_spinner.values[1:]) + [name]))
+        self.profile_spinner.text = name
+
+class CalibrationImportPopup(Popup):
+    """Seletor de um CSV de calibração (colunas de calibration.PROFILE_COLUMNS) para copiar para o app."""
+
+    import_action = ObjectProperty(None)
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.title = 'IMPORTAR CALIBRAÇÃO (CSV)'
+        self.size_hint = (0.9, 0.85)
+        self.auto_dismiss = False
+
+        content_layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+        content_layout.add_widget(Label(text="frequency_hz, cable_loss_db, reference_gain_dbi, reference_power_dbm",
+                                        size_hint_y=None, height=dp(30)))
+        self.chooser = FileChooserListView(path=path, filters=['*.csv', '*.CSV'])
+        content_layout.add_widget(self.chooser)
+
+        button_layout = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(40))
+        button_layout.add_widget(Button(text='Importar', on_release=self.on_confirm))
+        button_layout.add_widget(Button(text='Cancelar', on_release=self.dismiss))
+        content_layout.add_widget(button_layout)
+        self.content = content_layout
+
+    def on_confirm(self, instance):
+        if not self.chooser.selection:
+            popup = ConfirmationPopup(message="Selecione um Arquivo CSV.")
+            popup.open()
+            return
+        if self.import_action:
+            self.import_action(self.chooser.selection[0])
+        self.dismiss()
+
+class SweepInputPopup(Popup):
+    """Popup para configurar o ângulo inicial, final e o passo da varredura automática."""
+
+    sweep_action = ObjectProperty(None)
+
+    def __init__(self, passo_padrao=1, **kwargs):
+        super().__init__(**kwargs)
+        self.title = 'VARREDURA AUTOMÁTICA'
+        self.size_hint = (0.7, 0.9)
+        self.auto_dismiss = False
+
+        self.start_input = TextInput(text='0', input_filter='int', multiline=False, size_hint_y=None, height=dp(40))
+        self.stop_input = TextInput(text='360', input_filter='int', multiline=False, size_hint_y=None, height=dp(40))
+        self.step_input = TextInput(text=str(passo_padrao), input_filter='int', multiline=False, size_hint_y=None, height=dp(40))
+        self.samples_input = TextInput(text='1', input_filter='int', multiline=False, size_hint_y=None, height=dp(40))
+        self.ci_input = TextInput(hint_text='Vazio: sempre o máximo', input_filter='float', multiline=False,
+                                  size_hint_y=None, height=dp(40))
+        self.min_step_input = TextInput(hint_text='Vazio: passo uniforme', input_filter='int', multiline=False,
+                                        size_hint_y=None, height=dp(40))
+
+        content_layout = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(10))
+        content_layout.add_widget(Label(text="Ângulo Inicial (°):"))
+        content_layout.add_widget(self.start_input)
+        content_layout.add_widget(Label(text="Ângulo Final (°):"))
+        content_layout.add_widget(self.stop_input)
+        content_layout.add_widget(Label(text="Passo (°):"))
+        content_layout.add_widget(self.step_input)
+        content_layout.add_widget(Label(text="Leituras por Ângulo (máx.):"))
+        content_layout.add_widget(self.samples_input)
+        content_layout.add_widget(Label(text="Parar com IC 95% abaixo de (dB):"))
+        content_layout.add_widget(self.ci_input)
+        content_layout.add_widget(Label(text="Refinar picos e nulos até o passo de (°):"))
+        content_layout.add_widget(self.min_step_input)
+
+        button_layout = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(40))
+        btn_confirm = Button(text='Iniciar', on_release=self.on_confirm)
+        btn_cancel = Button(text='Cancelar', on_release=self.dismiss)
+        button_layout.add_widget(btn_confirm)
+        button_layout.add_widget(btn_cancel)
+
+        content_layout.add_widget(button_layout)
+        self.content = content_layout
+
+    def on_confirm(self, instance):
+        """Valida os campos (limitados a 0°-360°) e inicia a varredura."""
+        try:
+            start = max(0, min(360, int(self.start_input.text)))
+            stop = max(0, min(360, int(self.stop_input.text)))
+            step = int(self.step_input.text)
+            max_samples = max(1, int(self.samples_input.text or 1))
+            ci_threshold = float(self.ci_input.text) if self.ci_input.text else None
+            min_step = int(self.min_step_input.text) if self.min_step_input.text else None
+        except ValueError:
+            popup = ConfirmationPopup(message="Preencha Todos os Campos da Varredura.")
+            popup.open()
+            return
+
+        if self.sweep_action:
+            self.sweep_action(start, stop, step, max_samples, ci_threshold, min_step)
+        self.dismiss()
+
+
+class RasterInputPopup(Popup):
+    """Popup para configurar a varredura 2D: faixas e passos de azimute e de elevação."""
+
+    sweep_action = ObjectProperty(None)
+
+    def __init__(self, passo_padrao=5, **kwargs):
+        super().__init__(**kwargs)
+        self.title = 'VARREDURA 2D (AZIMUTE x ELEVAÇÃO)'
+        self.size_hint = (0.85, 0.9)
+        self.auto_dismiss = False
+
+        def field(text):
+            return TextInput(text=text, input_filter='int', multiline=False, size_hint_y=None, height=dp(40))
+
+        self.az_inputs = (field('0'), field('355'), field(str(passo_padrao)))
+        self.el_inputs = (field('-30'), field('30'), field(str(passo_padrao)))
+        self.samples_input = field('1')
+        self.ci_input = TextInput(hint_text='Vazio: sempre o máximo', input_filter='float', multiline=False,
+                                  size_hint_y=None, height=dp(40))
+
+        content_layout = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(10))
+        grid_layout = GridLayout(cols=4, spacing=dp(6), size_hint_y=None, height=dp(130))
+        for text in ("", "Inicial (°)", "Final (°)", "Passo (°)"):
+            grid_layout.add_widget(Label(text=text))
+        grid_layout.add_widget(Label(text="Azimute"))
+        for widget in self.az_inputs:
+            grid_layout.add_widget(widget)
+        grid_layout.add_widget(Label(text="Elevação"))
+        for widget in self.el_inputs:
+            grid_layout.add_widget(widget)
+        content_layout.add_widget(grid_layout)
+        content_layout.add_widget(Label(text="Leituras por Ponto (máx.):"))
+        content_layout.add_widget(self.samples_input)
+        content_layout.add_widget(Label(text="Parar com IC 95% abaixo de (dB):"))
+        content_layout.add_widget(self.ci_input)
+
+        button_layout = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(40))
+        button_layout.add_widget(Button(text='Iniciar', on_release=self.on_confirm))
+        button_layout.add_widget(Button(text='Cancelar', on_release=self.dismiss))
+        content_layout.add_widget(button_layout)
+        self.content = content_layout
+
+    def on_confirm(self, instance):
+        """Valida os campos (azimute em 0°-360°) e inicia a varredura."""
+        try:
+            az_start, az_stop, az_step = (int(widget.text) for widget in self.az_inputs)
+            el_range = tuple(int(widget.text) for widget in self.el_inputs)
+            max_samples = max(1, int(self.samples_input.text or 1))
+            ci_threshold = float(self.ci_input.text) if self.ci_input.text else None
+        except ValueError:
+            popup = ConfirmationPopup(message="Preencha Todos os Campos da Varredura.")
+            popup.open()
+            return
+
+        az_range = (max(0, min(360, az_start)), max(0, min(360, az_stop)), az_step)
+        if self.sweep_action:
+            self.sweep_action(az_range, el_range, max_samples, ci_threshold)
+        self.dismiss()
+
+
+class SessionListPopup(Popup):
+    """Lista as varreduras salvas (SweepRecord ou GridRecord); tocar em uma delas a reabre."""
+
+    open_action = ObjectProperty(None)
+
+    def __init__(self, records, **kwargs):
+        super().__init__(**kwargs)
+        self.title = 'VARREDURAS SALVAS'
+        self.size_hint = (0.9, 0.8)
+
+        content_layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+        records_layout = GridLayout(cols=1, spacing=dp(6), size_hint_y=None)
+        records_layout.bind(minimum_height=records_layout.setter('height'))
+        for record in records:
+            date = time.strftime("%d/%m/%Y %H:%M", time.localtime(record.created_at))
+            frequency = record.frequency.strip() or "-"
+            if hasattr(record, 'az_step'): # Varredura 2D
+                details = f"{record.n_points} células - Mapa 2D"
+            else:
+                details = f"{record.n_points} pontos"
+            btn = Button(text=f"{record.title} ({frequency})\n{date} - {details}",
+                         halign='center', size_hint_y=None, height=dp(56))
+            btn.bind(on_release=lambda instance, record=record: self.on_select(record))
+            records_layout.add_widget(btn)
+
+        scroll = ScrollView(do_scroll_x=False)
+        scroll.add_widget(records_layout)
+        content_layout.add_widget(scroll)
+        btn_close = Button(text='Fechar', size_hint_y=None, height=dp(40), on_release=self.dismiss)
+        content_layout.add_widget(btn_close)
+        self.content = content_layout
+
+    def on_select(self, record):
+        if self.open_action:
+            self.open_action(record)
+        self.dismiss()
+
+class BusySpinner(Widget):
+    """Indicador de atividade (arco girando) exibido enquanto um gráfico é gerado."""
+
+    active = BooleanProperty(False)
+    angle = NumericProperty(0)
+
+    def on_active(self, instance, active):
+        Animation.cancel_all(self, 'angle')
+        if active:
+            self.angle = 0
+            animation = Animation(angle=360, duration=0.8)
+            animation.repeat = True
+            animation.start(self)
+
 class GraphViewerPopup(Popup):
-    """Exibe o gráfico salvo temporariamente, força a atualização e inclui o botão Fechar."""
-    def __init__(self, image_path, **kwargs):
+    """Exibe o gráfico renderizado em memória (rendering.RgbaImage) e inclui o botão Fechar."""
+    def __init__(self, image, **kwargs):
         super().__init__(**kwargs)
         self.title = 'Pré-Visualização do Diagrama'
         self.size_hint = (0.9, 0.9) 
         content_layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
-        graph_image = Image(allow_stretch=True, keep_ratio=True)
-        graph_image.source = image_path 
-        graph_image.reload() 
+        # Envia os pixels do Agg direto para a GPU; o buffer vem com a linha 0 no topo, por isso o flip
+        texture = Texture.create(size=image.size, colorfmt='rgba')
+        texture.blit_buffer(image.pixels, colorfmt='rgba', bufferfmt='ubyte')
+        texture.flip_vertical()
+        graph_image = Image(texture=texture, allow_stretch=True, keep_ratio=True)
         content_layout.add_widget(graph_image)
         btn_close = Button(text='Fechar', size_hint_y=None, height=dp(40), on_release=self.dismiss)
         content_layout.add_widget(btn_close)
         self.content = content_layout
-        # A exclusão no on_dismiss deve ser agendada para garantir que a imagem não seja excluída antes
-        # de ser carregada.
-        self.bind(on_dismiss=lambda instance: Clock.schedule_once(lambda dt: os.remove(image_path) if os.path.exists(image_path) else None, 0.1))
         
 # -----------------------------------------------------------------------------------------------------------------------------------
 #                                                     CLASSE PRINCIPAL DO APP
 # -----------------------------------------------------------------------------------------------------------------------------------
 class MainApp(App):
     def build(self):
+        startup_timer.mark("início do build")
         self.title = "Caracterizador de Antenas"
         sm = ScreenManager()
         bluetooth_screen = BluetoothScreen(name='bluetooth_connection')
@@ -707,10 +1461,17 @@ class MainApp(App):
         sm.add_widget(motor_control_screen)
         sm.add_widget(save_screen)
         sm.current = 'bluetooth_connection'
+        startup_timer.mark("build")
         return sm
         
     def on_start(self):
         """Chamado na inicialização"""
+        startup_timer.mark("on_start")
+        render_cache.directory = os.path.join(self.user_data_dir, 'render_cache')
+        self._abrir_diario()
+        # Depois do primeiro quadro: relatório de abertura e pré-carregamento de NumPy/Matplotlib
+        Clock.schedule_once(self._after_first_frame, 0)
+
         if platform == 'android':
             try:
                 from android.permissions import request_permissions, Permission # type: ignore
@@ -765,5 +1526,48 @@ class MainApp(App):
             def initialize_bluetooth_classes():
                 return False
 
+    def _abrir_diario(self):
+        """Recupera as medidas e a posição da sessão anterior (encerrada sem salvar) e passa a registrar."""
+        global journal
+        journal = Journal(os.path.join(self.user_data_dir, 'journal.bin'),
+                          on_error=lambda e: Clock.schedule_once(lambda dt: self._falha_no_diario(e), 0))
+        motor_screen = self.root.get_screen('motor_control')
+        try:
+            applied = motor_screen.restaurar_diario(journal)
+        except Exception as e:
+            print(f"ERRO ao Ler o Diário: {e}")
+            applied = 0
+        journal.start()
+        startup_timer.mark("diário")
+        if applied:
+            message = f"Sessão Anterior Recuperada:\n{len(motor_screen.store)} medida(s)\n"
+            if journal.grid is not None:
+                message += f"{len(journal.grid)} célula(s) 2D\n"
+            message += f"Posição {int(motor_screen.posicao)}°"
+            popup = ConfirmationPopup(message=message)
+            popup.open()
+
+    def _falha_no_diario(self, error):
+        """Informa (uma vez por falha, não a cada nova tentativa) que o diário deixou de ser gravado."""
+        message = f"ERRO ao Gravar o Diário:\n{error}\nAs Medidas Recentes Podem Não Ser Recuperadas."
+        popup = ConfirmationPopup(message=message)
+        popup.open()
+
+    def on_pause(self):
+        """Android pode encerrar o app em segundo plano: garante o diário no disco antes."""
+        if journal is not None and not journal.flush(timeout=2.0):
+            print("ERRO: Diário Incompleto no Disco ao Pausar o App.")
+        return True
+
+    def on_stop(self):
+        if journal is not None:
+            journal.close()
+
+    def _after_first_frame(self, dt):
+        startup_timer.mark("primeiro quadro")
+        startup_timer.prewarm(on_done=lambda: print(startup_timer.report()))
+
+
+if __name__ == '__main__':
     MotorControlScreen.passo.defaultvalue = 1
     MainApp().run()
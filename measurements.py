@@ -0,0 +1,170 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                           ARMAZENAMENTO DAS MEDIDAS
+# -------------------------------------------------------------------------------------------------------------
+import numpy as np # type: ignore
+
+from sample_stats import T_95, Z_95, mean_std
+
+DEFAULT_RESOLUTION = 1.0 # Largura (graus) de cada posição do vetor de medidas
+FULL_CIRCLE = 360.0
+
+
+class MeasurementStore:
+    """
+    Medidas de potência indexadas por ângulo, guardadas em vetores NumPy pré-alocados.
+
+    Cada posição ('bin') cobre 'resolution' graus, de 0° até 360° inclusive (0° e 360° são
+    medidas distintas, como na tela do motor). Inserir ou atualizar um ponto é O(1) e, como
+    os bins já estão em ordem de ângulo, angles()/powers() saem ordenados sem argsort.
+    Um bin pode acumular várias amostras (add_sample); o valor exposto é a média delas. Média e
+    variância são atualizadas pelo algoritmo de Welford (média e soma dos quadrados dos desvios
+    por bin), sem guardar as amostras.
+    """
+
+    def __init__(self, resolution=DEFAULT_RESOLUTION, span=FULL_CIRCLE):
+        if resolution <= 0:
+            raise ValueError("A resolução deve ser maior que zero.")
+        self.resolution = float(resolution)
+        self.n_bins = int(round(span / self.resolution)) + 1
+        self.bin_angles = np.arange(self.n_bins) * self.resolution
+        self._mean = np.zeros(self.n_bins)
+        self._m2 = np.zeros(self.n_bins) # Soma dos quadrados dos desvios em relação à média (Welford)
+        self._count = np.zeros(self.n_bins, dtype=np.int32)
+        self._valid = np.zeros(self.n_bins, dtype=bool)
+        self._size = 0
+        self.version = 0 # Incrementado a cada alteração (permite cache por quem lê os dados)
+        self._views_version = -1
+        self._views = None
+
+    def __len__(self):
+        return self._size
+
+    def bin_index(self, angle):
+        """Índice do bin correspondente ao ângulo (em graus)."""
+        index = int(round(float(angle) / self.resolution))
+        if not 0 <= index < self.n_bins:
+            raise ValueError(f"Ângulo fora da faixa: {angle}°")
+        return index
+
+    def set(self, angle, power):
+        """Grava uma única amostra no ângulo, substituindo as anteriores. Retorna True se o bin já existia."""
+        index = self.bin_index(angle)
+        existed = bool(self._valid[index])
+        self._mean[index] = power
+        self._m2[index] = 0.0
+        self._count[index] = 1
+        self._mark_valid(index, existed)
+        return existed
+
+    def set_samples(self, angle, samples):
+        """Grava várias amostras no ângulo, substituindo as anteriores. Retorna True se o bin já existia."""
+        index = self.bin_index(angle)
+        existed = bool(self._valid[index])
+        mean, std = mean_std(samples)
+        self._mean[index] = mean
+        self._m2[index] = std * std * (len(samples) - 1)
+        self._count[index] = len(samples)
+        self._mark_valid(index, existed)
+        return existed
+
+    def add_sample(self, angle, power):
+        """Acumula mais uma amostra no ângulo. Retorna True se o bin já tinha amostras."""
+        index = self.bin_index(angle)
+        existed = bool(self._valid[index])
+        count = self._count[index] + 1
+        delta = power - self._mean[index]
+        self._mean[index] += delta / count
+        self._m2[index] += delta * (power - self._mean[index])
+        self._count[index] = count
+        self._mark_valid(index, existed)
+        return existed
+
+    def _mark_valid(self, index, existed):
+        if not existed:
+            self._valid[index] = True
+            self._size += 1
+        self.version += 1
+
+    def load_arrays(self, angles, powers, counts=None, stds=None):
+        """Substitui todo o conteúdo pelos vetores dados (potência média, nº de amostras e desvio padrão por ângulo)."""
+        angles = np.asarray(angles, dtype=float)
+        counts = np.ones(len(angles), dtype=np.int32) if counts is None else np.asarray(counts, dtype=np.int32)
+        indices = np.rint(angles / self.resolution).astype(int)
+        if len(indices) and (indices.min() < 0 or indices.max() >= self.n_bins):
+            raise ValueError("Ângulo fora da faixa.")
+        self.clear()
+        self._mean[indices] = powers
+        if stds is not None:
+            self._m2[indices] = np.nan_to_num(np.asarray(stds, dtype=float)) ** 2 * np.maximum(counts - 1, 0)
+        self._count[indices] = counts
+        self._valid[indices] = True
+        self._size = int(self._valid.sum())
+        self.version += 1
+
+    def clear(self):
+        self._mean[:] = 0.0
+        self._m2[:] = 0.0
+        self._count[:] = 0
+        self._valid[:] = False
+        self._size = 0
+        self.version += 1
+
+    def bin_mean(self, index):
+        """Potência média de um bin (NaN se o bin estiver vazio)."""
+        if not self._valid[index]:
+            return np.nan
+        return self._mean[index]
+
+    def bin_means(self):
+        """Potência média de todos os bins, com NaN nos bins vazios."""
+        means = np.full(self.n_bins, np.nan)
+        valid = self._valid
+        means[valid] = self._mean[valid]
+        return means
+
+    def bin_count(self, index):
+        """Número de amostras acumuladas no bin."""
+        return int(self._count[index])
+
+    def bin_std(self, index):
+        """Desvio padrão amostral de um bin (NaN com menos de duas amostras)."""
+        count = self._count[index]
+        if count < 2:
+            return np.nan
+        return float(np.sqrt(self._m2[index] / (count - 1)))
+
+    def _sorted_views(self):
+        """Ângulos, médias, contagens e desvios dos bins válidos (recalculados só após alterações)."""
+        if self._views_version != self.version:
+            valid = self._valid
+            counts = self._count[valid]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                stds = np.where(counts > 1, np.sqrt(self._m2[valid] / (counts - 1)), np.nan)
+            self._views = (self.bin_angles[valid], self._mean[valid], counts, stds)
+            self._views_version = self.version
+        return self._views
+
+    def angles(self):
+        """Ângulos medidos (graus), em ordem crescente."""
+        return self._sorted_views()[0]
+
+    def powers(self):
+        """Potência média (dBm) de cada ângulo medido, na mesma ordem de angles()."""
+        return self._sorted_views()[1]
+
+    def counts(self):
+        """Número de amostras de cada ângulo medido."""
+        return self._sorted_views()[2]
+
+    def stds(self):
+        """Desvio padrão amostral de cada ângulo medido (NaN onde há uma só amostra)."""
+        return self._sorted_views()[3]
+
+    def confidence_halfwidths(self):
+        """Meia largura do intervalo de confiança de 95% da média de cada ângulo (NaN com uma amostra)."""
+        counts = self.counts()
+        t = np.where(counts - 1 > len(T_95), Z_95, np.take(T_95, np.clip(counts - 2, 0, len(T_95) - 1)))
+        return t * self.stds() / np.sqrt(counts)
+
+    def max_power(self):
+        return float(np.max(self.powers()))
@@ -0,0 +1,179 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                      MÉTRICAS DO DIAGRAMA DE RADIAÇÃO
+# -------------------------------------------------------------------------------------------------------------
+# Todas as funções trabalham sobre uma matriz de ganhos (padrões x ângulos) sem laços em Python,
+# para que o mesmo código sirva para um diagrama ou para centenas de varreduras salvas de uma vez.
+# O diagrama é tratado como circular: entre o último ângulo medido e o primeiro (+360°) a curva
+# é interpolada linearmente, assim como entre quaisquer dois pontos vizinhos.
+from collections import namedtuple
+
+import numpy as np # type: ignore
+
+HALF_POWER_LEVEL = -3.0
+BEAMWIDTH_10DB_LEVEL = -10.0
+MIN_POINTS = 3 # Abaixo disso nenhuma métrica faz sentido
+
+# Ângulos em graus e níveis em dB relativos ao pico (cada campo é float ou vetor, um valor por padrão)
+PatternMetrics = namedtuple('PatternMetrics', [
+    'peak_angle',      # Direção do máximo
+    'hpbw',            # Largura de feixe de meia potência (-3 dB)
+    'beamwidth_10dB',  # Largura de feixe a -10 dB
+    'front_to_back',   # Razão frente-costas (pico / direção oposta), em dB
+    'null_left',       # Primeiro nulo antes do pico (sentido anti-horário)
+    'null_right',      # Primeiro nulo depois do pico
+    'sidelobe_level',  # Maior lóbulo fora do lóbulo principal
+    'directivity_dB',  # Diretividade 2D estimada pela integral do corte (dBi)
+])
+
+
+def normalize(gains):
+    """Subtrai o máximo de cada linha (ignorando NaN), deixando o pico em 0 dB."""
+    gains = np.asarray(gains, dtype=float)
+    return gains - np.nanmax(gains, axis=-1, keepdims=True)
+
+
+def resample(angles, gains, grid):
+    """Interpola (circularmente) um diagrama medido nos ângulos 'grid', para empilhar varreduras diferentes."""
+    angles = np.asarray(angles, dtype=float)
+    gains = np.asarray(gains, dtype=float)
+    valid = ~np.isnan(gains)
+    return np.interp(grid, angles[valid], gains[valid], period=360.0)
+
+
+def _circular_grid(angles, gains):
+    """Ordena os ângulos em [0, 360) e descarta repetições (ex.: 0° e 360°), mantendo a primeira."""
+    wrapped, first = np.unique(np.mod(np.asarray(angles, dtype=float), 360.0), return_index=True)
+    return wrapped, gains[:, first]
+
+
+def _rolled(angles, gains, peak_index, reverse=False):
+    """
+    Reordena cada linha a partir do pico: devolve os afastamentos angulares (0 a 360, com o pico
+    repetido no fim em 360°) e os ganhos correspondentes, andando no sentido crescente ou inverso.
+    """
+    n = angles.shape[0]
+    steps = -np.arange(n) if reverse else np.arange(n)
+    index = (peak_index[:, None] + steps[None, :]) % n
+    offsets = np.mod(angles[index] - angles[peak_index][:, None], 360.0)
+    if reverse:
+        offsets = np.mod(360.0 - offsets, 360.0)
+    rows = np.arange(gains.shape[0])[:, None]
+    rolled = gains[rows, index]
+    offsets = np.concatenate([offsets, np.full((gains.shape[0], 1), 360.0)], axis=1)
+    rolled = np.concatenate([rolled, rolled[:, :1]], axis=1)
+    return offsets, rolled
+
+
+def _interp_between(offsets, rolled, k, level):
+    """Afastamento onde a curva cruza 'level' entre as colunas k-1 e k (k por linha)."""
+    rows = np.arange(offsets.shape[0])
+    a0, a1 = offsets[rows, k - 1], offsets[rows, k]
+    g0, g1 = rolled[rows, k - 1], rolled[rows, k]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.where(g1 != g0, (level - g0) / (g1 - g0), 0.0)
+    return a0 + fraction * (a1 - a0)
+
+
+def _crossing(offsets, rolled, level):
+    """Afastamento da primeira passagem abaixo de 'level' a partir do pico; NaN se não houver."""
+    below = rolled < level
+    found = below.any(axis=1)
+    k = np.where(found, np.argmax(below, axis=1), 1)
+    return np.where(found, _interp_between(offsets, rolled, k, level), np.nan)
+
+
+def _value_at(offsets, rolled, target):
+    """Ganho interpolado no afastamento 'target' (mesmo para todas as linhas)."""
+    n = offsets.shape[1]
+    k = np.clip(np.sum(offsets <= target, axis=1), 1, n - 1)
+    rows = np.arange(offsets.shape[0])
+    a0, a1 = offsets[rows, k - 1], offsets[rows, k]
+    g0, g1 = rolled[rows, k - 1], rolled[rows, k]
+    fraction = np.where(a1 > a0, (target - a0) / np.where(a1 > a0, a1 - a0, 1.0), 0.0)
+    return g0 + fraction * (g1 - g0)
+
+
+def _first_null(rolled):
+    """
+    Coluna do primeiro mínimo local a partir do pico: o ponto mais baixo antes da curva voltar a
+    subir (em um patamar, o início dele; leituras em dBm inteiros repetem valores com frequência).
+    """
+    rising = np.diff(rolled, axis=1) > 0
+    found = rising.any(axis=1)
+    stop = np.where(found, np.argmax(rising, axis=1), 0)
+    before_rise = np.arange(rolled.shape[1])[None, :] <= stop[:, None]
+    return np.argmin(np.where(before_rise, rolled, np.inf), axis=1), found
+
+
+def _beamwidth(right, left, level):
+    width = _crossing(*right, level) + _crossing(*left, level)
+    return np.where(width <= 360.0, width, np.nan)
+
+
+def pattern_metrics(angles, gains):
+    """
+    Calcula as métricas de um diagrama (gains com forma (N,)) ou de vários diagramas amostrados nos
+    mesmos ângulos (forma (M, N)). Os ganhos podem estar em dBm ou já normalizados; NaN não é aceito
+    (use resample() para varreduras com ângulos diferentes).
+    """
+    single = np.ndim(gains) == 1
+    gains = np.atleast_2d(np.asarray(gains, dtype=float))
+    n_patterns = gains.shape[0]
+    if gains.shape[1] < MIN_POINTS:
+        empty = np.full(n_patterns, np.nan)
+        result = PatternMetrics(*([empty] * len(PatternMetrics._fields)))
+        return PatternMetrics(*(float(v[0]) for v in result)) if single else result
+    angles, gains = _circular_grid(angles, normalize(gains))
+
+    peak_index = np.argmax(gains, axis=1)
+    peak_angle = angles[peak_index]
+    right = _rolled(angles, gains, peak_index)
+    left = _rolled(angles, gains, peak_index, reverse=True)
+
+    hpbw = _beamwidth(right, left, HALF_POWER_LEVEL)
+    beamwidth_10dB = _beamwidth(right, left, BEAMWIDTH_10DB_LEVEL)
+    front_to_back = -_value_at(*right, 180.0)
+
+    # Nulos: primeiro mínimo local de cada lado do pico
+    rows = np.arange(n_patterns)
+    k_right, found_right = _first_null(right[1])
+    k_left, found_left = _first_null(left[1])
+    null_right = np.where(found_right, np.mod(peak_angle + right[0][rows, k_right], 360.0), np.nan)
+    null_left = np.where(found_left, np.mod(peak_angle - left[0][rows, k_left], 360.0), np.nan)
+
+    # Lóbulos secundários: tudo entre o primeiro nulo da direita e o da esquerda (no sentido crescente)
+    n = angles.shape[0]
+    column = np.arange(n + 1)[None, :]
+    outside = (column >= k_right[:, None]) & (column <= (n - k_left)[:, None])
+    outside &= (found_right & found_left)[:, None]
+    sidelobes = np.where(outside, right[1], -np.inf)
+    sidelobe_level = np.max(sidelobes, axis=1)
+    sidelobe_level = np.where(np.isfinite(sidelobe_level), sidelobe_level, np.nan)
+
+    # Diretividade 2D: D = 2π / ∫ U(φ) dφ, com U a potência linear normalizada
+    linear = 10.0 ** (right[1] / 10.0)
+    widths = np.diff(np.deg2rad(right[0]), axis=1)
+    integral = np.sum(widths * (linear[:, 1:] + linear[:, :-1]) / 2.0, axis=1)
+    directivity_dB = 10.0 * np.log10(2.0 * np.pi / integral)
+
+    result = PatternMetrics(peak_angle, hpbw, beamwidth_10dB, front_to_back,
+                            null_left, null_right, sidelobe_level, directivity_dB)
+    if single:
+        return PatternMetrics(*(float(v[0]) for v in result))
+    return result
+
+
+def format_metrics(metrics):
+    """Linhas de texto (uma métrica por linha) para o gráfico e as exportações."""
+    def value(number, unit):
+        return "-" if number is None or np.isnan(number) else f"{number:.1f}{unit}"
+
+    return [
+        f"Pico: {value(metrics.peak_angle, '°')}",
+        f"HPBW (-3 dB): {value(metrics.hpbw, '°')}",
+        f"Largura -10 dB: {value(metrics.beamwidth_10dB, '°')}",
+        f"Frente-costas: {value(metrics.front_to_back, ' dB')}",
+        f"Nulos: {value(metrics.null_left, '°')} / {value(metrics.null_right, '°')}",
+        f"Lóbulo secundário: {value(metrics.sidelobe_level, ' dB')}",
+        f"Diretividade 2D: {value(metrics.directivity_dB, ' dBi')}",
+    ]
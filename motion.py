@@ -0,0 +1,122 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                       PLANEJAMENTO DOS MOVIMENTOS DO MOTOR
+# -------------------------------------------------------------------------------------------------------------
+# Converte "ir até o ângulo X" em comandos &R/&L (ou &U/&D) respeitando as restrições da montagem:
+#   - limites do cabo: a posição física de cada eixo (graus contados desde o zero da montagem) tem que
+#     ficar dentro de 'limits'. Com limites mais largos que uma volta (ou limits=None, montagem com anel
+#     coletor), um mesmo ângulo da antena corresponde a várias posições físicas (ângulo + 360k) e o
+#     planejador escolhe a mais rápida de alcançar;
+#   - cada comando leva no máximo MAX_STEP graus: movimentos longos são divididos em pedaços válidos
+#     (nada é cortado em silêncio pelo format_command);
+#   - tempo estimado = graus * MOTOR_TIME_PER_DEGREE + comandos * COMMAND_OVERHEAD (ida e volta e
+#     leitura de potência que a ESP32 faz após cada comando).
+# Os comandos do protocolo já são em graus: passos por grau são tratados pelo firmware.
+import math
+from collections import namedtuple
+
+from bluetooth_io import split_steps
+from protocol import AXIS_AZIMUTH, AXIS_ELEVATION, ELEVATION_LIMITS, MAX_STEP, axis_direction
+
+FULL_TURN = 360
+AZIMUTH_LIMITS = (0, 360) # Montagem atual: o cabo não permite passar de 360° nem voltar antes de 0°
+MOTOR_TIME_PER_DEGREE = 0.02 # Estimativa (s/grau) do tempo do motor
+COMMAND_OVERHEAD = 0.05 # Estimativa (s) do custo fixo de cada comando
+
+Move = namedtuple('Move', ['direction', 'steps'])
+# Comandos a enviar, posição física ao final e tempo estimado (s)
+Plan = namedtuple('Plan', ['moves', 'position', 'duration'])
+
+
+class AxisPlanner:
+    """
+    Planeja os movimentos de um eixo. 'period' é a volta completa do eixo (None para eixos em que
+    ângulos diferentes nunca coincidem, como a elevação) e 'limits' o intervalo permitido para a
+    posição física (None = sem limite).
+    """
+
+    def __init__(self, axis=AXIS_AZIMUTH, limits=AZIMUTH_LIMITS, period=FULL_TURN, max_step=MAX_STEP,
+                 time_per_degree=MOTOR_TIME_PER_DEGREE, command_overhead=COMMAND_OVERHEAD):
+        self.axis = axis
+        self.limits = limits
+        self.period = period
+        self.max_step = max_step
+        self.time_per_degree = time_per_degree
+        self.command_overhead = command_overhead
+
+    def positions(self, angle, current=0):
+        """Posições físicas permitidas que apontam a antena para 'angle' (as mais próximas de 'current', sem limites)."""
+        angle = int(angle)
+        if self.period is None:
+            if self.limits is None or self.limits[0] <= angle <= self.limits[1]:
+                return [angle]
+            return []
+        if self.limits is None:
+            turns = round((current - angle) / self.period)
+            return [angle + self.period * k for k in (turns - 1, turns, turns + 1)]
+        low, high = self.limits
+        first = math.ceil((low - angle) / self.period)
+        last = math.floor((high - angle) / self.period)
+        return [angle + self.period * k for k in range(first, last + 1)]
+
+    def moves(self, delta):
+        """Comandos que deslocam o eixo 'delta' graus, em pedaços de no máximo max_step."""
+        if delta == 0:
+            return []
+        direction = axis_direction(self.axis, delta)
+        return [Move(direction, steps) for steps in split_steps(abs(delta), self.max_step)]
+
+    def duration(self, delta):
+        """Tempo estimado (s) de um deslocamento de 'delta' graus."""
+        if delta == 0:
+            return 0.0
+        commands = -(-abs(delta) // self.max_step)
+        return abs(delta) * self.time_per_degree + commands * self.command_overhead
+
+    def move_to(self, current, angle):
+        """Plano mais rápido da posição física 'current' até o ângulo; ValueError se ele estiver fora dos limites."""
+        candidates = self.positions(angle, int(current))
+        if not candidates:
+            raise ValueError(f"Ângulo {angle}° fora dos limites do eixo ({self.limits[0]}° a {self.limits[1]}°).")
+        return self._fastest(int(current), candidates)
+
+    def home(self, current):
+        """
+        Plano de volta ao zero. Entre as posições equivalentes ao zero, só valem aquelas de onde ainda
+        cabe uma volta inteira no sentido crescente (o registro manual e as varreduras avançam a partir dele).
+        """
+        candidates = self.positions(0, int(current))
+        if self.period is not None and self.limits is not None:
+            candidates = [p for p in candidates if p + self.period <= self.limits[1]] or candidates[:1]
+        if not candidates:
+            raise ValueError("O zero está fora dos limites do eixo.")
+        return self._fastest(int(current), candidates)
+
+    def _fastest(self, current, candidates):
+        # Em empate, a posição mais perto do meio da faixa deixa mais folga no cabo para os próximos movimentos
+        middle = current if self.limits is None else sum(self.limits) / 2
+        target = min(candidates, key=lambda p: (self.duration(p - current), abs(p - middle)))
+        return Plan(self.moves(target - current), target, self.duration(target - current))
+
+
+def elevation_planner(**options):
+    """Planejador do eixo de elevação: sem volta completa, limitado a ELEVATION_LIMITS."""
+    return AxisPlanner(AXIS_ELEVATION, ELEVATION_LIMITS, period=None, **options)
+
+
+def best_route(start, routes, leg):
+    """
+    Escolhe, entre as ordens de visita candidatas, a de menor tempo total de movimento.
+    leg(posição, ponto) devolve o Plan de cada trecho. Devolve (índice da ordem, duração).
+    """
+    best_index, best_time = None, None
+    for index, route in enumerate(routes):
+        position, total = start, 0.0
+        for point in route:
+            plan = leg(position, point)
+            position = plan.position
+            total += plan.duration
+            if best_time is not None and total >= best_time:
+                break
+        else:
+            best_index, best_time = index, total
+    return best_index, best_time
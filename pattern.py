@@ -0,0 +1,140 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                      DIAGRAMA DE RADIAÇÃO (GANHO NORMALIZADO)
+# -------------------------------------------------------------------------------------------------------------
+import numpy as np # type: ignore
+
+from resampling import DENSE_STEP, resample
+from tracing import tracer
+
+RTICK_STEP = 5 # Espaçamento (dB) dos anéis do gráfico polar
+MAX_GAIN = 0 # Limite radial superior: o ganho normalizado nunca passa de 0 dB
+
+
+class RadiationPattern:
+    """
+    Camada de cálculo compartilhada pela pré-visualização e pela exportação do diagrama.
+
+    Guarda, para cada bin do MeasurementStore, o ganho normalizado em relação à potência
+    máxima. Ao registrar um ponto pelo record(), só o ganho daquele bin é recalculado; a
+    renormalização completa fica pendente (e é feita na próxima leitura) apenas quando o pico
+    muda. A curva fechada e os limites radiais ficam em cache até a próxima alteração.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._bin_angles_rad = np.deg2rad(store.bin_angles)
+        self._gains = np.full(store.n_bins, np.nan)
+        self._peak = -np.inf
+        self._normalized_version = -1 # Versão do store já refletida em _gains (o store pode já ter dados)
+        self._curve_version = -1
+        self._curve = None
+        self._limits = None
+        self._dense_key = None
+        self._dense = None
+
+    def record(self, angle, power, accumulate=False):
+        """Registra a medida no store e atualiza o ganho do bin. Retorna True se o bin já existia."""
+        if accumulate:
+            return self._update(angle, lambda: self.store.add_sample(angle, power))
+        return self._update(angle, lambda: self.store.set(angle, power))
+
+    def record_samples(self, angle, samples):
+        """Substitui o bin pelas amostras dadas (média e desvio). Retorna True se o bin já existia."""
+        return self._update(angle, lambda: self.store.set_samples(angle, samples))
+
+    def _update(self, angle, write):
+        store = self.store
+        index = store.bin_index(angle)
+        in_sync = self._normalized_version == store.version
+        previous = store.bin_mean(index)
+
+        existed = write()
+
+        if in_sync:
+            value = store.bin_mean(index)
+            peak_changed = value > self._peak or (previous == self._peak and value < previous)
+            if not peak_changed: # Pico mantido: basta atualizar este bin
+                self._gains[index] = value - self._peak
+                self._normalized_version = store.version
+        return existed
+
+    def _renormalize(self):
+        means = self.store.bin_means()
+        self._peak = np.nanmax(means) if len(self.store) else -np.inf
+        self._gains = means - self._peak
+        self._normalized_version = self.store.version
+
+    def _ensure_curve(self):
+        if self._normalized_version != self.store.version:
+            with tracer.span('padrao.normalizar', pontos=len(self.store)):
+                self._renormalize()
+        if self._curve_version == self.store.version:
+            return
+
+        valid = ~np.isnan(self._gains)
+        angles_rad = self._bin_angles_rad[valid]
+        gains_dB = self._gains[valid]
+        # Fecha o loop no gráfico polar
+        self._curve = (np.append(angles_rad, angles_rad[:1]), np.append(gains_dB, gains_dB[:1]))
+        if len(gains_dB):
+            min_gain = int(np.floor(np.min(gains_dB) / RTICK_STEP) * RTICK_STEP)
+        else:
+            min_gain = -RTICK_STEP
+        self._limits = (min_gain, MAX_GAIN)
+        self._curve_version = self.store.version
+
+    @property
+    def reference_power(self):
+        """Potência de referência (máxima medida, em dBm)."""
+        if self._normalized_version != self.store.version:
+            self._renormalize()
+        return float(self._peak)
+
+    def gain_at(self, angle):
+        """Ganho normalizado (dB) do ângulo, ou NaN se ele ainda não foi medido."""
+        if self._normalized_version != self.store.version:
+            self._renormalize()
+        return float(self._gains[self.store.bin_index(angle)])
+
+    def curve(self):
+        """Ângulos (rad) e ganhos normalizados (dB) ordenados e com o primeiro ponto repetido no fim."""
+        self._ensure_curve()
+        return self._curve
+
+    def gains(self):
+        """Ângulos (graus) e ganhos normalizados (dB) dos pontos medidos, sem fechar o loop."""
+        self._ensure_curve()
+        return self.store.angles(), self._curve[1][:-1]
+
+    def dense_gains(self, method='spline', step=DENSE_STEP):
+        """
+        Ganhos reamostrados (resampling.resample) em uma grade uniforme de 'step' graus: (graus, dB),
+        com NaN nos trechos sem medida, ou None com menos de três ângulos. Fica em cache até a próxima alteração.
+        """
+        key = (self.store.version, method, step)
+        if self._dense_key != key:
+            angles, gains = self.gains()
+            self._dense = resample(angles, gains, step, method)
+            self._dense_key = key
+        return self._dense
+
+    def confidence_band(self):
+        """
+        Ângulos (rad) e limites inferior/superior (dB normalizados) do intervalo de confiança de 95%,
+        fechados como curve(); None se nenhum ângulo tiver mais de uma amostra.
+        """
+        halfwidths = self.store.confidence_halfwidths()
+        if not np.any(np.isfinite(halfwidths)):
+            return None
+        angles_rad, gains_dB = self.curve()
+        halfwidths = np.nan_to_num(np.append(halfwidths, halfwidths[:1]))
+        return angles_rad, gains_dB - halfwidths, gains_dB + halfwidths
+
+    def radial_limits(self):
+        """Limites (mínimo, máximo) do eixo radial, em múltiplos de 5 dB."""
+        self._ensure_curve()
+        return self._limits
+
+    def rticks(self):
+        min_gain, max_gain = self.radial_limits()
+        return np.arange(min_gain, max_gain + 1, RTICK_STEP)
@@ -0,0 +1,130 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                    DIAGRAMA POLAR AO VIVO (INSTRUÇÕES DO CANVAS)
+# -------------------------------------------------------------------------------------------------------------
+import math
+
+from kivy.uix.widget import Widget
+from kivy.graphics import Color, Line, Point, InstructionGroup, PushMatrix, PopMatrix, Translate
+from kivy.metrics import dp
+from kivy.properties import NumericProperty, ObjectProperty
+
+GRID_COLOR = (1, 1, 1, 0.25)
+TRACE_COLOR = (1, 1, 1, 0.95)
+RADIAL_LINES_STEP = 30 # Graus entre as linhas radiais da grade
+RING_STEP = 5 # dB entre os anéis, igual ao pattern.RTICK_STEP (não importado para não carregar o NumPy na abertura)
+
+
+class PolarPatternWidget(Widget):
+    """
+    Diagrama polar desenhado direto no canvas, sem Matplotlib, para acompanhar a medição.
+
+    Usa a mesma convenção dos gráficos exportados: 0° embaixo, ângulos no sentido horário,
+    anéis a cada 5 dB. O desenho usa coordenadas locais (mover o widget só altera o Translate)
+    e a grade só é redesenhada quando o widget muda de tamanho ou a escala muda. Cada ponto
+    novo medido depois do último (caso da varredura) acrescenta apenas um segmento e um
+    marcador; a curva inteira só é refeita quando o pico muda, quando um ponto é remedido ou
+    inserido entre outros, ou quando sai da escala atual.
+    """
+
+    pattern = ObjectProperty(None, allownone=True) # pattern.RadiationPattern
+    min_gain = NumericProperty(-30) # Escala mínima (dB) exibida; aumenta se o diagrama precisar
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._translate = Translate(*self.pos)
+        self._grid = InstructionGroup()
+        self._trace = InstructionGroup()
+        self.canvas.add(PushMatrix())
+        self.canvas.add(self._translate)
+        self.canvas.add(self._grid)
+        self.canvas.add(self._trace)
+        self.canvas.add(PopMatrix())
+        self._floor = self.min_gain
+        self._peak = None
+        self._last_angle = None
+        self._last_xy = None
+        self._markers = None
+        self.bind(pos=self._move, size=self._redraw, pattern=self._redraw, min_gain=self._redraw)
+
+    # --------------------------- Geometria ---------------------------------
+    def _center_radius(self):
+        """Centro (em coordenadas locais) e raio do círculo de 0 dB."""
+        radius = max(0.0, min(self.width, self.height) / 2.0 - dp(4))
+        return self.width / 2.0, self.height / 2.0, radius
+
+    def _to_xy(self, angle_deg, gain_dB):
+        """Converte (ângulo, ganho) para coordenadas da tela: 0° embaixo, sentido horário."""
+        cx, cy, radius = self._center_radius()
+        r = radius * max(0.0, (gain_dB - self._floor) / -self._floor)
+        theta = math.radians(angle_deg)
+        return cx - r * math.sin(theta), cy - r * math.cos(theta)
+
+    # ----------------------------- Desenho ---------------------------------
+    def _move(self, *args):
+        self._translate.xy = self.pos
+
+    def _redraw(self, *args):
+        self._floor = self._required_floor()
+        self._draw_grid()
+        self.refresh()
+
+    def _required_floor(self):
+        """Escala mínima: min_gain, ou o limite do pattern se o diagrama for mais profundo."""
+        if self.pattern is None or not len(self.pattern.store):
+            return self.min_gain
+        return min(self.min_gain, self.pattern.radial_limits()[0])
+
+    def _draw_grid(self):
+        cx, cy, radius = self._center_radius()
+        self._grid.clear()
+        self._grid.add(Color(*GRID_COLOR))
+        rings = int(round(-self._floor / RING_STEP))
+        for ring in range(1, rings + 1):
+            self._grid.add(Line(circle=(cx, cy, radius * ring / rings), width=1))
+        for angle in range(0, 360, RADIAL_LINES_STEP):
+            x, y = self._to_xy(angle, 0)
+            self._grid.add(Line(points=[cx, cy, x, y], width=1))
+
+    def refresh(self):
+        """Redesenha a curva inteira a partir do pattern."""
+        self._trace.clear()
+        self._last_angle = None
+        self._last_xy = None
+        floor = self._required_floor()
+        if floor != self._floor: # Mudou a escala: refaz a grade
+            self._floor = floor
+            self._draw_grid()
+        if self.pattern is None or not len(self.pattern.store):
+            self._peak = None
+            return
+
+        self._peak = self.pattern.reference_power
+        angles, gains = self.pattern.gains()
+
+        points = []
+        for angle, gain in zip(angles.tolist(), gains.tolist()):
+            points.extend(self._to_xy(angle, gain))
+        self._trace.add(Color(*TRACE_COLOR))
+        if len(points) >= 4:
+            self._trace.add(Line(points=points, width=dp(1.2)))
+        self._markers = Point(points=points, pointsize=dp(2))
+        self._trace.add(self._markers)
+        self._last_angle = float(angles[-1])
+        self._last_xy = tuple(points[-2:])
+
+    def add_point(self, angle):
+        """Atualiza o desenho depois que o ângulo foi registrado no pattern."""
+        if self.pattern is None:
+            return
+        gain = self.pattern.gain_at(angle)
+        peak = self.pattern.reference_power
+        if (peak != self._peak or self._last_angle is None
+                or angle <= self._last_angle or gain < self._floor):
+            self.refresh()
+            return
+
+        x, y = self._to_xy(angle, gain)
+        self._trace.add(Line(points=[*self._last_xy, x, y], width=dp(1.2)))
+        self._markers.add_point(x, y)
+        self._last_angle = float(angle)
+        self._last_xy = (x, y)
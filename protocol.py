@@ -0,0 +1,152 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                          PROTOCOLO DE COMUNICAÇÃO COM A ESP32
+# -------------------------------------------------------------------------------------------------------------
+# Comandos enviados pelo app (ASCII, sem terminador):
+#   &R###  -> gira ### graus para a direita (000 a 999)
+#   &L###  -> gira ### graus para a esquerda (000 a 999)
+#   &U###  -> sobe ### graus no eixo de elevação (000 a 999)
+#   &D###  -> desce ### graus no eixo de elevação (000 a 999)
+#   &Q000  -> consulta: a ESP32 responde POS:, EL:, SEQ: e OK, sem mover
+#
+# Números de sequência (connection.ConnectionManager): cada comando pode vir prefixado por '#n',
+# com n crescente (ex.: #42&R010). A ESP32 executa o comando só se n for maior que o último número
+# executado (uma retransmissão de um comando já executado apenas repete a resposta) e confirma com
+# 'OK#n'. Firmware antigo ignora o prefixo (sincroniza no '&') e responde 'OK': o app detecta isso
+# pela falta de SEQ: na consulta e pareia as confirmações por ordem de chegada.
+#
+# Respostas enviadas pela ESP32 (uma por linha, terminadas em '\n'):
+#   OK         -> movimento concluído (OK#n: comando de sequência n concluído)
+#   POS:###    -> posição atual do motor em graus
+#   EL:###     -> posição atual do eixo de elevação em graus (pode ser negativa)
+#   P:-50.5    -> leitura de potência em dBm
+#   SEQ:n      -> último número de sequência executado (resposta à consulta)
+#   ERR:texto  -> erro reportado pelo firmware (ERR#n:texto para o comando de sequência n)
+#
+# Além das linhas, a ESP32 pode enviar quadros com tamanho prefixado, úteis para respostas que
+# possam conter '\n': STX (0x02) + 1 byte com o tamanho N + N bytes com o mesmo texto acima.
+# -------------------------------------------------------------------------------------------------------------
+from collections import namedtuple
+
+MAX_STEP = 999
+FRAME_START = 0x02 # STX: início de quadro com tamanho prefixado
+MAX_LINE_LENGTH = 256 # Linhas maiores que isso sem '\n' são descartadas como lixo
+SEQ_PREFIX = '#' # Prefixo do número de sequência nos comandos e nas confirmações
+QUERY_COMMAND = 'Q'
+
+REPLY_ACK = 'ack'
+REPLY_POSITION = 'position'
+REPLY_ELEVATION = 'elevation'
+REPLY_POWER = 'power'
+REPLY_ERROR = 'error'
+REPLY_SEQUENCE = 'sequence'
+
+# 'seq' só vem preenchido nas confirmações (OK#n/ERR#n) de firmware com números de sequência
+Reply = namedtuple('Reply', ['kind', 'value', 'seq'], defaults=(None,))
+
+AXIS_AZIMUTH = 'az'
+AXIS_ELEVATION = 'el'
+# Letra do comando para cada eixo: (sentido positivo, sentido negativo)
+AXIS_DIRECTIONS = {AXIS_AZIMUTH: ('R', 'L'), AXIS_ELEVATION: ('U', 'D')}
+# Variação (azimute, elevação) por grau de cada comando
+MOVE_DELTAS = {'R': (1, 0), 'L': (-1, 0), 'U': (0, 1), 'D': (0, -1), QUERY_COMMAND: (0, 0)}
+ELEVATION_LIMITS = (-90, 90) # Faixa (graus) do eixo de elevação
+
+
+def format_command(direction, step_value, seq=None):
+    """Formata o comando conforme padrão programado na ESP (com o prefixo #seq, se dado)"""
+    step_value = max(0, min(MAX_STEP, int(step_value))) # Limita o passo entre 0 e 999
+    prefix = f"{SEQ_PREFIX}{seq}" if seq is not None else ""
+    return f"{prefix}&{direction}{step_value:03d}"
+
+
+def move_delta(direction, steps):
+    """(Δazimute, Δelevação) em graus produzido pelo comando."""
+    d_az, d_el = MOVE_DELTAS.get(direction, (0, 0))
+    return d_az * steps, d_el * steps
+
+
+def _split_seq(text):
+    """'OK#12' -> ('OK', 12); sem prefixo (ou número inválido) -> (text, None)."""
+    head, sep, seq = text.partition(SEQ_PREFIX)
+    if sep and seq.isdigit():
+        return head, int(seq)
+    return text, None
+
+
+def axis_direction(axis, delta):
+    """Letra do comando que move o eixo no sentido de 'delta' (delta 0 usa o sentido positivo)."""
+    forward, backward = AXIS_DIRECTIONS[axis]
+    return forward if delta >= 0 else backward
+
+
+def parse_reply(line):
+    """Converte uma linha recebida da ESP32 em um Reply (ou None se a linha for desconhecida)."""
+    line = line.strip()
+    if not line:
+        return None
+    ack, seq = _split_seq(line)
+    if ack == 'OK':
+        return Reply(REPLY_ACK, None, seq)
+
+    prefix, sep, payload = line.partition(':')
+    if not sep:
+        return None
+    try:
+        if prefix == 'P':
+            return Reply(REPLY_POWER, float(payload))
+        if prefix == 'POS':
+            return Reply(REPLY_POSITION, int(float(payload)))
+        if prefix == 'EL':
+            return Reply(REPLY_ELEVATION, int(float(payload)))
+        if prefix == 'SEQ':
+            return Reply(REPLY_SEQUENCE, int(payload))
+    except ValueError:
+        return None
+    prefix, seq = _split_seq(prefix)
+    if prefix == 'ERR':
+        return Reply(REPLY_ERROR, payload.strip(), seq)
+    return None
+
+
+class FrameParser:
+    """
+    Parser incremental das respostas da ESP32. Recebe pedaços arbitrários de bytes
+    (quadros podem chegar partidos entre leituras) e devolve os Reply completos.
+    """
+
+    def __init__(self, max_line_length=MAX_LINE_LENGTH):
+        self.max_line_length = max_line_length
+        self._pending = bytearray() # Bytes de um quadro ainda incompleto
+
+    def feed(self, data):
+        """Acrescenta os bytes recebidos e devolve a lista de respostas completas."""
+        buf = self._pending
+        buf += data
+        replies = []
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            if buf[pos] == FRAME_START:
+                if end - pos < 2:
+                    break
+                frame_end = pos + 2 + buf[pos + 1]
+                if frame_end > end:
+                    break
+                payload = buf[pos + 2:frame_end]
+                pos = frame_end
+            else:
+                newline = buf.find(b'\n', pos)
+                if newline < 0:
+                    if end - pos > self.max_line_length:
+                        pos = end # Sem terminador: descarta o lixo acumulado
+                    break
+                payload = buf[pos:newline]
+                pos = newline + 1
+            reply = parse_reply(payload.decode('ascii', 'replace'))
+            if reply is not None:
+                replies.append(reply)
+        del buf[:pos]
+        return replies
+
+    def reset(self):
+        self._pending.clear()
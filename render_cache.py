@@ -0,0 +1,195 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                   CACHE DAS RENDERIZAÇÕES (PRÉVIA E EXPORTAÇÃO)
+# -------------------------------------------------------------------------------------------------------------
+# A chave é o hash do conteúdo do gráfico (PlotSpec/GridSpec: ângulos, ganhos, título, legenda,
+# métricas...) mais o tipo de saída, o dpi e a versão do estilo (rendering.RENDER_STYLE_VERSION): os
+# mesmos dados sempre dão a mesma chave, e qualquer medida nova ou mudança no desenho dá outra.
+# Duas camadas:
+#   - memória: LRU limitado em bytes (RENDER_CACHE_BYTES) com as imagens RGBA e os bytes de png/pdf;
+#   - disco (opcional, em user_data_dir): só os png/pdf das exportações, um arquivo por chave, também
+#     LRU (pela data de acesso), limitado a DISK_CACHE_BYTES. Sobrevive ao fechamento do app. As
+#     prévias RGBA (~6 MB cada, sem compressão) ficam só na memória, para não gravar na flash a cada
+#     prévia. O tamanho ocupado no disco é somado a cada gravação; o diretório só é percorrido na
+#     primeira gravação e quando é preciso apagar os arquivos mais antigos.
+# Usado só nas threads de renderização; as operações são protegidas por um lock.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from rendering import RENDER_STYLE_VERSION
+
+RENDER_CACHE_BYTES = 64 * 1024 * 1024
+DISK_CACHE_BYTES = 256 * 1024 * 1024
+KIND_RGBA = 'rgba'
+
+
+def _feed(digest, value):
+    """Acrescenta ao hash uma representação canônica do valor (arrays pelo conteúdo binário)."""
+    if hasattr(value, 'tobytes') and hasattr(value, 'dtype'):
+        digest.update(f"array{value.dtype.str}{value.shape}".encode())
+        digest.update(value.tobytes())
+    elif isinstance(value, (tuple, list)):
+        digest.update(f"seq{len(value)}(".encode())
+        for item in value:
+            _feed(digest, item)
+        digest.update(b")")
+    else:
+        digest.update(f"{type(value).__name__}:{value!r};".encode())
+
+
+def render_key(spec, kind, dpi=None):
+    """Chave (hex) da renderização de 'spec' no formato 'kind' ('rgba', 'png', 'pdf') com o dpi dado."""
+    digest = hashlib.blake2b(digest_size=20)
+    _feed(digest, (type(spec).__name__, kind, dpi, RENDER_STYLE_VERSION))
+    _feed(digest, tuple(spec))
+    return digest.hexdigest()
+
+
+def _size(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return len(value.pixels) # rendering.RgbaImage
+
+
+class RenderCache:
+    """LRU de renderizações em memória, com uma camada opcional em disco ('directory')."""
+
+    def __init__(self, max_bytes=RENDER_CACHE_BYTES, directory=None, disk_max_bytes=DISK_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # chave -> (tipo, valor)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_usage = None # (diretório, bytes ocupados), calculado na primeira gravação
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """Bytes ocupados na memória."""
+        return self._bytes
+
+    def get(self, key, kind):
+        """Valor guardado (RgbaImage para 'rgba', bytes para os outros) ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        value = self._read_disk(key, kind)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._remember(key, kind, value)
+        return value
+
+    def put(self, key, kind, value):
+        self._remember(key, kind, value)
+        self._write_disk(key, kind, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remember(self, key, kind, value):
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= _size(old[1])
+            self._entries[key] = (kind, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= _size(evicted)
+
+    # ----------------------------------------------- Disco ---------------------------------------------------
+    def _on_disk(self, kind):
+        return bool(self.directory) and kind != KIND_RGBA
+
+    def _path(self, key, kind):
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def _read_disk(self, key, kind):
+        if not self._on_disk(kind):
+            return None
+        path = self._path(key, kind)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path) # Marca o acesso para a ordem LRU do disco
+        except OSError:
+            return None
+        return data
+
+    def _write_disk(self, key, kind, value):
+        if not self._on_disk(kind):
+            return
+        with self._disk_lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                used = self._disk_used()
+                path = self._path(key, kind)
+                try:
+                    used -= os.path.getsize(path) # Substituído pelo novo
+                except OSError:
+                    pass
+                partial = f"{path}.{threading.get_ident()}.tmp"
+                with open(partial, 'wb') as f:
+                    f.write(value)
+                os.replace(partial, path) # Um arquivo incompleto nunca aparece com o nome final
+                used += len(value)
+                if used > self.disk_max_bytes:
+                    used = self._trim_disk()
+                self._disk_usage = (self.directory, used)
+            except OSError:
+                self._disk_usage = None # Recalculado na próxima gravação
+                # O disco é só uma otimização: sem espaço ou sem permissão, segue apenas com a memória
+
+    def _scan_disk(self):
+        """(data de acesso, tamanho, caminho) dos arquivos do cache; apaga as prévias .rgba de versões antigas."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.endswith('.tmp'):
+                continue
+            if entry.name.endswith('.' + KIND_RGBA):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _disk_used(self):
+        if self._disk_usage is None or self._disk_usage[0] != self.directory:
+            self._disk_usage = (self.directory, sum(size for _, size, _ in self._scan_disk()))
+        return self._disk_usage[1]
+
+    def _trim_disk(self):
+        """Apaga os arquivos menos usados até caber no limite; devolve os bytes que restaram."""
+        entries = self._scan_disk()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        return total
@@ -0,0 +1,317 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                     RENDERIZAÇÃO DOS GRÁFICOS (FORA DA INTERFACE)
+# -------------------------------------------------------------------------------------------------------------
+# Usa somente a API orientada a objetos do Matplotlib (Figure + FigureCanvasAgg): nada de
+# pyplot, cujo estado global não pode ser usado com segurança fora da thread principal.
+# O Matplotlib só é importado na primeira renderização (já na thread de trabalho), para não
+# atrasar a abertura do app.
+# Com um render_cache.RenderCache, dados iguais não são desenhados de novo (ver render_cache.py).
+import io
+import itertools
+import threading
+from collections import OrderedDict, namedtuple
+
+from tracing import tracer
+
+PATTERN_COLOR = '#087e9e'
+BAND_COLOR = '#e07b00'
+FIGURE_SIZE = (8, 8)
+GRID_FIGURE_SIZE = (8, 10)
+PREVIEW_DPI = 150
+EXPORT_DPI = 300
+# Entra na chave do render_cache: incrementar a cada mudança no desenho (draw_pattern, grid_figure, cores,
+# tamanhos), para que as imagens guardadas em disco por versões anteriores do app não sejam reaproveitadas
+RENDER_STYLE_VERSION = 1
+
+# Tudo o que é preciso para desenhar um diagrama, copiado na thread da interface antes de renderizar.
+# Com calibração, os ganhos já estão em dBi e 'peak_gain' é o ganho absoluto do pico (senão None)
+PlotSpec = namedtuple('PlotSpec', ['angles_rad', 'gains_dB', 'limits', 'rticks', 'title', 'legend', 'metrics', 'band', 'dense',
+                                   'peak_gain'], defaults=(None,))
+# Medidas em grade (azimute x elevação): mapa de ganhos e os dois cortes nos planos principais (PlotSpec)
+GridSpec = namedtuple('GridSpec', ['azimuths', 'elevations', 'gains', 'peak', 'az_cut', 'el_cut', 'title'])
+# Imagem renderizada em memória: 'pixels' é o buffer RGBA do Agg (linha 0 no topo) e 'size' é (largura, altura)
+RgbaImage = namedtuple('RgbaImage', ['pixels', 'size'])
+
+
+def plot_spec(pattern, title, legend=None, interpolation='spline', gain_offset=None):
+    """
+    Monta o PlotSpec (com as métricas do diagrama) a partir de um pattern.RadiationPattern. Com
+    'interpolation' ('spline', 'fft' ou 'auto'; None desliga) a curva e as métricas usam a grade densa
+    reamostrada, e os pontos medidos aparecem como marcadores. Com 'gain_offset' (dB, de
+    calibration.CalibrationProfile.offset) o diagrama é desenhado em ganho absoluto (dBi).
+    """
+    import numpy as np # type: ignore
+    from metrics import pattern_metrics
+
+    with tracer.span('padrao.plot_spec', pontos=len(pattern.store)):
+        angles_rad, gains_dB = pattern.curve()
+        dense = pattern.dense_gains(interpolation) if interpolation else None
+        if dense is not None:
+            dense_angles, dense_gains = dense
+            if np.all(np.isfinite(dense_gains)): # Métricas na grade densa só se ela cobre a volta inteira
+                metrics = pattern_metrics(dense_angles, dense_gains)
+            else:
+                metrics = pattern_metrics(*pattern.gains())
+            angles = np.deg2rad(dense_angles)
+            dense = (np.append(angles, angles[:1]), np.append(dense_gains, dense_gains[:1]))
+        else:
+            metrics = pattern_metrics(*pattern.gains())
+        spec = PlotSpec(angles_rad, gains_dB, pattern.radial_limits(), pattern.rticks(), title, legend, metrics,
+                        pattern.confidence_band(), dense)
+        if gain_offset is not None:
+            spec = _absolute_spec(spec, pattern.reference_power + gain_offset)
+    return spec
+
+
+def _absolute_spec(spec, peak_gain):
+    """Desloca as curvas normalizadas (pico em 0 dB) para o pico em 'peak_gain' dBi."""
+    import numpy as np # type: ignore
+    from pattern import RTICK_STEP
+
+    band = spec.band
+    if band is not None:
+        band = (band[0], band[1] + peak_gain, band[2] + peak_gain)
+    dense = spec.dense
+    if dense is not None:
+        dense = (dense[0], dense[1] + peak_gain)
+    max_gain = int(np.ceil(peak_gain / RTICK_STEP) * RTICK_STEP)
+    min_gain = int(np.floor((spec.limits[0] + peak_gain) / RTICK_STEP) * RTICK_STEP)
+    min_gain = min(min_gain, max_gain - RTICK_STEP)
+    return spec._replace(gains_dB=spec.gains_dB + peak_gain, limits=(min_gain, max_gain), band=band, dense=dense,
+                         rticks=np.arange(min_gain, max_gain + 1, RTICK_STEP), peak_gain=float(peak_gain))
+
+
+def draw_pattern(ax, spec):
+    """Desenha o diagrama polar no eixo, com o estilo padrão do app (0° embaixo, sentido horário)."""
+    import numpy as np # type: ignore
+
+    if spec.dense is not None: # Curva interpolada, com os pontos medidos como marcadores
+        ax.plot(*spec.dense, linestyle='-', color=PATTERN_COLOR, label=spec.legend)
+        ax.plot(spec.angles_rad, spec.gains_dB, marker='o', linestyle='none', color=PATTERN_COLOR)
+        outline = spec.dense if np.all(np.isfinite(spec.dense[1])) else (spec.angles_rad, spec.gains_dB)
+    else:
+        ax.plot(spec.angles_rad, spec.gains_dB, marker='o', linestyle='-', color=PATTERN_COLOR, label=spec.legend)
+        outline = (spec.angles_rad, spec.gains_dB)
+    ax.fill(*outline, alpha=0.2, color=PATTERN_COLOR)
+
+    # Faixa do intervalo de confiança de 95% (ângulos com mais de uma amostra)
+    if spec.band is not None:
+        band_angles, lower, upper = spec.band
+        ax.fill_between(band_angles, lower, upper, color=BAND_COLOR, alpha=0.35, linewidth=0)
+    ax.set_title(spec.title, va='bottom', fontsize=16, y=1.08)
+
+    # Adiciona a Legenda (para o label definido no ax.plot)
+    if spec.legend is not None:
+        ax.legend(loc='lower left', bbox_to_anchor=(0.95, 0.95), fontsize=14, borderaxespad=0.)
+
+    ax.set_theta_zero_location('S')
+    ax.set_theta_direction(-1)
+    ax.set_rlabel_position(135)
+    ax.set_rlim(*spec.limits)
+    ax.set_rticks(spec.rticks)
+    ax.grid(True)
+
+    # Métricas no canto inferior esquerdo da figura
+    if spec.metrics is not None:
+        from metrics import format_metrics
+        lines = format_metrics(spec.metrics)
+        if spec.peak_gain is not None:
+            lines.insert(0, f"Ganho: {spec.peak_gain:.1f} dBi")
+        ax.figure.text(0.02, 0.02, "\n".join(lines), fontsize=10, va='bottom',
+                       family='monospace', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+
+
+def _cut_spec(angles_deg, gains_dB, title, closed=True):
+    """PlotSpec de um corte da grade, no mesmo estilo polar do diagrama (sem métricas nem faixa)."""
+    import numpy as np # type: ignore
+    from pattern import RTICK_STEP, MAX_GAIN
+
+    angles_rad = np.deg2rad(angles_deg)
+    if closed: # O corte de azimute dá a volta inteira; o de elevação não
+        angles_rad = np.append(angles_rad, angles_rad[:1])
+        gains_dB = np.append(gains_dB, gains_dB[:1])
+    min_gain = int(np.floor(np.min(gains_dB) / RTICK_STEP) * RTICK_STEP) if len(angles_deg) else -RTICK_STEP
+    min_gain = min(min_gain, MAX_GAIN - RTICK_STEP)
+    rticks = np.arange(min_gain, MAX_GAIN + 1, RTICK_STEP)
+    return PlotSpec(angles_rad, gains_dB, (min_gain, MAX_GAIN), rticks, title, None, None, None, None)
+
+
+def grid_spec(grid, title):
+    """Monta o GridSpec a partir de um grid_store.GridStore: cortes passando pela célula de maior potência."""
+    peak = grid.peak()
+    if peak is None:
+        raise ValueError("A grade não tem medidas.")
+    azimuth, elevation, _ = peak
+    az_cut = _cut_spec(*grid.azimuth_cut(elevation), f"Azimute (elevação {elevation:g}°)")
+    el_cut = _cut_spec(*grid.elevation_cut(azimuth), f"Elevação (azimute {azimuth:g}°)", closed=False)
+    return GridSpec(grid.azimuths.copy(), grid.elevations.copy(), grid.gains(), peak, az_cut, el_cut, title)
+
+
+def grid_figure(spec):
+    """Figure com o mapa de calor (azimute x elevação) em cima e os cortes polares embaixo."""
+    import numpy as np # type: ignore
+    from matplotlib.figure import Figure # type: ignore
+    from matplotlib.backends.backend_agg import FigureCanvasAgg # type: ignore
+
+    fig = Figure(figsize=GRID_FIGURE_SIZE)
+    FigureCanvasAgg(fig)
+    layout = fig.add_gridspec(2, 2, height_ratios=(1, 1.1), hspace=0.45)
+    ax_map = fig.add_subplot(layout[0, :])
+    mesh = ax_map.pcolormesh(spec.azimuths, spec.elevations, np.ma.masked_invalid(spec.gains),
+                             shading='nearest', cmap='viridis')
+    fig.colorbar(mesh, ax=ax_map, label='Ganho (dB)')
+    ax_map.plot(spec.peak[0], spec.peak[1], marker='+', color='white', markersize=12)
+    ax_map.set_xlabel('Azimute (°)')
+    ax_map.set_ylabel('Elevação (°)')
+    ax_map.set_title(spec.title, fontsize=16)
+
+    for column, cut in enumerate((spec.az_cut, spec.el_cut)):
+        ax = fig.add_subplot(layout[1, column], polar=True)
+        draw_pattern(ax, cut)
+        ax.title.set_fontsize(11)
+    return fig
+
+
+def figure_for(spec):
+    """Figure adequada ao tipo de spec (diagrama polar ou grade)."""
+    return grid_figure(spec) if isinstance(spec, GridSpec) else pattern_figure(spec)
+
+
+def pattern_figure(spec):
+    """Cria uma Figure independente (com canvas Agg próprio) contendo o diagrama."""
+    from matplotlib.figure import Figure # type: ignore
+    from matplotlib.backends.backend_agg import FigureCanvasAgg # type: ignore
+
+    fig = Figure(figsize=FIGURE_SIZE)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, polar=True)
+    draw_pattern(ax, spec)
+    return fig
+
+
+def render_to_file(spec, filepath, file_format, dpi=None):
+    """Renderiza o diagrama e grava em arquivo (png ou pdf)."""
+    fig = figure_for(spec)
+    with tracer.span('render.savefig', formato=file_format, dpi=dpi):
+        fig.savefig(filepath, format=file_format, dpi=dpi)
+    return filepath
+
+
+def render_to_files(spec, outputs, cache=None):
+    """
+    Desenha a figura uma vez e grava cada (caminho, formato, dpi) de 'outputs'. Com 'cache', os
+    arquivos já renderizados com os mesmos dados são copiados dele, e a figura só é criada se faltar algum.
+    """
+    fig = None
+    for filepath, file_format, dpi in outputs:
+        data = None
+        if cache is not None:
+            from render_cache import render_key
+            key = render_key(spec, file_format, dpi)
+            data = cache.get(key, file_format)
+        if data is None:
+            if fig is None:
+                fig = figure_for(spec)
+            if cache is None:
+                with tracer.span('render.savefig', formato=file_format, dpi=dpi):
+                    fig.savefig(filepath, format=file_format, dpi=dpi)
+                continue
+            buffer = io.BytesIO()
+            with tracer.span('render.savefig', formato=file_format, dpi=dpi):
+                fig.savefig(buffer, format=file_format, dpi=dpi)
+            data = cache.put(key, file_format, buffer.getvalue())
+        with open(filepath, 'wb') as f:
+            f.write(data)
+    return [filepath for filepath, file_format, dpi in outputs]
+
+
+def render_to_rgba(spec, dpi=PREVIEW_DPI, cache=None):
+    """
+    Rasteriza o diagrama direto para um buffer RGBA em memória (sem arquivo e sem codificar PNG).
+    Com 'cache', uma prévia dos mesmos dados no mesmo dpi volta pronta.
+    """
+    if cache is not None:
+        from render_cache import render_key, KIND_RGBA
+        key = render_key(spec, KIND_RGBA, dpi)
+        image = cache.get(key, KIND_RGBA)
+        if image is not None:
+            return image
+    fig = figure_for(spec)
+    fig.set_dpi(dpi)
+    canvas = fig.canvas
+    with tracer.span('render.rgba', dpi=dpi):
+        canvas.draw()
+    if cache is not None: # No cache fica uma cópia dos pixels, sem prender a figura inteira na memória
+        return cache.put(key, KIND_RGBA, RgbaImage(bytes(canvas.buffer_rgba()), canvas.get_width_height()))
+    # O memoryview (achatado para 1D) mantém vivo o renderer de onde vêm os pixels, sem copiá-los
+    return RgbaImage(canvas.buffer_rgba().cast('B'), canvas.get_width_height())
+
+
+class RenderService:
+    """
+    Executa renderizações em uma thread de trabalho e entrega o resultado por 'dispatch'
+    (no app: Clock.schedule_once, para que on_done rode na thread da interface).
+
+    Cada pedido tem uma chave ('preview', 'export:1', ...). Um novo pedido com a mesma chave
+    substitui o anterior: se o anterior ainda não começou, é descartado; se já está sendo
+    renderizado, o resultado dele é ignorado quando ficar pronto. As gerações são únicas entre
+    todas as chaves, então a chave sai de _generation assim que o último pedido é entregue ou
+    cancelado (cada exportação tem chave própria e a tabela não cresce ao longo da sessão).
+    """
+
+    def __init__(self, dispatch=None):
+        self.dispatch = dispatch or (lambda callback: callback())
+        self._cond = threading.Condition()
+        self._pending = OrderedDict() # chave -> (geração, job, on_done, on_error)
+        self._generation = {} # chave -> geração do último pedido ainda não entregue
+        self._counter = itertools.count(1)
+        self._thread = None
+
+    def submit(self, key, job, on_done, on_error=None):
+        """Agenda job() na thread de trabalho; on_done(resultado) ou on_error(exceção) ao terminar."""
+        with self._cond:
+            generation = next(self._counter)
+            self._generation[key] = generation
+            self._pending.pop(key, None)
+            self._pending[key] = (generation, job, on_done, on_error)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return generation
+
+    def cancel(self, key):
+        """Descarta o pedido pendente e ignora o resultado do que estiver em andamento."""
+        with self._cond:
+            self._generation.pop(key, None)
+            self._pending.pop(key, None)
+
+    def is_current(self, key, generation):
+        """True enquanto o pedido não foi substituído, cancelado nem entregue."""
+        with self._cond:
+            return self._generation.get(key) == generation
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key, (generation, job, on_done, on_error) = self._pending.popitem(last=False)
+
+            try:
+                result = job()
+            except Exception as e:
+                if on_error:
+                    self._dispatch(key, generation, on_error, e)
+                continue
+            self._dispatch(key, generation, on_done, result)
+
+    def _dispatch(self, key, generation, callback, value):
+        self.dispatch(lambda: self._deliver(key, generation, lambda: callback(value)))
+
+    def _deliver(self, key, generation, callback):
+        with self._cond:
+            if self._generation.get(key) != generation: # Pedido substituído enquanto renderizava: descarta
+                return
+            del self._generation[key] # Último pedido da chave: nada mais a comparar
+        callback()
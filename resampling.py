@@ -0,0 +1,142 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                REAMOSTRAGEM PERIÓDICA DO DIAGRAMA (0° = 360°)
+# -------------------------------------------------------------------------------------------------------------
+# Interpola os pontos medidos (em dB) em uma grade densa e uniforme, tratando 0° e 360° como o
+# mesmo ponto. O padrão é a spline cúbica periódica, que aceita passo irregular e não oscila
+# perto dos nulos; a interpolação por FFT (limitada em banda) exige passo uniforme cobrindo a volta
+# inteira. As duas aceitam vários diagramas de uma vez (forma (M, N)) desde que medidos nos mesmos ângulos.
+import numpy as np # type: ignore
+
+DENSE_STEP = 0.5 # Passo (graus) da grade densa
+MAX_GAP = 30.0 # Intervalos sem medida maiores que isto não são interpolados (ficam NaN)
+MIN_POINTS = 3
+METHODS = ('spline', 'fft', 'auto')
+
+
+def _knots(angles, values):
+    """Ângulos em [0, 360) ordenados e sem repetição (0° e 360° viram um só), com os valores correspondentes."""
+    knots, first = np.unique(np.mod(np.asarray(angles, dtype=float), 360.0), return_index=True)
+    return knots, np.asarray(values, dtype=float)[..., first]
+
+
+def _gaps(knots):
+    """Largura de cada intervalo entre pontos vizinhos, incluindo o que passa por 360°."""
+    return np.diff(np.append(knots, knots[0] + 360.0))
+
+
+def is_uniform(angles, tolerance=1e-6):
+    """True se os ângulos têm passo constante e cobrem a volta inteira (condição da FFT)."""
+    knots = np.unique(np.mod(np.asarray(angles, dtype=float), 360.0))
+    if len(knots) < MIN_POINTS:
+        return False
+    gaps = _gaps(knots)
+    return bool(np.all(np.abs(gaps - gaps[0]) < tolerance))
+
+
+def _solve_cyclic(sub, diag, sup, rhs):
+    """
+    Resolve o sistema tridiagonal cíclico (sub[i]*x[i-1] + diag[i]*x[i] + sup[i]*x[i+1] = rhs[i],
+    índices módulo n) para todas as colunas de rhs (n, M) em O(n): algoritmo de Thomas sobre a parte
+    tridiagonal e correção de Sherman-Morrison para os dois cantos. Uma matriz densa n x n não cabe
+    na memória com dezenas de milhares de pontos.
+    """
+    n = len(diag)
+    gamma = -diag[0]
+    diag = diag.astype(float)
+    diag[0] -= gamma
+    diag[-1] -= sub[0] * sup[-1] / gamma
+    # A segunda incógnita (coluna extra) é a do vetor u = (gamma, 0, ..., sup[-1]) de Sherman-Morrison
+    u = np.zeros((n, 1))
+    u[0, 0] = gamma
+    u[-1, 0] = sup[-1]
+    b = np.hstack((rhs, u))
+
+    c_prime = np.empty(n)
+    d_prime = np.empty_like(b)
+    c_prime[0] = sup[0] / diag[0]
+    d_prime[0] = b[0] / diag[0]
+    for i in range(1, n):
+        denominator = diag[i] - sub[i] * c_prime[i - 1]
+        c_prime[i] = sup[i] / denominator
+        d_prime[i] = (b[i] - sub[i] * d_prime[i - 1]) / denominator
+    x = np.empty_like(b)
+    x[-1] = d_prime[-1]
+    for i in range(n - 2, -1, -1):
+        x[i] = d_prime[i] - c_prime[i] * x[i + 1]
+
+    y, z = x[:, :-1], x[:, -1:]
+    factor = (y[0] + sub[0] * y[-1] / gamma) / (1.0 + z[0] + sub[0] * z[-1] / gamma)
+    return y - z * factor
+
+
+def periodic_spline(angles, values, grid):
+    """
+    Spline cúbica periódica (segunda derivada contínua também em 360°) avaliada nos ângulos 'grid'.
+    Os momentos são obtidos de um único sistema tridiagonal cíclico com uma coluna por diagrama.
+    """
+    knots, values = _knots(angles, values)
+    single = values.ndim == 1
+    y = np.atleast_2d(values).T # (N, M)
+    n = len(knots)
+    h = _gaps(knots)
+    h_prev = np.roll(h, 1)
+
+    slope = (np.roll(y, -1, axis=0) - y) / h[:, None]
+    moments = _solve_cyclic(h_prev, 2.0 * (h_prev + h), h, 6.0 * (slope - np.roll(slope, 1, axis=0)))
+
+    # Intervalo de cada ponto da grade (o último intervalo vai de knots[-1] até knots[0] + 360)
+    t = np.mod(np.asarray(grid, dtype=float), 360.0)
+    t = np.where(t < knots[0], t + 360.0, t)
+    i = np.clip(np.searchsorted(knots, t, side='right') - 1, 0, n - 1)
+    j = (i + 1) % n
+    hi = h[i][:, None]
+    a = (knots[i] + h[i] - t)[:, None] # Distância até o fim do intervalo
+    b = (t - knots[i])[:, None]        # Distância desde o início
+    dense = (moments[i] * a ** 3 + moments[j] * b ** 3) / (6.0 * hi) \
+        + (y[i] - moments[i] * hi ** 2 / 6.0) * a / hi \
+        + (y[j] - moments[j] * hi ** 2 / 6.0) * b / hi
+    dense = dense.T
+    return dense[0] if single else dense
+
+
+def fft_resample(values, n_out, offset=0.0):
+    """
+    Interpolação limitada em banda de N amostras uniformes em uma volta (a primeira em 'offset' graus)
+    para n_out amostras uniformes começando em 0°.
+    """
+    values = np.asarray(values, dtype=float)
+    n = values.shape[-1]
+    spectrum = np.fft.rfft(values, axis=-1)
+    if n % 2 == 0: # A componente de Nyquist é dividida entre as frequências +N/2 e -N/2
+        spectrum[..., -1] *= 0.5
+    harmonics = np.arange(spectrum.shape[-1])
+    spectrum = spectrum * np.exp(-1j * harmonics * np.deg2rad(offset)) # Desloca a origem para 0°
+    return np.fft.irfft(spectrum, n_out, axis=-1) * (n_out / n)
+
+
+def resample(angles, values, step=DENSE_STEP, method='spline'):
+    """
+    Reamostra o diagrama na grade 0, step, ..., 360 - step. Devolve (grade, valores) ou None se houver
+    menos de MIN_POINTS ângulos. Pontos da grade dentro de intervalos sem medida maiores que MAX_GAP
+    ficam NaN. method: 'spline', 'fft' ou 'auto' (FFT se uniforme, senão spline).
+    """
+    knots, knot_values = _knots(angles, values)
+    if len(knots) < MIN_POINTS:
+        return None
+    n_out = int(round(360.0 / step))
+    grid = np.arange(n_out) * (360.0 / n_out)
+
+    uniform = is_uniform(knots)
+    if method == 'fft' and not uniform:
+        raise ValueError("A interpolação por FFT exige ângulos uniformes cobrindo 360°.")
+    if method == 'fft' or (method == 'auto' and uniform):
+        dense = fft_resample(knot_values, n_out, offset=knots[0])
+    else:
+        dense = periodic_spline(knots, knot_values, grid)
+
+    gaps = _gaps(knots)
+    if np.any(gaps > MAX_GAP):
+        t = np.where(grid < knots[0], grid + 360.0, grid)
+        interval = np.clip(np.searchsorted(knots, t, side='right') - 1, 0, len(knots) - 1)
+        dense = np.where(gaps[interval] > MAX_GAP, np.nan, dense)
+    return grid, dense
@@ -0,0 +1,52 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                  ESTATÍSTICA DAS AMOSTRAS DE POTÊNCIA
+# -------------------------------------------------------------------------------------------------------------
+# Sem NumPy: usado pela varredura (sweep.py), que é carregada na abertura do app.
+import math
+import statistics
+
+CONFIDENCE = 0.95
+MAD_THRESHOLD = 3.5 # Escore z modificado acima do qual a amostra é descartada (Iglewicz e Hoaglin)
+MAD_SCALE = 0.6745  # Converte o MAD em estimativa do desvio padrão para dados normais
+
+# Valores críticos t de Student (bilateral, 95%) para 1 a 30 graus de liberdade
+T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+Z_95 = 1.960 # Acima de 30 graus de liberdade
+
+
+def t_critical(count):
+    """Valor crítico para o intervalo de confiança de 95% da média de 'count' amostras."""
+    df = int(count) - 1
+    if df < 1:
+        return math.inf
+    return T_95[df - 1] if df <= len(T_95) else Z_95
+
+
+def confidence_halfwidth(std, count):
+    """Meia largura (mesma unidade das amostras) do intervalo de confiança de 95% da média."""
+    if count < 2:
+        return math.inf
+    return t_critical(count) * std / math.sqrt(count)
+
+
+def mean_std(samples):
+    """Média e desvio padrão amostral (0 para uma única amostra)."""
+    mean = statistics.fmean(samples)
+    std = statistics.stdev(samples, mean) if len(samples) > 1 else 0.0
+    return mean, std
+
+
+def reject_outliers(samples, threshold=MAD_THRESHOLD):
+    """
+    Descarta as amostras cujo escore z modificado (pela mediana e pelo MAD) passa de 'threshold'.
+    Com menos de 3 amostras, ou MAD nulo (maioria das leituras idênticas), nada é descartado.
+    """
+    if len(samples) < 3:
+        return list(samples)
+    median = statistics.median(samples)
+    mad = statistics.median(abs(x - median) for x in samples)
+    if mad == 0:
+        return list(samples)
+    return [x for x in samples if MAD_SCALE * abs(x - median) / mad <= threshold]
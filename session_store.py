@@ -0,0 +1,210 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                        BANCO DE VARREDURAS SALVAS
+# -------------------------------------------------------------------------------------------------------------
+# Metadados (título, frequência, data) ficam em um SQLite; os dados de cada varredura ficam em
+# um .npy próprio, aberto com mmap_mode para que listar e reabrir não carregue tudo na memória.
+# As varreduras 2D (azimute x elevação) ficam em uma tabela à parte, com os passos da grade e um
+# .npy com uma linha por célula medida.
+import os
+import re
+import sqlite3
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy as np # type: ignore
+
+DB_NAME = 'sweeps.db'
+ARRAYS_DIR = 'arrays'
+
+# Uma linha por ângulo medido (std é NaN onde há uma só leitura; arquivos antigos não têm esse campo)
+SWEEP_DTYPE = np.dtype([('angle', 'f8'), ('power', 'f8'), ('count', 'i4'), ('std', 'f8')])
+
+# Uma linha por célula medida da grade 2D
+GRID_DTYPE = np.dtype([('azimuth', 'f8'), ('elevation', 'f8'), ('power', 'f8'), ('count', 'i4'), ('std', 'f8')])
+
+SweepRecord = namedtuple('SweepRecord', ['id', 'title', 'frequency', 'frequency_hz', 'created_at', 'n_points'])
+GridRecord = namedtuple('GridRecord', ['id', 'title', 'frequency', 'frequency_hz', 'created_at', 'n_points',
+                                       'az_step', 'el_step'])
+
+_FREQUENCY_UNITS = {'': 1.0, 'hz': 1.0, 'khz': 1e3, 'mhz': 1e6, 'ghz': 1e9}
+_FREQUENCY_RE = re.compile(r'^\s*([0-9]+(?:[.,][0-9]+)?)\s*([kmg]?hz)?\s*$', re.IGNORECASE)
+
+
+def parse_frequency(text):
+    """Converte o texto da legenda (ex.: '2.45 GHz') em Hz; None se não for reconhecido."""
+    match = _FREQUENCY_RE.match(text or '')
+    if not match:
+        return None
+    value = float(match.group(1).replace(',', '.'))
+    return value * _FREQUENCY_UNITS[(match.group(2) or '').lower()]
+
+
+class SessionStore:
+    """
+    Guarda e reabre varreduras (ângulo, potência média, nº de amostras, desvio) com título e frequência,
+    e as grades das varreduras 2D (save_grid/list_grids/load_grid).
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.arrays_dir = os.path.join(root, ARRAYS_DIR)
+        os.makedirs(self.arrays_dir, exist_ok=True)
+        self.db_path = os.path.join(root, DB_NAME)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sweeps ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " title TEXT NOT NULL,"
+                " frequency TEXT NOT NULL,"
+                " frequency_hz REAL,"
+                " created_at REAL NOT NULL,"
+                " n_points INTEGER NOT NULL,"
+                " array_file TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS sweeps_created ON sweeps (created_at)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS grids ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " title TEXT NOT NULL,"
+                " frequency TEXT NOT NULL,"
+                " frequency_hz REAL,"
+                " created_at REAL NOT NULL,"
+                " n_points INTEGER NOT NULL,"
+                " az_step REAL NOT NULL,"
+                " el_step REAL NOT NULL,"
+                " array_file TEXT NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Uma conexão por operação (o store pode ser usado por mais de uma thread), com commit ao final."""
+        db = sqlite3.connect(self.db_path)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def save(self, title, frequency, angles, powers, counts=None, created_at=None, stds=None):
+        """Grava a varredura e devolve o id. O .npy é escrito antes da linha no banco."""
+        created_at = time.time() if created_at is None else created_at
+        data = np.empty(len(angles), dtype=SWEEP_DTYPE)
+        data['angle'] = angles
+        data['power'] = powers
+        data['count'] = 1 if counts is None else counts
+        data['std'] = np.nan if stds is None else stds
+        array_file = self._write_array(data)
+
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO sweeps (title, frequency, frequency_hz, created_at, n_points, array_file)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (title, frequency, parse_frequency(frequency), created_at, len(data), array_file),
+            )
+            return cursor.lastrowid
+
+    def _write_array(self, data):
+        """Grava o vetor em um .npy novo (temporário + os.replace) e devolve o nome do arquivo."""
+        array_file = f"{uuid.uuid4().hex}.npy"
+        path = os.path.join(self.arrays_dir, array_file)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.save(f, data)
+        os.replace(temp_path, path)
+        return array_file
+
+    def list(self, limit=None):
+        """Varreduras salvas, da mais recente para a mais antiga (só metadados)."""
+        query = ("SELECT id, title, frequency, frequency_hz, created_at, n_points FROM sweeps"
+                 " ORDER BY created_at DESC")
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (int(limit),)
+        with self._connect() as db:
+            return [SweepRecord(*row) for row in db.execute(query, params)]
+
+    def get(self, sweep_id):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, title, frequency, frequency_hz, created_at, n_points FROM sweeps WHERE id = ?",
+                (sweep_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"Varredura {sweep_id} não encontrada.")
+        return SweepRecord(*row)
+
+    def _array_path(self, sweep_id, table='sweeps'):
+        with self._connect() as db:
+            row = db.execute(f"SELECT array_file FROM {table} WHERE id = ?", (sweep_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Varredura {sweep_id} não encontrada.")
+        return os.path.join(self.arrays_dir, row[0])
+
+    def load(self, sweep_id, mmap=True):
+        """Dados da varredura (vetor SWEEP_DTYPE); com mmap=True as páginas são lidas sob demanda."""
+        return np.load(self._array_path(sweep_id), mmap_mode='r' if mmap else None)
+
+    def delete(self, sweep_id):
+        path = self._array_path(sweep_id)
+        with self._connect() as db:
+            db.execute("DELETE FROM sweeps WHERE id = ?", (sweep_id,))
+        if os.path.exists(path):
+            os.remove(path)
+
+    # ------------------------------------------- Varreduras 2D -----------------------------------------------
+    def save_grid(self, title, frequency, az_step, el_step, azimuths, elevations, powers, counts, stds=None,
+                  created_at=None):
+        """Grava as células medidas de uma grade (grid_store.GridStore.cells()) e devolve o id."""
+        created_at = time.time() if created_at is None else created_at
+        data = np.empty(len(azimuths), dtype=GRID_DTYPE)
+        data['azimuth'] = azimuths
+        data['elevation'] = elevations
+        data['power'] = powers
+        data['count'] = counts
+        data['std'] = np.nan if stds is None else stds
+        array_file = self._write_array(data)
+
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO grids (title, frequency, frequency_hz, created_at, n_points, az_step, el_step, array_file)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (title, frequency, parse_frequency(frequency), created_at, len(data), float(az_step), float(el_step),
+                 array_file),
+            )
+            return cursor.lastrowid
+
+    def list_grids(self, limit=None):
+        """Grades salvas, da mais recente para a mais antiga (só metadados)."""
+        query = ("SELECT id, title, frequency, frequency_hz, created_at, n_points, az_step, el_step FROM grids"
+                 " ORDER BY created_at DESC")
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (int(limit),)
+        with self._connect() as db:
+            return [GridRecord(*row) for row in db.execute(query, params)]
+
+    def get_grid(self, grid_id):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, title, frequency, frequency_hz, created_at, n_points, az_step, el_step FROM grids"
+                " WHERE id = ?",
+                (grid_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"Varredura 2D {grid_id} não encontrada.")
+        return GridRecord(*row)
+
+    def load_grid(self, grid_id, mmap=True):
+        """Células da grade (vetor GRID_DTYPE)."""
+        return np.load(self._array_path(grid_id, 'grids'), mmap_mode='r' if mmap else None)
+
+    def delete_grid(self, grid_id):
+        path = self._array_path(grid_id, 'grids')
+        with self._connect() as db:
+            db.execute("DELETE FROM grids WHERE id = ?", (grid_id,))
+        if os.path.exists(path):
+            os.remove(path)
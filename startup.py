@@ -0,0 +1,67 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                   TEMPO DE INICIALIZAÇÃO E PRÉ-CARREGAMENTO
+# -------------------------------------------------------------------------------------------------------------
+# Este módulo não pode importar NumPy nem Matplotlib: ele é carregado antes de tudo no main.py.
+import importlib
+import threading
+import time
+
+# Módulos pesados só usados depois da primeira tela; carregados em segundo plano após o on_start
+HEAVY_MODULES = (
+    'numpy',
+    'measurements',
+    'pattern',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_agg',
+)
+
+
+class StartupTimer:
+    """Marca o tempo de cada fase da abertura do app e monta um relatório."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = [] # (fase, instante)
+        self.prewarm_times = [] # (módulo, duração)
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        with self._lock:
+            self.marks.append((phase, time.perf_counter()))
+
+    def report(self):
+        """Texto com a duração de cada fase (desde a anterior) e o tempo acumulado."""
+        lines = ["Tempo de inicialização:"]
+        previous = self.start
+        with self._lock:
+            for phase, instant in self.marks:
+                lines.append(f"  {phase:<22} +{(instant - previous) * 1000:7.1f} ms  (total {(instant - self.start) * 1000:7.1f} ms)")
+                previous = instant
+            if self.prewarm_times:
+                lines.append("Pré-carregamento em segundo plano:")
+                for module, duration in self.prewarm_times:
+                    lines.append(f"  {module:<32} {duration * 1000:7.1f} ms")
+        return "\n".join(lines)
+
+    def prewarm(self, modules=HEAVY_MODULES, on_done=None):
+        """Importa os módulos em uma thread separada, registrando quanto tempo cada um levou."""
+        def run():
+            for module in modules:
+                started = time.perf_counter()
+                try:
+                    importlib.import_module(module)
+                except Exception as e:
+                    print(f"Erro ao pré-carregar {module}: {e}")
+                    continue
+                with self._lock:
+                    self.prewarm_times.append((module, time.perf_counter() - started))
+            self.mark("pré-carregamento")
+            if on_done:
+                on_done()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,372 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                             VARREDURA AUTOMÁTICA
+# -------------------------------------------------------------------------------------------------------------
+import queue
+import threading
+import time
+
+from motion import AxisPlanner, Move, Plan, best_route, elevation_planner
+from protocol import REPLY_ACK, REPLY_POWER, REPLY_ERROR, AXIS_AZIMUTH, axis_direction
+from sample_stats import confidence_halfwidth, mean_std, reject_outliers
+from tracing import tracer
+
+REPLY_TIMEOUT = 10.0 # Tempo máximo (s) de espera pela resposta da ESP32 em cada ponto
+MIN_DWELL_SAMPLES = 3 # Leituras mínimas em um ângulo antes de avaliar o intervalo de confiança
+REFINE_THRESHOLD_DB = 3.0 # Variação (dB) entre vizinhos acima da qual a varredura adaptativa refina o trecho
+HALF_POWER_DB = 3.0 # Trechos que cruzam o nível de -3 dB do pico são refinados (largura de feixe)
+
+
+class SweepError(Exception):
+    """Erro durante a varredura automática (timeout ou erro reportado pela ESP32)."""
+
+
+_RETRY = object() # O comando foi descartado na reconexão: o ponto é medido de novo
+
+
+def sweep_angles(start, stop, step):
+    """Lista os ângulos (em graus inteiros) visitados entre start e stop, incluindo stop."""
+    start, stop, step = int(start), int(stop), int(step)
+    if step <= 0:
+        raise ValueError("O passo deve ser maior que zero.")
+    if stop < start:
+        raise ValueError("O ângulo final deve ser maior ou igual ao inicial.")
+    angles = list(range(start, stop + 1, step))
+    if angles[-1] != stop:
+        angles.append(stop)
+    return angles
+
+
+def raster_points(az_start, az_stop, az_step, el_start, el_stop, el_step):
+    """
+    Pontos (azimute, elevação) de uma varredura em grade, em zigue-zague (boustrofédon): cada linha
+    de elevação é percorrida no sentido oposto ao da anterior, então entre dois pontos seguidos só
+    um eixo se move e nenhuma linha termina com um retorno até o início.
+    """
+    return _zigzag(sweep_angles(az_start, az_stop, az_step), sweep_angles(el_start, el_stop, el_step))
+
+
+def _zigzag(azimuths, elevations):
+    points = []
+    for row, elevation in enumerate(elevations):
+        row_azimuths = azimuths if row % 2 == 0 else azimuths[::-1]
+        points.extend((azimuth, elevation) for azimuth in row_azimuths)
+    return points
+
+
+def refine_angles(angles, gains, min_step=1, threshold_db=REFINE_THRESHOLD_DB):
+    """
+    Ângulos novos (pontos médios) para a próxima passada da varredura adaptativa, a partir das médias
+    já medidas ('angles' em ordem crescente). Um trecho entre dois vizinhos é dividido se tiver mais de
+    2*min_step graus e:
+      - a diferença de ganho entre as pontas passar de threshold_db (flanco íngreme);
+      - a curvatura (segunda diferença) em uma das pontas passar de threshold_db (pico, nulo ou joelho);
+      - tocar o pico, ou cruzar o nível de meia potência (HALF_POWER_DB abaixo do pico).
+    """
+    if len(angles) < 2:
+        return []
+    peak = max(gains)
+    half_power = peak - HALF_POWER_DB
+    curvature = [0.0] * len(angles)
+    for i in range(1, len(angles) - 1):
+        curvature[i] = abs(gains[i - 1] - 2 * gains[i] + gains[i + 1])
+    new_angles = []
+    for i in range(len(angles) - 1):
+        left, right = angles[i], angles[i + 1]
+        if right - left < 2 * min_step:
+            continue
+        g_left, g_right = gains[i], gains[i + 1]
+        if (abs(g_right - g_left) > threshold_db
+                or max(curvature[i], curvature[i + 1]) > threshold_db
+                or peak in (g_left, g_right)
+                or (g_left - half_power) * (g_right - half_power) < 0):
+            new_angles.append((left + right) // 2)
+    return new_angles
+
+
+class SweepEngine:
+    """
+    Executa a varredura em uma thread separada: para cada ângulo envia o movimento,
+    espera o 'OK' de fim de movimento e a leitura de potência da ESP32 e registra o ponto.
+    Os callbacks são chamados na thread da varredura; quem usa a engine deve repassá-los
+    para a thread da interface (Clock.schedule_once).
+
+    Com max_samples > 1 a engine permanece no ângulo pedindo novas leituras (&R000) até que
+    o intervalo de confiança de 95% da média fique abaixo de ci_threshold (dB), ou até
+    max_samples leituras. Leituras discrepantes (mediana/MAD) são descartadas antes do cálculo.
+    on_point recebe a lista das leituras aceitas.
+
+    Com 'link' (connection.ConnectionManager), a espera pelas respostas fica suspensa enquanto a
+    conexão é refeita (sem contar para o timeout), e o comando do ponto atual é reenviado se a
+    reconexão o descartou; se a conexão for encerrada (desistência ou close()), a varredura termina
+    com SweepError. 'start_index' retoma uma varredura interrompida a partir daquele ponto;
+    'completed' guarda quantos pontos já foram medidos.
+
+    A ordem de visita e os comandos de cada trecho vêm do planejador (motion.AxisPlanner): a engine
+    percorre os pontos no sentido que exige menos movimento a partir da posição atual ('order' fixa a
+    ordem escolhida antes, ao retomar) e 'travel_time' estima o tempo de movimento restante.
+    """
+
+    def __init__(self, send_command, replies, start, stop, step, position=0,
+                 on_point=None, on_progress=None, on_finish=None, timeout=REPLY_TIMEOUT,
+                 max_samples=1, ci_threshold=None, min_samples=MIN_DWELL_SAMPLES, reject=True,
+                 link=None, start_index=0, planner=None, order=None):
+        self.send_command = send_command # send_command(direction, steps)
+        self.replies = replies           # queue.Queue de protocol.Reply
+        self.points = sweep_angles(start, stop, step)
+        self.position = self._initial_position(position)
+        self.planner = planner or AxisPlanner()
+        self.on_point = on_point
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.timeout = timeout
+        if max_samples < 1:
+            raise ValueError("O número de leituras deve ser maior que zero.")
+        self.max_samples = int(max_samples)
+        self.ci_threshold = ci_threshold
+        self.min_samples = max(2, min(int(min_samples), self.max_samples))
+        self.reject = reject
+        self.link = link
+        self.completed = int(start_index)
+        self._epoch = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._choose_route(order)
+
+    def _initial_position(self, position):
+        return int(position)
+
+    def _routes(self):
+        """Ordens de visita possíveis: crescente e decrescente."""
+        return [self.points, self.points[::-1]]
+
+    def _leg(self, position, point):
+        return self.planner.move_to(position, point)
+
+    def _choose_route(self, order):
+        """Escolhe a ordem de visita com menos tempo de movimento (ValueError se algum ponto for inalcançável)."""
+        routes = self._routes()
+        if order is None:
+            order, _ = best_route(self.position, routes, self._leg)
+        self.order = order
+        self.points = routes[order]
+        _, self.travel_time = best_route(self.position, [self.points[self.completed:]], self._leg)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Pede a interrupção da varredura; o ponto em andamento é concluído ou descartado."""
+        self._stop_event.set()
+
+    def resume_options(self):
+        """Argumentos que fazem uma engine nova continuar desta (ver start_index e order)."""
+        return {'start_index': self.completed, 'order': self.order}
+
+    def _extend_points(self):
+        """Chamado ao fim da lista de pontos: devolve True se acrescentou pontos (varredura adaptativa)."""
+        return False
+
+    def _measured(self, point, samples):
+        pass
+
+    def _run(self):
+        error = None
+        try:
+            while not self._stop_event.is_set() and (self.completed < len(self.points) or self._extend_points()):
+                point = self.points[self.completed]
+                samples = self._dwell_at(point)
+                if samples is None: # Interrompido durante a espera
+                    break
+                self.completed += 1
+                self._measured(point, samples)
+                if self.on_point:
+                    self.on_point(point, samples)
+                if self.on_progress:
+                    self.on_progress(self.completed, len(self.points))
+        except Exception as e:
+            error = e
+        if self.on_finish:
+            self.on_finish(self.position, error)
+
+    def _dwell_at(self, point):
+        """Lê a potência no ponto até atingir a precisão pedida; devolve as leituras aceitas."""
+        readings = []
+        while len(readings) < self.max_samples:
+            power = self._measure_at(point)
+            if power is None:
+                return None
+            if power is _RETRY:
+                self._sync_position()
+                continue
+            readings.append(power)
+            if self._precise_enough(readings):
+                break
+        return self._accepted(readings)
+
+    def _accepted(self, readings):
+        kept = reject_outliers(readings) if self.reject else readings
+        return kept or readings
+
+    def _precise_enough(self, readings):
+        if self.ci_threshold is None or len(readings) < self.min_samples:
+            return False
+        kept = self._accepted(readings)
+        if len(kept) < 2:
+            return False
+        mean, std = mean_std(kept)
+        return confidence_halfwidth(std, len(kept)) <= self.ci_threshold
+
+    def _sync_position(self):
+        """Após uma reconexão que descartou comandos, assume a posição confirmada pela conexão."""
+        self.position = self.link.position[0]
+
+    def _measure_at(self, angle):
+        """Move o motor até o ângulo e devolve a potência lida (dBm)."""
+        plan = self.planner.move_to(self.position, angle)
+        return self._move_and_read(plan.moves, angle, plan.position)
+
+    def _move_and_read(self, moves, label, target):
+        """
+        Envia os comandos e espera o 'OK' do último (quando a posição passa a ser 'target') e a
+        leitura de potência que o segue; as leituras intermediárias são descartadas. Sem comandos,
+        envia &R000, que apenas pede nova leitura. Devolve None se a varredura for interrompida.
+        """
+        moves = moves or [Move(axis_direction(AXIS_AZIMUTH, 0), 0)]
+        self._drain_replies()
+        sent = time.perf_counter()
+        self._epoch = self.link.epoch if self.link is not None else None
+        for direction, steps in moves:
+            self.send_command(direction, steps)
+        remaining = len(moves)
+        acked = None
+        while True:
+            reply = self._next_reply()
+            if reply is None or reply is _RETRY:
+                return reply
+            if reply.kind == REPLY_ERROR:
+                raise SweepError(f"ESP32 reportou erro em {label}°: {reply.value}")
+            if reply.kind == REPLY_ACK:
+                remaining -= 1
+                if remaining:
+                    continue
+                acked = time.perf_counter()
+                tracer.record('varredura.movimento', sent, acked - sent,
+                              {'passos': sum(steps for _, steps in moves), 'comandos': len(moves)})
+                self.position = target
+            elif reply.kind == REPLY_POWER and acked is not None:
+                tracer.record('varredura.leitura', acked, time.perf_counter() - acked)
+                return reply.value
+
+    def _next_reply(self):
+        """Espera a próxima resposta, verificando periodicamente o pedido de parada."""
+        waited = 0.0
+        while waited < self.timeout:
+            if self._stop_event.is_set():
+                return None
+            if self.link is not None:
+                if self.link.closed.is_set():
+                    raise SweepError("Conexão com a ESP32 encerrada.")
+                if not self.link.connected.is_set(): # Reconectando: a espera não conta
+                    self.link.connected.wait(0.1)
+                    continue
+                if self.link.epoch != self._epoch:
+                    return _RETRY
+            try:
+                return self.replies.get(timeout=0.1)
+            except queue.Empty:
+                waited += 0.1
+        raise SweepError(f"Sem resposta da ESP32 após {self.timeout:.0f} s.")
+
+    def _drain_replies(self):
+        """Descarta respostas antigas que chegaram fora de uma espera."""
+        while True:
+            try:
+                self.replies.get_nowait()
+            except queue.Empty:
+                return
+
+
+class AdaptiveSweepEngine(SweepEngine):
+    """
+    Varredura adaptativa: uma primeira passada com o passo grosso e, em seguida, passadas que só
+    medem os pontos médios dos trechos marcados por refine_angles (flancos, picos, nulos e a
+    região de meia potência), até nenhum trecho precisar de refino, o passo chegar a min_step ou
+    a varredura atingir max_points. Os pontos de cada passada seguem a ordem de menor movimento.
+
+    'points' e 'measured' (médias já obtidas por ângulo) vêm de resume_options() ao retomar.
+    """
+
+    def __init__(self, send_command, replies, start, stop, step, min_step=1, threshold_db=REFINE_THRESHOLD_DB,
+                 max_points=None, points=None, measured=None, **kwargs):
+        self.min_step = max(1, int(min_step))
+        self.threshold_db = threshold_db
+        self.max_points = max_points
+        self.measured = dict(measured or {}) # ângulo -> média das leituras aceitas (dBm)
+        super().__init__(send_command, replies, start, stop, step, **kwargs)
+        if points is not None:
+            self.points = list(points)
+            _, self.travel_time = best_route(self.position, [self.points[self.completed:]], self._leg)
+
+    def resume_options(self):
+        options = super().resume_options()
+        options.update(points=list(self.points), measured=dict(self.measured))
+        return options
+
+    def _measured(self, point, samples):
+        self.measured[point] = sum(samples) / len(samples)
+
+    def _extend_points(self):
+        angles = sorted(self.measured)
+        new_angles = [a for a in refine_angles(angles, [self.measured[a] for a in angles], self.min_step,
+                                               self.threshold_db) if a not in self.measured]
+        if self.max_points is not None:
+            new_angles = new_angles[:max(0, self.max_points - len(self.points))]
+        if not new_angles:
+            return False
+        routes = [new_angles, new_angles[::-1]]
+        order, travel_time = best_route(self.position, routes, self._leg)
+        self.points.extend(routes[order])
+        self.travel_time = travel_time
+        return True
+
+
+class RasterSweepEngine(SweepEngine):
+    """
+    Varredura em grade azimute x elevação, percorrida em zigue-zague (raster_points) a partir do canto
+    mais rápido de alcançar. A posição é o par (azimute, elevação); em cada ponto só o eixo que mudou
+    recebe comando (se os dois mudarem, a elevação é movida primeiro, sem leitura intermediária).
+    """
+
+    def __init__(self, send_command, replies, az_range, el_range, position=(0, 0), el_planner=None, **kwargs):
+        self.az_range = az_range
+        self.el_range = el_range
+        self.el_planner = el_planner or elevation_planner()
+        super().__init__(send_command, replies, 0, 0, 1, position=position, **kwargs)
+
+    def _initial_position(self, position):
+        return (int(position[0]), int(position[1]))
+
+    def _routes(self):
+        """Os quatro cantos de partida do zigue-zague."""
+        azimuths = sweep_angles(*self.az_range)
+        elevations = sweep_angles(*self.el_range)
+        return [_zigzag(az_order, el_order) for el_order in (elevations, elevations[::-1])
+                for az_order in (azimuths, azimuths[::-1])]
+
+    def _leg(self, position, point):
+        el_plan = self.el_planner.move_to(position[1], point[1])
+        az_plan = self.planner.move_to(position[0], point[0])
+        return Plan(el_plan.moves + az_plan.moves, (az_plan.position, el_plan.position),
+                    el_plan.duration + az_plan.duration)
+
+    def _sync_position(self):
+        self.position = tuple(self.link.position)
+
+    def _measure_at(self, point):
+        plan = self._leg(self.position, point)
+        return self._move_and_read(plan.moves, f"({point[0]}, {point[1]})", plan.position)
@@ -0,0 +1,177 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                  MEDIÇÃO DE TEMPO DOS TRECHOS CRÍTICOS
+# -------------------------------------------------------------------------------------------------------------
+# Intervalos ('spans') de cada etapa vão para um buffer circular de tamanho fixo. Desligado (padrão),
+# span() devolve sempre o mesmo objeto vazio e begin()/end() retornam na primeira linha, então os
+# pontos de medição podem ficar no código sem custo perceptível.
+#
+# Etapas medidas no app:
+#   bt.enviar          enfileirar um comando (thread da interface)
+#   bt.escrita         write() + flush() de um lote de comandos (thread de escrita)
+#   bt.ida_e_volta     do envio do comando até o 'OK' (ou 'ERR:') da ESP32, inclui o tempo do motor
+#   varredura.movimento / varredura.leitura   comando -> 'OK' e 'OK' -> 'P:' dentro da varredura
+#   medida.adicionar   registro manual de uma medida
+#   padrao.normalizar / padrao.plot_spec      normalização e preparação do gráfico
+#   render.savefig / render.rgba              gravação em arquivo e rasterização da prévia
+#
+# Sem NumPy: carregado na abertura do app. ANTENA_TRACE=1 liga a medição desde o início.
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+TRACE_CAPACITY = 4096 # Spans guardados; os mais antigos são descartados
+TRACE_ENV = "ANTENA_TRACE"
+TRACE_SUFFIX = ".trace.json" # Gravado ao lado dos arquivos exportados da sessão
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por posição mais próxima (valores já ordenados)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Tracer:
+    """
+    Buffer circular de spans (nome, início, duração, thread, argumentos), em segundos de perf_counter.
+    span() mede um bloco 'with'; begin()/end() medem intervalos que começam e terminam em threads
+    diferentes (ex.: comando enviado pela thread de escrita e 'OK' recebido pela de leitura), pareados
+    em ordem de chegada (FIFO) por nome.
+    """
+
+    def __init__(self, capacity=TRACE_CAPACITY, enabled=False):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self._spans = deque(maxlen=capacity) # append() em deque é seguro entre threads
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._spans)
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        if not enabled:
+            with self._lock:
+                self._open.clear()
+
+    def clear(self):
+        self._spans.clear()
+        with self._lock:
+            self._open.clear()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def record(self, name, start, duration, args=None):
+        if self.enabled:
+            self._spans.append((name, start, duration, threading.get_ident(), args or None))
+
+    def begin(self, name):
+        """Abre um intervalo que será fechado por end(name), possivelmente em outra thread."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._open.setdefault(name, deque()).append(time.perf_counter())
+
+    def end(self, name, **args):
+        """Fecha o intervalo aberto mais antigo com esse nome (ignorado se não houver)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            pending = self._open.get(name)
+            if not pending:
+                return
+            start = pending.popleft()
+        self.record(name, start, time.perf_counter() - start, args)
+
+    def discard(self, name):
+        """Descarta os intervalos abertos com esse nome (ex.: comandos perdidos junto com a conexão)."""
+        with self._lock:
+            self._open.pop(name, None)
+
+    def spans(self):
+        return list(self._spans)
+
+    def stats(self):
+        """{etapa: (quantidade, p50, p95, máximo)} em segundos, a partir dos spans no buffer."""
+        durations = {}
+        for name, start, duration, thread, args in self.spans():
+            durations.setdefault(name, []).append(duration)
+        result = {}
+        for name, values in sorted(durations.items()):
+            values.sort()
+            result[name] = (len(values), percentile(values, 0.50), percentile(values, 0.95), values[-1])
+        return result
+
+    def format_stats(self):
+        """Tabela curta (ms) para a sobreposição na tela."""
+        stats = self.stats()
+        if not stats:
+            return "Sem medições ainda." if self.enabled else "Medição desligada."
+        lines = [f"{'etapa':<20} {'n':>5} {'p50':>8} {'p95':>8}"]
+        for name, (count, p50, p95, _) in stats.items():
+            lines.append(f"{name:<20} {count:>5} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f}")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Spans no formato Trace Event do Chrome (abrir em chrome://tracing ou ui.perfetto.dev)."""
+        events = []
+        threads = {}
+        for name, start, duration, thread, args in self.spans():
+            tid = threads.setdefault(thread, len(threads) + 1)
+            event = {
+                'name': name,
+                'cat': name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': round((start - self.origin) * 1e6, 1),
+                'dur': round(duration * 1e6, 1),
+                'pid': 1,
+                'tid': tid,
+            }
+            if args:
+                event['args'] = args
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+
+tracer = Tracer(enabled=os.environ.get(TRACE_ENV) == '1')
@@ -0,0 +1,409 @@
+# -------------------------------------------------------------------------------------------------------------
+#                                   TRANSPORTES DE COMUNICAÇÃO COM A ESP32
+# -------------------------------------------------------------------------------------------------------------
+# Cada transporte abre a conexão em connect() e entrega dois streams com a mesma interface dos
+# streams Java do RFCOMM, que é o que BluetoothReceiver e CommandWriter esperam:
+#   entrada: read(buffer, offset, tamanho) -> nº de bytes (-1 no fim do stream) e available()
+#   saída:   write(bytes) e flush()
+# Assim a leitura/escrita em threads é a mesma no Android (RFCOMM), no desktop (serial ou TCP)
+# e no simulador em processo.
+#
+# Especificação em texto (transport_from_spec), usada no desktop pela variável ANTENA_TRANSPORT:
+#   sim                      -> simulador da ESP32 (padrão)
+#   serial:/dev/ttyUSB0      -> ESP32 na USB (pyserial), 115200 baud
+#   serial:COM3:9600         -> porta e baud rate
+#   tcp:192.168.4.1:3333     -> socket TCP
+import math
+import random
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from protocol import MAX_STEP
+
+SERIAL_BAUDRATE = 115200
+SIM_STEP_TIME = 0.005 # Tempo (s) que o motor simulado leva por grau
+SIM_NOISE_DB = 0.3 # Desvio padrão (dB) do ruído da leitura simulada
+SIM_PEAK_POWER = -30.0 # Potência (dBm) na direção de máximo do padrão simulado
+SIM_FLOOR_DB = -25.0 # Nível (dB) do lóbulo traseiro do padrão simulado
+
+
+class Transport(ABC):
+    """Interface dos transportes: connect(), close() e os dois streams no estilo Java."""
+
+    name = "transporte"
+
+    @abstractmethod
+    def connect(self):
+        """Abre a conexão (bloqueante: chamar fora da thread da interface)."""
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    @abstractmethod
+    def input_stream(self):
+        pass
+
+    @abstractmethod
+    def output_stream(self):
+        pass
+
+
+# ------------------------------------------- Android (RFCOMM) ------------------------------------------------
+class RfcommTransport(Transport):
+    """Socket Bluetooth clássico (SPP) do Android, via classes Java carregadas pelo pyjnius."""
+
+    def __init__(self, device, uuid_class, uuid_string):
+        self.device = device
+        self.name = device.getName()
+        self._uuid = uuid_class.fromString(uuid_string)
+        self._socket = None
+
+    def connect(self):
+        self._socket = self.device.createRfcommSocketToServiceRecord(self._uuid)
+        try:
+            self._socket.connect()
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except Exception:
+                pass
+        self._socket = None
+
+    def input_stream(self):
+        return self._socket.getInputStream()
+
+    def output_stream(self):
+        return self._socket.getOutputStream()
+
+
+# ------------------------------------------- Desktop (serial/TCP) --------------------------------------------
+class _SerialInput:
+    def __init__(self, port):
+        self._port = port
+
+    def available(self):
+        return self._port.in_waiting
+
+    def read(self, buf, offset, size):
+        # Espera o primeiro byte (timeout=None) e então leva o que já estiver no buffer da porta
+        data = self._port.read(max(1, min(size, self._port.in_waiting)))
+        buf[offset:offset + len(data)] = data
+        return len(data)
+
+
+class SerialTransport(Transport):
+    """ESP32 ligada na USB (pyserial, importado só quando este transporte é usado)."""
+
+    def __init__(self, port, baudrate=SERIAL_BAUDRATE):
+        self.name = port
+        self.port = port
+        self.baudrate = baudrate
+        self._serial = None
+
+    def connect(self):
+        import serial # type: ignore
+        self._serial = serial.Serial(self.port, self.baudrate, timeout=None)
+
+    def close(self):
+        if self._serial is not None:
+            self._serial.close()
+        self._serial = None
+
+    def input_stream(self):
+        return _SerialInput(self._serial)
+
+    def output_stream(self):
+        return self._serial
+
+
+class _SocketInput:
+    def __init__(self, sock):
+        self._sock = sock
+
+    def available(self):
+        return 0 # Sem consulta barata em sockets: use o modo bloqueante do BluetoothReceiver
+
+    def read(self, buf, offset, size):
+        count = self._sock.recv_into(memoryview(buf)[offset:offset + size])
+        return count if count > 0 else -1 # recv vazio = conexão fechada pelo outro lado
+
+
+class _SocketOutput:
+    def __init__(self, sock):
+        self._sock = sock
+
+    def write(self, data):
+        self._sock.sendall(data)
+
+    def flush(self):
+        pass
+
+
+class TcpTransport(Transport):
+    """Socket TCP (ex.: ESP32 em modo Wi-Fi ou uma ponte serial-TCP)."""
+
+    def __init__(self, host, port, timeout=10.0):
+        self.name = f"{host}:{port}"
+        self.address = (host, int(port))
+        self.timeout = timeout
+        self._sock = None
+
+    def connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._sock.settimeout(None) # Leitura bloqueante depois de conectar
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Comandos curtos saem na hora
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+        self._sock = None
+
+    def input_stream(self):
+        return _SocketInput(self._sock)
+
+    def output_stream(self):
+        return _SocketOutput(self._sock)
+
+
+# --------------------------------------------- Simulador da ESP32 ---------------------------------------------
+def synthetic_pattern(azimuth, elevation):
+    """Padrão direcional sintético (dB relativos ao pico): lóbulo principal em 0°, lóbulo traseiro em SIM_FLOOR_DB."""
+    az = math.radians(azimuth)
+    el = math.radians(elevation)
+    main_lobe = ((1.0 + math.cos(az)) / 2.0) ** 2 * math.cos(el) ** 2
+    return 10.0 * math.log10(main_lobe + 10.0 ** (SIM_FLOOR_DB / 10.0))
+
+
+class _PipeInput:
+    """Stream de entrada alimentado pelo simulador; read() bloqueia até chegar algum byte."""
+
+    def __init__(self):
+        self._data = bytearray()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def push(self, data):
+        with self._cond:
+            self._data += data
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def available(self):
+        with self._cond:
+            return len(self._data)
+
+    def read(self, buf, offset, size):
+        with self._cond:
+            while not self._data and not self._closed:
+                self._cond.wait()
+            if not self._data:
+                return -1
+            count = min(size, len(self._data))
+            buf[offset:offset + count] = self._data[:count]
+            del self._data[:count]
+            return count
+
+
+class _SimulatorOutput:
+    def __init__(self, simulator, link):
+        self._simulator = simulator
+        self._link = link
+
+    def write(self, data):
+        if self._link is not self._simulator.link:
+            raise OSError("Conexão com o simulador fechada.")
+        self._simulator.receive(data)
+
+    def flush(self):
+        pass
+
+
+class EspSimulator:
+    """
+    Emula o firmware da ESP32: interpreta &R/&L/&U/&D###, espera o tempo do movimento
+    (step_time por grau), responde 'OK' e em seguida 'P:<dBm>' com o padrão sintético mais ruído
+    gaussiano na nova posição. Comandos desconhecidos geram 'ERR:'.
+
+    Também implementa a extensão com números de sequência do protocol.py: prefixo '#n' (comando
+    repetido só repete a resposta), 'OK#n' e a consulta &Q000. O estado (posição, último número
+    executado) sobrevive às quedas de conexão: attach() abre um novo enlace e o anterior para de
+    receber respostas, como se elas tivessem se perdido no ar.
+    """
+
+    def __init__(self, pattern=synthetic_pattern, step_time=SIM_STEP_TIME, noise_dB=SIM_NOISE_DB,
+                 peak_power=SIM_PEAK_POWER, seed=None):
+        self.pattern = pattern
+        self.step_time = step_time
+        self.noise_dB = noise_dB
+        self.peak_power = peak_power
+        self.azimuth = 0
+        self.elevation = 0
+        self.last_seq = 0
+        self.commands_received = 0
+        self.link = None # _PipeInput do enlace atual (None = sem conexão)
+        self._random = random.Random(seed)
+        self._pending = bytearray()
+        self._commands = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def attach(self):
+        """Abre um novo enlace; devolve o stream de entrada (respostas) dele."""
+        with self._cond:
+            if self.link is not None:
+                self.link.close()
+            self.link = _PipeInput()
+            self._pending.clear() # Bytes de um comando partido na queda não são aproveitados
+            return self.link
+
+    def detach(self):
+        """Derruba o enlace atual (a leitura do app recebe fim de stream)."""
+        with self._cond:
+            if self.link is not None:
+                self.link.close()
+            self.link = None
+
+    def receive(self, data):
+        """Bytes escritos pelo app; cada comando completo ([#n]&X###) vai para a fila do 'motor'."""
+        with self._cond:
+            self._pending += data
+            pending = self._pending
+            while True:
+                start = next((i for i, byte in enumerate(pending) if byte in b'#&'), -1)
+                if start < 0:
+                    pending.clear()
+                    break
+                del pending[:start]
+                seq = None
+                amp = 0
+                if pending[:1] == b'#':
+                    amp = pending.find(b'&')
+                    if amp < 0:
+                        break
+                    digits = bytes(pending[1:amp])
+                    if not digits.isdigit():
+                        del pending[:1]
+                        continue
+                    seq = int(digits)
+                if len(pending) - amp < 5:
+                    break
+                self._commands.append((bytes(pending[amp:amp + 5]).decode('ascii', 'replace'), seq))
+                del pending[:amp + 5]
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self.detach()
+
+    def read_power(self):
+        """Leitura de potência (dBm) na posição atual."""
+        gain = self.pattern(self.azimuth, self.elevation)
+        return self.peak_power + gain + self._random.gauss(0.0, self.noise_dB)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._commands and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                command, seq = self._commands.pop(0)
+            reply = self._execute(command, seq).encode('ascii')
+            with self._cond:
+                if self.link is not None:
+                    self.link.push(reply)
+
+    def _execute(self, command, seq=None):
+        self.commands_received += 1
+        suffix = f"#{seq}" if seq is not None else ""
+        direction, digits = command[1], command[2:]
+        if direction not in 'RLUDQ' or not digits.isdigit() or int(digits) > MAX_STEP:
+            return f"ERR{suffix}:comando desconhecido {command}\n"
+        if direction == 'Q':
+            if seq is not None:
+                self.last_seq = max(self.last_seq, seq)
+            return f"POS:{self.azimuth}\nEL:{self.elevation}\nSEQ:{self.last_seq}\nOK{suffix}\n"
+        if seq is not None and seq <= self.last_seq: # Retransmissão de comando já executado
+            return f"OK{suffix}\nP:{self.read_power():.2f}\n"
+        steps = int(digits)
+        if self.step_time:
+            time.sleep(steps * self.step_time)
+        if direction == 'R':
+            self.azimuth += steps
+        elif direction == 'L':
+            self.azimuth -= steps
+        elif direction == 'U':
+            self.elevation += steps
+        else:
+            self.elevation -= steps
+        if seq is not None:
+            self.last_seq = seq
+        return f"OK{suffix}\nP:{self.read_power():.2f}\n"
+
+
+class SimulatorTransport(Transport):
+    """
+    Conecta o app a um EspSimulator no mesmo processo (desenvolvimento e testes de carga sem hardware).
+    drop() simula a queda do enlace sem perder o estado do simulador; connect() reconecta.
+    """
+
+    name = "Simulador ESP32"
+
+    def __init__(self, simulator=None, **simulator_options):
+        self._options = simulator_options
+        self.simulator = simulator
+        self._link = None
+
+    def connect(self):
+        if self.simulator is None:
+            self.simulator = EspSimulator(**self._options)
+        self._link = self.simulator.attach()
+
+    def drop(self):
+        if self.simulator is not None and self.simulator.link is self._link:
+            self.simulator.detach()
+
+    def close(self):
+        self.drop()
+        self._link = None
+
+    def input_stream(self):
+        return self._link
+
+    def output_stream(self):
+        return _SimulatorOutput(self.simulator, self._link)
+
+
+def transport_from_spec(spec):
+    """Cria o transporte descrito em texto ('sim', 'serial:PORTA[:BAUD]' ou 'tcp:HOST:PORTA')."""
+    kind, _, rest = (spec or 'sim').strip().partition(':')
+    kind = kind.lower()
+    if kind == 'sim':
+        return SimulatorTransport()
+    if kind == 'serial' and rest:
+        port, _, baudrate = rest.rpartition(':') if rest.rsplit(':', 1)[-1].isdigit() else (rest, '', '')
+        return SerialTransport(port, int(baudrate) if baudrate else SERIAL_BAUDRATE)
+    if kind == 'tcp' and ':' in rest:
+        host, _, port = rest.rpartition(':')
+        return TcpTransport(host, int(port))
+    raise ValueError(f"Transporte inválido: '{spec}'. Use sim, serial:PORTA[:BAUD] ou tcp:HOST:PORTA.")